@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from mock_wise import MockWiseServer, make_statement
+
+# Render benchmarks need a Qt platform even on headless machines
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+INTERVAL_START = '2024-01-01T00:00:00.000Z'
+
+
+def interval_end_for(transactions, per_day=1000):
+    """Return an interval end giving ``transactions`` rows at ``per_day`` density."""
+    from datetime import datetime, timedelta
+
+    end = datetime(2024, 1, 1) + timedelta(days=transactions / per_day) - timedelta(milliseconds=1)
+    return end.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + 'Z'
+
+
+@pytest.fixture(scope='session')
+def synthetic_statement():
+    """Factory for in-memory statements with exactly ``n`` transactions."""
+    cache = {}
+
+    def factory(n):
+        if n not in cache:
+            cache[n] = make_statement(101, 'GBP', INTERVAL_START, interval_end_for(n), 1000)
+            assert len(cache[n]['transactions']) == n
+        return cache[n]
+
+    return factory
+
+
+@pytest.fixture(scope='session')
+def statement_file(tmp_path_factory, synthetic_statement):
+    """Factory for statements spilled to disk as the API would return them."""
+    directory = tmp_path_factory.mktemp('statements')
+
+    def factory(n):
+        path = directory / f"statement-{n}.json"
+        if not path.exists():
+            path.write_text(json.dumps(synthetic_statement(n)))
+        return str(path)
+
+    return factory
+
+
+@pytest.fixture(scope='module')
+def mock_server():
+    with MockWiseServer(profiles=1, currencies=('GBP',), transactions_per_day=100) as server:
+        yield server
@@ -0,0 +1,301 @@
+"""Offline stand-in for the Wise endpoints used by recharge_wise.
+
+Serves ``/v2/profiles``, ``/v1/borderless-accounts``, ``/v1/rates`` and
+``/{version}/profiles/{id}/balance-statements/{id}/statement.json`` with
+synthetic, deterministic data. Statements can be any size and latency and
+429 responses can be injected, so the fetch and render paths can be
+benchmarked without touching the sandbox.
+
+    python benchmarks/mock_wise.py --port 8080 --transactions-per-day 50 --latency 0.05
+    recharge_wise export --base-url http://127.0.0.1:8080 --token x ...
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EPOCH = datetime(1970, 1, 1)
+MS_PER_DAY = 86_400_000
+START_BALANCE = 10_000.0
+
+STATEMENT_PATH = re.compile(r'^/(v\d+)/profiles/(\d+)/balance-statements/(\d+)/statement\.json$')
+DETAIL_TYPES = ('TRANSFER', 'DEPOSIT', 'CONVERSION', 'CARD')
+
+# Value of one unit in USD, before the daily wobble added by mock_rate
+USD_VALUES = {'USD': 1.0, 'GBP': 1.27, 'EUR': 1.08, 'CHF': 1.12, 'JPY': 0.0067}
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _format_ms(date_ms):
+    return (EPOCH + timedelta(milliseconds=date_ms)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + 'Z'
+
+
+def _ms(value):
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def _pair_amount(balance_id, pair):
+    # Cheap deterministic pseudo-random amount in [1, 2000)
+    return ((pair * 2654435761 + balance_id * 40503) % 199_900) / 100 + 1
+
+
+def _balance_before(balance_id, slot):
+    # Transactions come in credit/debit pairs of the same amount, so the
+    # running balance only depends on whether ``slot`` is mid-pair. That keeps
+    # balances consistent across independently generated windows.
+    if slot % 2:
+        return START_BALANCE + _pair_amount(balance_id, slot // 2)
+    return START_BALANCE
+
+
+def make_transaction(balance_id, currency, slot, date_ms):
+    pair = slot // 2
+    amount = _pair_amount(balance_id, pair)
+    credit = slot % 2 == 0
+    detail_type = DETAIL_TYPES[pair % len(DETAIL_TYPES)]
+    details = {'type': detail_type, 'description': f"Synthetic {detail_type.lower()} {pair}"}
+    if detail_type == 'CONVERSION':
+        details['sourceAmount'] = {'value': amount, 'currency': currency}
+        details['targetAmount'] = {'value': round(amount * 1.17, 2), 'currency': 'EUR'}
+        details['rate'] = 1.17
+    elif detail_type == 'DEPOSIT':
+        details['senderName'] = f"Sender {pair % 97}"
+        details['senderAccount'] = f"GB{pair % 9973:06d}"
+        details['paymentReference'] = f"Invoice {pair}"
+    elif detail_type == 'TRANSFER':
+        details['recipient'] = {'name': f"Recipient {pair % 89}", 'bankAccount': f"DE{pair % 7919:08d}"}
+    fee = round((pair % 7) * 0.13, 2)
+    running = _balance_before(balance_id, slot) + (amount if credit else -amount)
+    return {
+        'type': 'CREDIT' if credit else 'DEBIT',
+        'date': _format_ms(date_ms),
+        'amount': {'value': amount if credit else -amount, 'currency': currency},
+        'totalFees': {'value': fee, 'currency': currency},
+        'details': details,
+        'exchangeDetails': {'rate': 1.17} if detail_type == 'CONVERSION' and pair % 2 else None,
+        'runningBalance': {'value': round(running, 2), 'currency': currency},
+        'referenceNumber': f"MOCK-{balance_id}-{slot}",
+    }
+
+
+def mock_rate(source, target, day):
+    """Deterministic daily rate; ``day`` counts days since the epoch."""
+    wobble = 1 + ((day * 7 + sum(map(ord, source))) % 11 - 5) / 1000
+    return round(USD_VALUES.get(source, 1.0) / USD_VALUES.get(target, 1.0) * wobble, 6)
+
+
+def make_rates(source, target, start, end):
+    """``/v1/rates?group=day`` response for ``YYYY-MM-DD`` dates ``start`` to ``end``."""
+    first = _ms(datetime.strptime(start[:10], '%Y-%m-%d')) // MS_PER_DAY
+    last = _ms(datetime.strptime(end[:10], '%Y-%m-%d')) // MS_PER_DAY
+    return [
+        {'rate': mock_rate(source, target, day), 'source': source, 'target': target,
+         'time': (EPOCH + timedelta(days=day)).strftime('%Y-%m-%dT%H:%M:%S+0000')}
+        for day in range(first, last + 1)
+    ]
+
+
+def make_statement(balance_id, currency, interval_start, interval_end, transactions_per_day):
+    """Build a statement with transactions on a fixed global time grid.
+
+    Transactions fall every ``1 / transactions_per_day`` days from the epoch,
+    so overlapping or adjacent windows agree on references and balances.
+    """
+    start_ms = _ms(_parse_date(interval_start))
+    end_ms = _ms(_parse_date(interval_end))
+    step = max(1, int(MS_PER_DAY / transactions_per_day))
+    first_slot = -(-start_ms // step)
+    last_slot = end_ms // step
+    transactions = [
+        make_transaction(balance_id, currency, slot, slot * step)
+        for slot in range(last_slot, first_slot - 1, -1)
+    ]
+    return {
+        'accountHolder': {'type': 'BUSINESS', 'businessName': 'Mock Business Ltd'},
+        'issuer': {'name': 'Wise Payments Limited'},
+        'bankDetails': None,
+        'transactions': transactions,
+        'startOfStatementBalance': {
+            'value': round(_balance_before(balance_id, first_slot), 2), 'currency': currency},
+        'endOfStatementBalance': {
+            'value': round(_balance_before(balance_id, last_slot + 1), 2), 'currency': currency},
+        'endOfStatementUnrealisedGainLoss': None,
+        'balanceAssetConfiguration': None,
+        'query': {
+            'intervalStart': interval_start,
+            'intervalEnd': interval_end,
+            'type': 'COMPACT',
+            'addStamp': False,
+            'currency': currency,
+            'profileId': None,
+            'timezone': 'Z',
+        },
+        'request': {'id': f"mock-{balance_id}-{start_ms}", 'creationTime': interval_end,
+                    'profileId': None, 'currency': currency,
+                    'balanceId': balance_id, 'balanceName': None,
+                    'intervalStart': interval_start, 'intervalEnd': interval_end},
+    }
+
+
+class MockWiseServer:
+    """Threaded HTTP server emulating the Wise API.
+
+    ``latency`` seconds are slept before every response. When
+    ``rate_limit_every`` is set, every Nth request is answered with
+    ``rate_limit_status`` (a 429 unless, say, a 503 is wanted) carrying
+    ``Retry-After: retry_after``.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, profiles=2, currencies=('GBP', 'EUR', 'USD'),
+                 transactions_per_day=10, latency=0.0, rate_limit_every=0, retry_after=1,
+                 rate_limit_status=429):
+        self.profiles = profiles
+        self.currencies = tuple(currencies)
+        self.transactions_per_day = transactions_per_day
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.rate_limit_status = rate_limit_status
+        self.request_count = 0
+        self.rate_limited_count = 0
+        # (api version, balance id, interval start, interval end) of every statement served
+        self.statement_requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def profile_ids(self):
+        return [1000 + i for i in range(self.profiles)]
+
+    def balances(self, profile_id):
+        return [
+            {'id': profile_id * 100 + i, 'currency': currency, 'amount': {'value': START_BALANCE, 'currency': currency}}
+            for i, currency in enumerate(self.currencies)
+        ]
+
+    def _should_rate_limit(self):
+        with self.lock:
+            self.request_count += 1
+            limited = self.rate_limit_every and self.request_count % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited_count += 1
+            return limited
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, body, headers=()):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    return self.send_json(401, {'error': 'unauthorized'})
+                if server._should_rate_limit():
+                    return self.send_json(server.rate_limit_status, {'error': 'too many requests'},
+                                          [('Retry-After', str(server.retry_after))])
+
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == '/v2/profiles':
+                    return self.send_json(200, [
+                        {'id': profile_id, 'type': 'business', 'businessName': f"Mock Business {profile_id}"}
+                        for profile_id in server.profile_ids()
+                    ])
+                if url.path == '/v1/borderless-accounts':
+                    profile_id = int(query.get('profileId', 0))
+                    if profile_id not in server.profile_ids():
+                        return self.send_json(404, {'error': 'profile not found'})
+                    return self.send_json(200, [{'id': profile_id, 'profileId': profile_id,
+                                                 'balances': server.balances(profile_id)}])
+                if url.path == '/v1/rates':
+                    try:
+                        return self.send_json(200, make_rates(query['source'], query['target'],
+                                                              query['from'], query['to']))
+                    except (KeyError, ValueError) as e:
+                        return self.send_json(400, {'error': f"bad rates request: {e}"})
+                match = STATEMENT_PATH.match(url.path)
+                if match:
+                    try:
+                        statement = make_statement(int(match.group(3)), query['currency'], query['intervalStart'],
+                                                   query['intervalEnd'], server.transactions_per_day)
+                    except (KeyError, ValueError) as e:
+                        return self.send_json(400, {'error': f"bad statement request: {e}"})
+                    with server.lock:
+                        server.statement_requests.append((match.group(1), int(match.group(3)),
+                                                          query['intervalStart'], query['intervalEnd']))
+                    return self.send_json(200, statement)
+                self.send_json(404, {'error': 'not found'})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--profiles', type=int, default=2)
+    parser.add_argument('--currencies', default='GBP,EUR,USD')
+    parser.add_argument('--transactions-per-day', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to sleep before each response')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth request with a 429')
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--rate-limit-status', type=int, default=429, help='Status of the injected errors')
+    args = parser.parse_args(argv)
+
+    server = MockWiseServer(args.host, args.port, args.profiles, args.currencies.split(','),
+                            args.transactions_per_day, args.latency, args.rate_limit_every, args.retry_after,
+                            args.rate_limit_status)
+    print(f"Mock Wise API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Startup benchmark for the desktop tool.
+
+Measures, each in a fresh interpreter:
+
+* import time of ``recharge_wise.main`` (from ``python -X importtime``),
+  with the slowest modules it pulls in;
+* time to first paint: wall-clock time from launching the interpreter until
+  the main window receives its first paint event.
+
+Results are printed as JSON. ``--save`` writes them to a file and
+``--baseline`` compares against a saved run, exiting non-zero if any metric
+regressed by more than ``--tolerance``.
+
+    python benchmarks/startup.py --runs 5 --save startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_PAINT_CHILD = """
+import sys, time
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+from recharge_wise import main
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(time.time(), flush=True)
+            QTimer.singleShot(0, QApplication.instance().quit)
+            obj.removeEventFilter(self)
+        return False
+
+app = QApplication(sys.argv)
+window = main.WiseAPITester()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec_()
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def measure_imports(top=10):
+    """Return (total import time of recharge_wise.main in ms, slowest modules by self time)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import recharge_wise.main'],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True)
+    modules = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        modules.append((int(self_us), name))
+        if name == 'recharge_wise.main':
+            total_us = int(cumulative_us)
+    modules.sort(reverse=True)
+    return total_us / 1000, [{'module': name, 'self_ms': us / 1000} for us, name in modules[:top]]
+
+
+def measure_first_paint():
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, '-c', FIRST_PAINT_CHILD],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True, timeout=60)
+    painted = float(result.stdout.strip().splitlines()[-1])
+    return (painted - started) * 1000
+
+
+def run(runs):
+    import_times = []
+    paint_times = []
+    slowest = []
+    for _ in range(runs):
+        total_ms, slowest = measure_imports()
+        import_times.append(total_ms)
+        paint_times.append(measure_first_paint())
+    return {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'runs': runs,
+        'import_main_ms': statistics.median(import_times),
+        'first_paint_ms': statistics.median(paint_times),
+        'slowest_imports': slowest,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for metric in ('import_main_ms', 'first_paint_ms'):
+        limit = baseline[metric] * (1 + tolerance)
+        if results[metric] > limit:
+            regressions.append(f"{metric}: {results[metric]:.1f} ms > {limit:.1f} ms "
+                               f"(baseline {baseline[metric]:.1f} ms)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='Runs per metric; the median is reported')
+    parser.add_argument('--save', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown relative to the baseline (default 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, 'w') as fp:
+            json.dump(results, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(results, json.load(fp), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
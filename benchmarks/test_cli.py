@@ -0,0 +1,114 @@
+import csv
+import io
+import sys
+
+import pytest
+
+pytest.importorskip('requests')
+
+from mock_wise import MockWiseServer
+from recharge_wise import cli
+from recharge_wise.rate_limiter import RateLimiter
+from recharge_wise.statement_parser import parse_transactions
+from recharge_wise.transaction_store import TransactionStore
+from test_search import TRANSACTIONS
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = str(tmp_path / 'transactions.sqlite3')
+    with TransactionStore(path) as store:
+        store.add_columns('sandbox', 1, 10, parse_transactions(TRANSACTIONS))
+    return path
+
+
+def query(capsys, store_path, *args):
+    assert cli.main(['query', '--store-path', store_path, *args]) == 0
+    return [row['reference'] for row in csv.DictReader(io.StringIO(capsys.readouterr().out))]
+
+
+def test_query_bare_end_date_includes_whole_day(capsys, store_path):
+    assert query(capsys, store_path, '--start', '2023-12-31', '--end', '2023-12-31') == ['TX-3', 'TX-2']
+    assert query(capsys, store_path, '--end', '2023-12-31T00:00:00.000Z') == ['TX-2', 'TX-1']
+    assert query(capsys, store_path, 'payroll', '--min-amount', '1000', '--end', '2023-12-31') == ['TX-3']
+
+
+@pytest.mark.parametrize('option', ['--start', '--end'])
+@pytest.mark.parametrize('value', ['2023-13-01', 'yesterday'])
+def test_query_rejects_invalid_dates(capsys, store_path, option, value):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['query', '--store-path', store_path, option, value])
+    assert exc_info.value.code == 2
+    assert f"Invalid {option[2:]} date {value!r}" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_export_reports_failed_discovery(capsys, tmp_path, monkeypatch, engine):
+    if engine == 'async':
+        pytest.importorskip('httpx')
+    closed = []
+
+    class Store(TransactionStore):
+        def close(self):
+            closed.append(self.path)
+            super().close()
+
+    monkeypatch.setattr(cli, 'TransactionStore', Store)
+    store_path = str(tmp_path / 'transactions.sqlite3')
+    # Every request fails with a 503, including all of its retries
+    with MockWiseServer(rate_limit_every=1, rate_limit_status=503, retry_after=0) as server:
+        status = cli.main(['export', '--token', 'test', '--base-url', server.url, '--engine', engine,
+                           '--start', '2024-01-01', '--end', '2024-01-31', '--output', str(tmp_path),
+                           '--index', '--store-path', store_path])
+    assert status == 1
+    errors = [line for line in capsys.readouterr().err.splitlines() if line.startswith('error:')]
+    assert len(errors) == 1 and errors[0].startswith('error: could not list profiles and balances: ')
+    assert '503' in errors[0]
+    assert closed == [store_path]
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_export_rate_options(tmp_path, monkeypatch, engine):
+    if engine == 'async':
+        pytest.importorskip('httpx')
+    limiters = []
+
+    class Limiter(RateLimiter):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            limiters.append(self)
+
+    monkeypatch.setattr(cli, 'RateLimiter', Limiter)
+    with MockWiseServer(profiles=1, currencies=('GBP',)) as server:
+        status = cli.main(['export', '--token', 'test', '--base-url', server.url, '--engine', engine,
+                           '--start', '2024-01-01', '--end', '2024-01-31', '--output', str(tmp_path),
+                           '--rate', '50', '--burst', '20'])
+    assert status == 0
+    assert [(limiter.max_rate, limiter.burst) for limiter in limiters] == [(50.0, 20)]
+
+
+@pytest.mark.parametrize('option, value', [('--rate', '0'), ('--rate', '-1'), ('--rate', 'fast'),
+                                           ('--burst', '0')])
+def test_export_rejects_invalid_rate_options(capsys, tmp_path, option, value):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['export', '--token', 'test', '--start', '2024-01-01', '--end', '2024-03-01',
+                  '--output', str(tmp_path), option, value])
+    assert exc_info.value.code == 2
+    assert f'argument {option}' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('value', ['0', '-2', 'one'])
+def test_export_rejects_invalid_window_months(capsys, tmp_path, value):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['export', '--token', 'test', '--start', '2024-01-01', '--end', '2024-03-01',
+                  '--output', str(tmp_path), '--window-months', value])
+    assert exc_info.value.code == 2
+    assert 'argument --window-months' in capsys.readouterr().err
+
+
+def test_export_async_without_httpx(capsys, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+    status = cli.main(['export', '--token', 'test', '--engine', 'async', '--start', '2024-01-01',
+                       '--end', '2024-01-31', '--output', str(tmp_path)])
+    assert status == 2
+    assert capsys.readouterr().err.strip() == 'error: --engine async requires httpx (pip install httpx)'
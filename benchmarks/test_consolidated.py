@@ -0,0 +1,98 @@
+import pytest
+
+from recharge_wise.statement_parser import MS_PER_DAY, ConsolidatedSummary, parse_date_ms, parse_transactions
+from recharge_wise.statement_stream import StreamedStatement, consolidate_statements, convert_balances
+
+DAY_1 = parse_date_ms('2024-03-04T00:00:00.000Z')
+DAY_2 = DAY_1 + MS_PER_DAY
+
+# Rates into GBP, the reporting currency
+RATES = {
+    ('GBP', DAY_1): 1.0, ('GBP', DAY_2): 1.0,
+    ('EUR', DAY_1): 0.85, ('EUR', DAY_2): 0.86,
+    ('USD', DAY_1): 0.79, ('USD', DAY_2): 0.80,
+}
+
+
+def transaction(reference, date, value, currency, fee=0.0, fee_currency=None, details=None):
+    return {
+        'type': 'CREDIT' if value > 0 else 'DEBIT',
+        'date': date,
+        'amount': {'value': value, 'currency': currency},
+        'totalFees': {'value': fee, 'currency': fee_currency or currency},
+        'details': details or {'type': 'TRANSFER', 'description': reference},
+        'exchangeDetails': None,
+        'runningBalance': {'value': 0.0, 'currency': currency},
+        'referenceNumber': reference,
+    }
+
+
+def statement(currency, start, end, transactions):
+    header = {
+        'accountHolder': {'type': 'BUSINESS', 'businessName': 'Test Ltd'},
+        'query': {'intervalStart': '2024-03-04T00:00:00.000Z', 'intervalEnd': '2024-03-05T23:59:59.999Z'},
+        'startOfStatementBalance': {'value': start, 'currency': currency},
+        'endOfStatementBalance': {'value': end, 'currency': currency},
+    }
+    return StreamedStatement(header, parse_transactions(transactions), [])
+
+
+CONVERSION = {'type': 'CONVERSION', 'description': 'Converted EUR to GBP',
+              'sourceAmount': {'value': 117.0, 'currency': 'EUR'},
+              'targetAmount': {'value': 100.0, 'currency': 'GBP'}, 'rate': 0.8547}
+
+STATEMENTS = [
+    (1, 'GBP', statement('GBP', 1000.0, 1160.0, [
+        transaction('GBP-1', '2024-03-04T09:00:00.000Z', 100.0, 'GBP', fee=1.0),
+        transaction('GBP-2', '2024-03-05T09:00:00.000Z', -40.0, 'GBP'),
+        transaction('GBP-3', '2024-03-05T10:00:00.000Z', 100.0, 'GBP', details=CONVERSION),
+    ])),
+    (2, 'EUR', statement('EUR', 500.0, 533.0, [
+        transaction('EUR-1', '2024-03-04T10:00:00.000Z', 200.0, 'EUR', fee=2.0),
+        transaction('EUR-2', '2024-03-05T11:00:00.000Z', -50.0, 'EUR'),
+        # The EUR leg of GBP-3, valued at its own GBP leg rather than the day's rate
+        transaction('EUR-3', '2024-03-05T10:00:00.000Z', -117.0, 'EUR', details=CONVERSION),
+    ])),
+    (3, 'USD', statement('USD', 0.0, 10.0, [
+        transaction('USD-1', '2024-03-04T11:00:00.000Z', 10.0, 'USD', fee=0.5, fee_currency='EUR'),
+    ])),
+]
+
+
+@pytest.fixture
+def consolidated():
+    return consolidate_statements(STATEMENTS)
+
+
+def test_consolidated_totals(consolidated):
+    summary = ConsolidatedSummary('GBP').update(consolidated.columns)
+    assert summary.total_transactions == 7
+    assert summary.count('CREDIT') == 4 and summary.count('DEBIT') == 3
+    assert summary.exchange_valued == 1
+    assert summary.rate_keys() == {('EUR', DAY_1), ('EUR', DAY_2), ('USD', DAY_1)}
+    assert summary.native_totals('EUR') == (200.0, 167.0, 2.5)
+
+    summary.convert(RATES)
+    # credits, debits, fees of each currency, in GBP
+    assert summary.currency_totals('GBP') == pytest.approx((200.0, 40.0, 1.0))
+    assert summary.currency_totals('EUR') == pytest.approx((200 * 0.85, 100.0 + 50 * 0.86, 2.5 * 0.85))
+    assert summary.currency_totals('USD') == pytest.approx((10 * 0.79, 0.0, 0.0))
+    assert summary.currency_totals() == pytest.approx((377.9, 183.0, 3.125))
+    assert (summary.total_credits, summary.total_debits, summary.total_fees) == \
+        pytest.approx((377.9, 183.0, 3.125))
+
+
+def test_consolidated_update_is_incremental(consolidated):
+    columns = consolidated.columns
+    summary = ConsolidatedSummary('GBP').update(columns.take(range(3)))
+    summary.update(columns).convert(RATES)
+    assert summary.total_transactions == 7
+    assert summary.currency_totals() == pytest.approx((377.9, 183.0, 3.125))
+
+
+def test_converted_balances(consolidated):
+    convert_balances(consolidated.header, RATES, 'GBP', DAY_1, DAY_2)
+    assert consolidated.header['startOfStatementBalance'] == {'value': 1000.0 + 500 * 0.85, 'currency': 'GBP'}
+    assert consolidated.header['endOfStatementBalance'] == \
+        {'value': round(1160.0 + 533 * 0.86 + 10 * 0.80, 2), 'currency': 'GBP'}
+    assert [balance['currency'] for balance in consolidated.header['balances']] == ['GBP', 'EUR', 'USD']
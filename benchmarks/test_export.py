@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from mock_wise import make_statement
+from recharge_wise.export import EXPORT_FIELDS, EXPORT_FORMATS, check_format, export_columns
+from recharge_wise.statement_parser import StatementColumns, parse_transactions
+
+CURRENCIES = ('GBP', 'EUR', 'USD')
+# A year of three balances at 100 transactions a day, about 110k rows
+TRANSACTIONS_PER_DAY = 100
+
+
+@pytest.fixture(scope='module')
+def consolidated():
+    columns = StatementColumns()
+    for balance_id, currency in enumerate(CURRENCIES, 100):
+        data = make_statement(balance_id, currency, '2024-01-01T00:00:00.000Z', '2024-12-31T23:59:59.999Z',
+                              TRANSACTIONS_PER_DAY)
+        balance = parse_transactions(data['transactions'])
+        columns.extend_from(balance, range(len(balance)))
+    return columns
+
+
+@pytest.mark.parametrize('fmt', EXPORT_FORMATS)
+def test_export(benchmark, consolidated, tmp_path, fmt):
+    try:
+        check_format(fmt)
+    except ImportError as e:
+        pytest.skip(str(e))
+    path = tmp_path / f"statement.{fmt}"
+    benchmark.pedantic(export_columns, args=(consolidated, str(path), fmt), rounds=3, iterations=1)
+    benchmark.extra_info['transactions'] = len(consolidated)
+    benchmark.extra_info['file_mb'] = path.stat().st_size / 1e6
+
+
+def test_arrow_export_keeps_types(consolidated, tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+
+    path = tmp_path / 'statement.arrow'
+    export_columns(consolidated, str(path), 'arrow')
+    table = pyarrow.feather.read_table(str(path))
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert table.schema.field('date').type == pa.timestamp('ms', tz='UTC')
+    assert table.column('date').cast(pa.int64()).to_pylist() == list(consolidated.date)
+    assert table.column('counter_currency').to_pylist() == consolidated.decoded('counter_currency')
@@ -0,0 +1,97 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from recharge_wise.export import EXPORT_FIELDS, export_columns
+from recharge_wise.statement_parser import parse_transactions
+
+TRANSACTIONS = [
+    {
+        'type': 'CREDIT', 'date': '2024-02-29T23:59:59.999Z',
+        'amount': {'value': 1234.5678, 'currency': 'GBP'},
+        'totalFees': {'value': 0.0, 'currency': 'GBP'},
+        'details': {'type': 'DEPOSIT', 'description': 'Café & <Co> "quoted", with a comma',
+                    'senderName': 'Café & Co', 'senderAccount': 'GB000001', 'paymentReference': 'Invoice 7'},
+        'exchangeDetails': None,
+        'runningBalance': {'value': 11234.5678, 'currency': 'GBP'},
+        'referenceNumber': 'REF-1',
+    },
+    {
+        'type': 'DEBIT', 'date': '2024-03-01T08:15:00.000Z',
+        'amount': {'value': -250.0, 'currency': 'EUR'},
+        'totalFees': {'value': 1.25, 'currency': 'EUR'},
+        'details': {'type': 'CONVERSION', 'description': 'Converted EUR to GBP',
+                    'sourceAmount': {'value': 250.0, 'currency': 'EUR'},
+                    'targetAmount': {'value': 214.5, 'currency': 'GBP'}, 'rate': 0.858},
+        'exchangeDetails': None,
+        'runningBalance': {'value': 750.0, 'currency': 'EUR'},
+        'referenceNumber': 'REF-2',
+    },
+    {
+        'type': 'DEBIT', 'date': '2024-03-01T12:00:00.000Z',
+        'amount': {'value': -20.0, 'currency': 'GBP'},
+        'totalFees': {'value': 0.35, 'currency': 'GBP'},
+        'details': {'type': 'CARD', 'description': 'Card payment'},
+        'exchangeDetails': {'rate': 0.8547, 'forAmount': {'value': 23.4, 'currency': 'USD'}},
+        'runningBalance': {'value': 11214.5678, 'currency': 'GBP'},
+        'referenceNumber': 'REF-3',
+    },
+]
+
+# What each export holds for TRANSACTIONS, as JSON lines decode it
+EXPECTED = [
+    {'date': '2024-02-29T23:59:59.999Z', 'type': 'CREDIT', 'detail_type': 'DEPOSIT', 'amount': 1234.5678,
+     'currency': 'GBP', 'fees': 0.0, 'fee_currency': 'GBP', 'exchange_rate': None, 'counter_amount': 0.0,
+     'counter_currency': '', 'running_balance': 11234.5678, 'running_currency': 'GBP',
+     'description': 'Café & <Co> "quoted", with a comma',
+     'details': 'Sender: Café & Co\nSender Account: GB000001\nPayment Reference: Invoice 7',
+     'reference': 'REF-1', 'recipient': 'Sender: Café & Co'},
+    {'date': '2024-03-01T08:15:00.000Z', 'type': 'DEBIT', 'detail_type': 'CONVERSION', 'amount': -250.0,
+     'currency': 'EUR', 'fees': 1.25, 'fee_currency': 'EUR', 'exchange_rate': 0.858, 'counter_amount': -214.5,
+     'counter_currency': 'GBP', 'running_balance': 750.0, 'running_currency': 'EUR',
+     'description': 'Converted EUR to GBP', 'details': 'From: 250.00 EUR\nTo: 214.50 GBP',
+     'reference': 'REF-2', 'recipient': '-'},
+    {'date': '2024-03-01T12:00:00.000Z', 'type': 'DEBIT', 'detail_type': 'CARD', 'amount': -20.0,
+     'currency': 'GBP', 'fees': 0.35, 'fee_currency': 'GBP', 'exchange_rate': 0.8547, 'counter_amount': -23.4,
+     'counter_currency': 'USD', 'running_balance': 11214.5678, 'running_currency': 'GBP',
+     'description': 'Card payment', 'details': 'CARD', 'reference': 'REF-3', 'recipient': '-'},
+]
+
+
+def export(tmp_path, fmt):
+    path = tmp_path / f"statement.{fmt}"
+    export_columns(parse_transactions(TRANSACTIONS), str(path), fmt)
+    return path
+
+
+def test_csv_contents(tmp_path):
+    with open(export(tmp_path, 'csv'), newline='', encoding='utf-8') as fp:
+        rows = list(csv.reader(fp))
+    assert rows[0] == list(EXPORT_FIELDS)
+    assert rows[1:] == [['' if row[field] is None else str(row[field]) for field in EXPORT_FIELDS]
+                        for row in EXPECTED]
+
+
+def test_jsonl_contents(tmp_path):
+    with open(export(tmp_path, 'jsonl'), encoding='utf-8') as fp:
+        rows = [json.loads(line) for line in fp]
+    assert rows == EXPECTED
+    assert [list(row) for row in rows] == [list(EXPORT_FIELDS)] * len(EXPECTED)
+
+
+def test_xlsx_contents(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+
+    sheet = openpyxl.load_workbook(export(tmp_path, 'xlsx'), read_only=True).worksheets[0]
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert rows[0] == list(EXPORT_FIELDS)
+    assert len(rows) == len(EXPECTED) + 1
+    for row, expected in zip(rows[1:], EXPECTED):
+        values = dict(zip(EXPORT_FIELDS, row))
+        # Dates are Excel date-times, exact to within float rounding of the day fraction
+        date = datetime.strptime(expected['date'], '%Y-%m-%dT%H:%M:%S.%fZ')
+        assert isinstance(values.pop('date'), datetime)
+        assert abs(row[0] - date) < timedelta(milliseconds=1)
+        assert values == {field: value for field, value in expected.items() if field != 'date'}
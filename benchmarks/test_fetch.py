@@ -0,0 +1,125 @@
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('requests')
+
+from mock_wise import MockWiseServer
+from recharge_wise.metrics import MetricsRegistry
+from recharge_wise.rate_limiter import RateLimiter
+from recharge_wise.statement_stream import fetch_statement_stream
+from recharge_wise.wise_client import WiseClient
+
+YEAR = ('2024-01-01T00:00:00.000Z', '2024-12-31T23:59:59.999Z')
+
+
+def make_client(server):
+    # A private, effectively unlimited bucket so the benchmark measures the
+    # fetch path rather than the production rate limits
+    return WiseClient('benchmark', base_url=server.url, rate_limiter=RateLimiter(rate=1e6, burst=1e6))
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_fetch_year_statement(benchmark, mock_server, workers):
+    client = make_client(mock_server)
+    balance_id = mock_server.balances(mock_server.profile_ids()[0])[0]['id']
+
+    def fetch():
+        statement = fetch_statement_stream(client, mock_server.profile_ids()[0], balance_id, 'GBP', *YEAR,
+                                           max_workers=workers)
+        statement.close()
+        return statement
+
+    statement = benchmark.pedantic(fetch, rounds=3, iterations=1)
+    benchmark.extra_info['transactions'] = len(statement.columns)
+    if benchmark.stats:
+        benchmark.extra_info['transactions_per_second'] = len(statement.columns) / benchmark.stats.stats.mean
+    assert len(statement.columns) == 366 * 100
+
+
+def test_fetch_with_latency_and_429s(benchmark, mock_server):
+    client = make_client(mock_server)
+    client.metrics = metrics = MetricsRegistry()
+    balance_id = mock_server.balances(mock_server.profile_ids()[0])[0]['id']
+    mock_server.latency, mock_server.rate_limit_every, mock_server.retry_after = 0.05, 5, 0
+    try:
+        statement = benchmark.pedantic(
+            lambda: fetch_statement_stream(client, mock_server.profile_ids()[0], balance_id, 'GBP', *YEAR,
+                                           max_workers=4),
+            rounds=1, iterations=1)
+        statement.close()
+    finally:
+        mock_server.latency, mock_server.rate_limit_every = 0.0, 0
+    assert len(statement.columns) == 366 * 100
+    assert mock_server.rate_limited_count > 0
+
+    # Retried 429s and the injected server latency show up in the timings
+    requests = [timing for timing in metrics.recent_timings() if timing.operation == 'request']
+    assert len(requests) == 12
+    assert sum(timing.counts.get('retries', 0) for timing in requests) > 0
+    assert all(timing.phases['headers'] >= 0.05 for timing in requests)
+
+
+def test_fetch_peak_memory(benchmark, mock_server):
+    client = make_client(mock_server)
+    balance_id = mock_server.balances(mock_server.profile_ids()[0])[0]['id']
+
+    def fetch():
+        tracemalloc.start()
+        try:
+            statement = fetch_statement_stream(client, mock_server.profile_ids()[0], balance_id, 'GBP', *YEAR)
+            statement.close()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    peak = benchmark.pedantic(fetch, rounds=1, iterations=1)
+    benchmark.extra_info['peak_memory_mb'] = peak / 1e6
+
+
+QUARTER = ('2024-01-01T00:00:00.000Z', '2024-03-31T23:59:59.999Z')
+
+
+def fetch_all_threaded(server, concurrency):
+    from concurrent.futures import ThreadPoolExecutor
+
+    client = make_client(server)
+    balances = [(profile_id, balance['id'], balance['currency'])
+                for profile_id in server.profile_ids() for balance in server.balances(profile_id)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        statements = list(executor.map(
+            lambda b: fetch_statement_stream(client, *b, *QUARTER, max_workers=1), balances))
+    for statement in statements:
+        statement.close()
+    return sum(len(statement.columns) for statement in statements)
+
+
+def fetch_all_async(server, concurrency):
+    import asyncio
+
+    from recharge_wise.async_engine import AsyncWiseEngine
+
+    async def run():
+        total = 0
+        async with AsyncWiseEngine('benchmark', base_url=server.url, concurrency=concurrency,
+                                   rate_limiter=RateLimiter(rate=1e6, burst=1e6)) as engine:
+            async for result in engine.iter_statements(*QUARTER):
+                assert result.error is None, result.error
+                result.statement.close()
+                total += len(result.statement.columns)
+        return total
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('engine', ['threads', 'async'])
+def test_fetch_all_balances(benchmark, engine):
+    if engine == 'async':
+        pytest.importorskip('httpx')
+    fetch_all = fetch_all_async if engine == 'async' else fetch_all_threaded
+    with MockWiseServer(profiles=3, currencies=('GBP', 'EUR', 'USD'), transactions_per_day=100,
+                        latency=0.05) as server:
+        total = benchmark.pedantic(lambda: fetch_all(server, 8), rounds=1, iterations=1)
+    benchmark.extra_info['transactions'] = total
+    assert total == 3 * 3 * 91 * 100
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+from mock_wise import make_rates
+from recharge_wise.fx_rates import FXRates, day_start
+from recharge_wise.statement_parser import parse_date_ms
+
+NOW = datetime(2024, 3, 15, 12)
+TODAY = day_start(parse_date_ms('2024-03-15T12:00:00.000Z'))
+SATURDAY = day_start(parse_date_ms('2024-03-09T00:00:00.000Z'))
+FRIDAY = day_start(parse_date_ms('2024-03-08T00:00:00.000Z'))
+
+
+class RatesClient:
+    """Serves mock rates without weekends; today's rate moves by ``today_shift``."""
+
+    def __init__(self):
+        self.requests = []
+        self.today_shift = 0.0
+
+    def rates(self, source, target, start_date, end_date):
+        self.requests.append((source, start_date, end_date))
+        entries = []
+        for entry in make_rates(source, target, start_date, end_date):
+            day = day_start(parse_date_ms(entry['time'][:10]))
+            if datetime.strptime(entry['time'][:10], '%Y-%m-%d').weekday() < 5:
+                entries.append(dict(entry, rate=entry['rate'] + (self.today_shift if day == TODAY else 0)))
+        return entries
+
+
+@pytest.fixture
+def fx(tmp_path):
+    with FXRates(str(tmp_path / 'fx_rates.sqlite3')) as fx:
+        yield fx
+
+
+def test_fallback_days_are_cached(fx):
+    client = RatesClient()
+    first = fx.rates(client, {('EUR', SATURDAY)}, 'GBP', now=NOW)
+    assert first[('EUR', SATURDAY)] == fx.cached('EUR', 'GBP', FRIDAY)
+    assert fx.rates(client, {('EUR', SATURDAY)}, 'GBP', now=NOW) == first
+    assert len(client.requests) == 1
+
+
+def test_todays_rate_is_not_cached(fx):
+    client = RatesClient()
+    keys = {('EUR', SATURDAY), ('EUR', TODAY)}
+    first = fx.rates(client, keys, 'GBP', now=NOW)
+    assert fx.cached('EUR', 'GBP', TODAY) is None
+
+    client.today_shift = 0.01
+    second = fx.rates(client, keys, 'GBP', now=NOW)
+    assert client.requests[1] == ('EUR', '2024-03-08', '2024-03-15')
+    assert second[('EUR', SATURDAY)] == first[('EUR', SATURDAY)]
+    assert second[('EUR', TODAY)] == pytest.approx(first[('EUR', TODAY)] + 0.01)
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from datetime import datetime
+
+from mock_wise import MockWiseServer
+from recharge_wise.rate_limiter import RateLimiter
+from recharge_wise.statement_stream import fetch_statement_stream
+from recharge_wise.wise_client import WiseClient, check_interval, interval_end, split_interval
+
+
+def test_split_interval_into_months():
+    assert split_interval('2024-01-15T00:00:00.000Z', '2024-03-10T12:00:00.000Z') == [
+        ('2024-01-15T00:00:00.000Z', '2024-01-31T23:59:59.999Z'),
+        ('2024-02-01T00:00:00.000Z', '2024-02-29T23:59:59.999Z'),
+        ('2024-03-01T00:00:00.000Z', '2024-03-10T12:00:00.000Z'),
+    ]
+    assert split_interval('2024-01-15T00:00:00.000Z', '2024-03-10T12:00:00.000Z', 2) == [
+        ('2024-01-15T00:00:00.000Z', '2024-02-29T23:59:59.999Z'),
+        ('2024-03-01T00:00:00.000Z', '2024-03-10T12:00:00.000Z'),
+    ]
+
+
+@pytest.mark.parametrize('window_months', [0, -1])
+def test_split_interval_rejects_empty_windows(window_months):
+    with pytest.raises(ValueError, match='at least one month'):
+        split_interval('2024-01-01', '2024-03-01', window_months)
+
+
+def test_bare_end_date_includes_the_whole_day():
+    assert interval_end('2024-01-31') == '2024-01-31T23:59:59.999Z'
+    assert interval_end('2024-01-31T12:00:00.000Z') == '2024-01-31T12:00:00.000Z'
+    assert interval_end(None) is None
+    assert check_interval('2024-01-31', '2024-01-31') == (datetime(2024, 1, 31),
+                                                         datetime(2024, 1, 31, 23, 59, 59, 999000))
+    assert split_interval('2024-01-01', '2024-02-15') == [
+        ('2024-01-01T00:00:00.000Z', '2024-01-31T23:59:59.999Z'),
+        ('2024-02-01T00:00:00.000Z', '2024-02-15T23:59:59.999Z'),
+    ]
+
+
+def test_fetch_with_bare_dates_includes_the_last_day():
+    with MockWiseServer(profiles=1, currencies=('GBP',), transactions_per_day=24) as server, \
+            WiseClient('test', base_url=server.url, rate_limiter=RateLimiter(rate=1e6, burst=1e6)) as client:
+        profile_id = server.profile_ids()[0]
+        balance_id = server.balances(profile_id)[0]['id']
+        statement = fetch_statement_stream(client, profile_id, balance_id, 'GBP', '2024-01-30', '2024-01-31')
+        statement.close()
+    assert len(statement.columns) == 2 * 24
+    assert server.statement_requests == [('v3', balance_id, '2024-01-30T00:00:00.000Z', '2024-01-31T23:59:59.999Z')]
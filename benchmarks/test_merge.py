@@ -0,0 +1,117 @@
+import copy
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+
+from mock_wise import make_statement
+from recharge_wise.statement_model import ColumnSortProxyModel, TransactionTableModel
+from recharge_wise.statement_parser import COLUMN_HEADERS, StatementColumns, parse_transactions, summarize
+
+
+@pytest.fixture(scope='module', autouse=True)
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def shift_date(date, hours):
+    shifted = datetime.strptime(date, '%Y-%m-%dT%H:%M:%S.%fZ') + timedelta(hours=hours)
+    return shifted.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def change(transaction, rng):
+    """Return a copy of ``transaction`` as a later fetch might report it."""
+    transaction = copy.deepcopy(transaction)
+    for field in rng.sample(('amount', 'type', 'description', 'date', 'fees'), rng.randint(1, 3)):
+        if field == 'amount':
+            sign = -1 if transaction['type'] == 'DEBIT' else 1
+            transaction['amount']['value'] = sign * round(rng.uniform(0.01, 5000), 2)
+        elif field == 'type':
+            transaction['type'] = 'CREDIT' if transaction['type'] == 'DEBIT' else 'DEBIT'
+            transaction['amount']['value'] = -transaction['amount']['value']
+        elif field == 'description':
+            transaction['details']['description'] += ' (settled)'
+        elif field == 'date':
+            transaction['date'] = shift_date(transaction['date'], rng.randint(-48, 48))
+        else:
+            transaction['totalFees'] = {'value': round(rng.uniform(0, 20), 2), 'currency': rng.choice(('GBP', 'USD'))}
+    return transaction
+
+
+def refetched(transactions, rng):
+    """A later fetch: some rows changed, some unchanged, some missing, new ones added."""
+    kept = rng.sample(transactions, len(transactions) // 2)
+    newer = make_statement(1, 'GBP', '2024-02-01T00:00:00.000Z', '2024-02-03T23:59:59.999Z',
+                           rng.randint(1, 30))['transactions']
+    newer = [change(t, rng) if rng.random() < 0.3 else t for t in newer]
+    result = [change(t, rng) if rng.random() < 0.4 else t for t in kept] + newer
+    rng.shuffle(result)
+    return result
+
+
+def apply_fetch(transactions, fetched):
+    """What the merged table should hold: rows updated in place, new ones appended in fetch order."""
+    expected = list(transactions)
+    rows = {t['referenceNumber']: row for row, t in enumerate(expected)}
+    for transaction in fetched:
+        row = rows.get(transaction['referenceNumber'])
+        if row is None:
+            expected.append(transaction)
+        else:
+            expected[row] = transaction
+    return expected
+
+
+def make_models(columns, sort_column, order):
+    model = TransactionTableModel()
+    proxy = ColumnSortProxyModel()
+    proxy.setSourceModel(model)
+    model.set_columns(columns)
+    proxy.sort(sort_column, order)
+    return model, proxy
+
+
+def summary_state(summary):
+    return (summary.total_transactions, summary.type_counts, summary.detail_type_counts,
+            summary.by_currency, summary.by_day)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_merge_matches_fresh_load(seed):
+    rng = random.Random(seed)
+    transactions = make_statement(1, 'GBP', '2024-01-01T00:00:00.000Z', '2024-01-31T23:59:59.999Z',
+                                  rng.randint(1, 20))['transactions']
+    fetched = refetched(transactions, rng)
+    sort_column = rng.randrange(-1, len(COLUMN_HEADERS))
+    order = rng.choice((Qt.AscendingOrder, Qt.DescendingOrder))
+
+    model, proxy = make_models(parse_transactions(transactions), sort_column, order)
+    summary = summarize(model.columns, 'GBP')
+    model.merge_columns(parse_transactions(fetched), summary)
+
+    expected = parse_transactions(apply_fetch(transactions, fetched))
+    fresh_model, fresh_proxy = make_models(expected, sort_column, order)
+    assert model.rowCount() == fresh_model.rowCount()
+    for column in range(len(COLUMN_HEADERS)):
+        assert [model.display_value(row, column) for row in range(model.rowCount())] == \
+            [fresh_model.display_value(row, column) for row in range(fresh_model.rowCount())]
+    assert [proxy.mapToSource(proxy.index(position, 0)).row() for position in range(proxy.rowCount())] == \
+        [fresh_proxy.mapToSource(fresh_proxy.index(position, 0)).row() for position in range(fresh_proxy.rowCount())]
+    assert summary_state(summary) == summary_state(summarize(expected, 'GBP'))
+
+
+@pytest.mark.parametrize('transactions', [0, 3])
+def test_proxy_headers(transactions):
+    columns = StatementColumns()
+    if transactions:
+        columns = parse_transactions(make_statement(1, 'GBP', '2024-01-01T00:00:00.000Z',
+                                                    '2024-01-01T23:59:59.999Z', transactions)['transactions'])
+    model, proxy = make_models(columns, 0, Qt.DescendingOrder)
+    assert [proxy.headerData(section, Qt.Horizontal) for section in range(proxy.columnCount())] == COLUMN_HEADERS
+    assert [proxy.headerData(section, Qt.Vertical) for section in range(proxy.rowCount())] == \
+        list(range(1, transactions + 1))
@@ -0,0 +1,69 @@
+import json
+import tracemalloc
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from mock_wise import mock_rate
+from recharge_wise.statement_parser import (MS_PER_DAY, ConsolidatedSummary, parse_transactions,
+                                            summarize)
+from recharge_wise.statement_stream import load_statement_files
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_stream_parse(benchmark, statement_file, n):
+    path = statement_file(n)
+    header, columns = benchmark(load_statement_files, [path])
+    assert len(columns) == n
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_json_load_parse(benchmark, statement_file, n):
+    path = statement_file(n)
+
+    def parse():
+        with open(path) as fp:
+            return parse_transactions(json.load(fp)['transactions'])
+
+    assert len(benchmark(parse)) == n
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_summarize(benchmark, synthetic_statement, n):
+    columns = parse_transactions(synthetic_statement(n)['transactions'])
+    summary = benchmark(summarize, columns, 'GBP')
+    assert summary.total_transactions == n
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_consolidate(benchmark, synthetic_statement, n):
+    columns = parse_transactions(synthetic_statement(n)['transactions'])
+
+    def consolidate():
+        summary = ConsolidatedSummary('USD').update(columns)
+        rates = {(currency, day): mock_rate(currency, 'USD', day // MS_PER_DAY)
+                 for currency, day in summary.rate_keys()}
+        return summary.convert(rates)
+
+    summary = benchmark(consolidate)
+    assert summary.total_transactions == n
+    assert summary.total_credits > 0
+
+
+@pytest.mark.parametrize('n', [100_000])
+def test_stream_parse_peak_memory(benchmark, statement_file, n):
+    path = statement_file(n)
+
+    def parse():
+        tracemalloc.start()
+        try:
+            load_statement_files([path])
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    peak = benchmark.pedantic(parse, rounds=1, iterations=1)
+    benchmark.extra_info['peak_memory_mb'] = peak / 1e6
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+
+from recharge_wise.rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE, RateLimiter
+
+
+class Clock:
+    """Manually advanced clock for ``RateLimiter(clock=...)``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def advance(limiter, clock, seconds):
+    clock.now += seconds
+    with limiter.condition:
+        limiter.condition.notify_all()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def start_acquire(limiter, priority, served):
+    thread = threading.Thread(target=lambda: (limiter.acquire(priority), served.append(priority)), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_waiters_are_served_by_priority():
+    clock = Clock()
+    limiter = RateLimiter(rate=1, burst=1, clock=clock)
+    limiter.acquire()
+    served = []
+    threads = [start_acquire(limiter, PRIORITY_BULK, served)]
+    wait_for(lambda: len(limiter.waiters) == 1)
+    threads.append(start_acquire(limiter, PRIORITY_INTERACTIVE, served))
+    wait_for(lambda: len(limiter.waiters) == 2)
+
+    advance(limiter, clock, 1)
+    wait_for(lambda: len(served) == 1)
+    assert served == [PRIORITY_INTERACTIVE]
+    advance(limiter, clock, 1)
+    for thread in threads:
+        thread.join(5)
+    assert served == [PRIORITY_INTERACTIVE, PRIORITY_BULK]
+
+
+def test_429_halves_the_rate_and_pauses_for_retry_after():
+    clock = Clock()
+    limiter = RateLimiter(rate=4, burst=4, clock=clock)
+    limiter.observe(429, {'Retry-After': '3'})
+    assert limiter.rate == 2
+    assert limiter.tokens == 0
+    assert limiter.paused_until == 3
+
+    served = []
+    thread = start_acquire(limiter, PRIORITY_BULK, served)
+    # Tokens have refilled after two seconds, but the pause still holds
+    advance(limiter, clock, 2)
+    wait_for(lambda: limiter.tokens == 4)
+    assert served == []
+    advance(limiter, clock, 1)
+    thread.join(5)
+    assert served == [PRIORITY_BULK]
+
+
+def test_429_without_retry_after_pauses_for_one_token():
+    clock = Clock()
+    limiter = RateLimiter(rate=4, burst=4, clock=clock)
+    limiter.observe(429, {})
+    assert limiter.paused_until == pytest.approx(0.5)
+
+
+def test_5xx_retry_after_pauses_without_slowing_down():
+    clock = Clock()
+    limiter = RateLimiter(rate=4, burst=4, clock=clock)
+    limiter.observe(503, {'Retry-After': '2'})
+    assert limiter.paused_until == 2
+    assert limiter.rate == 4
+    limiter.observe(500, {})
+    assert limiter.paused_until == 2
+
+
+def test_rate_limit_headers_cap_tokens():
+    clock = Clock()
+    limiter = RateLimiter(rate=4, burst=10, clock=clock)
+    limiter.observe(200, {'X-RateLimit-Remaining': '3'})
+    assert limiter.tokens == 3
+    limiter.observe(200, {'RateLimit-Remaining': '0', 'RateLimit-Reset': '5'})
+    assert limiter.tokens == 0
+    assert limiter.paused_until == 5
+
+
+def test_client_waits_for_5xx_retry_after_in_the_limiter():
+    pytest.importorskip('requests')
+    from mock_wise import MockWiseServer
+    from recharge_wise.wise_client import WiseClient
+
+    limiter = RateLimiter(rate=1e6, burst=1e6)
+    with MockWiseServer(profiles=1, rate_limit_every=2, rate_limit_status=503, retry_after=1) as server, \
+            WiseClient('test', base_url=server.url, rate_limiter=limiter) as client:
+        client.profiles()
+        started = time.monotonic()
+        accounts = client.borderless_accounts(server.profile_ids()[0])
+        assert time.monotonic() - started >= 1
+        assert limiter.paused_until > started
+        assert accounts[0]['balances'] == server.balances(server.profile_ids()[0])
+        assert server.request_count == 3
+
+
+def test_async_engine_waits_for_5xx_retry_after_in_the_limiter():
+    pytest.importorskip('httpx')
+    import asyncio
+
+    from mock_wise import MockWiseServer
+    from recharge_wise.async_engine import AsyncWiseEngine
+    from recharge_wise.metrics import MetricsRegistry
+
+    limiter = RateLimiter(rate=1e6, burst=1e6)
+    metrics = MetricsRegistry()
+
+    async def fetch(server):
+        async with AsyncWiseEngine('test', base_url=server.url, rate_limiter=limiter, metrics=metrics) as engine:
+            await engine.profiles()
+            started = time.monotonic()
+            balances = await engine.balances(server.profile_ids()[0])
+            return started, balances
+
+    with MockWiseServer(profiles=1, rate_limit_every=2, rate_limit_status=503, retry_after=1) as server:
+        started, balances = asyncio.run(fetch(server))
+        assert time.monotonic() - started >= 1
+        assert limiter.paused_until > started
+        profile_balances = server.balances(server.profile_ids()[0])
+        assert balances == [(balance['id'], balance['currency']) for balance in profile_balances]
+        assert server.request_count == 3
+    requests = [timing for timing in metrics.recent_timings() if timing.operation == 'request']
+    assert [timing.counts.get('retries', 0) for timing in requests] == [0, 1]
+    assert [timing.labels['status'] for timing in requests] == ['200', '200']
+
+
+def test_interactive_client_overtakes_queued_bulk_requests():
+    pytest.importorskip('requests')
+    from mock_wise import MockWiseServer
+    from recharge_wise.wise_client import WiseClient
+
+    clock = Clock()
+    limiter = RateLimiter(rate=1, burst=1, clock=clock)
+    limiter.acquire()
+    done = []
+
+    def fetch(client, label):
+        client.borderless_accounts(server.profile_ids()[0])
+        done.append(label)
+
+    with MockWiseServer(profiles=1) as server, \
+            WiseClient('test', base_url=server.url, rate_limiter=limiter, priority=PRIORITY_INTERACTIVE) as client:
+        # Background work such as an auto-refresh queues first, on the same session and limiter
+        background = client.with_priority(PRIORITY_BULK)
+        assert background.session is client.session and background.priority == PRIORITY_BULK
+        threads = []
+        for index in range(2):
+            threads.append(threading.Thread(target=fetch, args=(background, f"bulk {index}"), daemon=True))
+            threads[-1].start()
+            wait_for(lambda: len(limiter.waiters) == index + 1)
+        threads.append(threading.Thread(target=fetch, args=(client, 'click'), daemon=True))
+        threads[-1].start()
+        wait_for(lambda: len(limiter.waiters) == 3)
+
+        for expected in (['click'], ['click', 'bulk 0'], ['click', 'bulk 0', 'bulk 1']):
+            advance(limiter, clock, 1)
+            wait_for(lambda: len(done) == len(expected))
+            assert done == expected
+        for thread in threads:
+            thread.join(5)
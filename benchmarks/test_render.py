@@ -0,0 +1,203 @@
+import copy
+import sqlite3
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from mock_wise import MockWiseServer
+from recharge_wise.rate_limiter import RateLimiter
+from recharge_wise.statement_cache import StatementCache
+from recharge_wise.statement_parser import parse_transactions
+from recharge_wise.statement_stream import StreamedStatement
+from recharge_wise.transaction_store import TransactionStore
+from recharge_wise.wise_client import WiseClient
+
+SIZES = [1_000, 10_000, 100_000]
+
+YEAR = ('2024-01-01T00:00:00.000Z', '2024-12-31T23:59:59.999Z')
+
+
+@pytest.fixture(scope='module')
+def window():
+    from recharge_wise import main
+
+    app = QApplication.instance() or QApplication([])
+    window = main.WiseAPITester()
+    window.show()
+    app.processEvents()
+    yield window
+    window.close()
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_render_statement(benchmark, window, synthetic_statement, n, monkeypatch):
+    errors = []
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: errors.append(args[2]))
+    data = synthetic_statement(n)
+    header = {k: v for k, v in data.items() if k != 'transactions'}
+    columns = parse_transactions(data['transactions'])
+    app = QApplication.instance()
+
+    def render():
+        window.display_formatted_statement(header, columns)
+        app.processEvents()
+
+    benchmark.pedantic(render, rounds=3, iterations=1)
+    assert not errors
+    assert window.transactions_model.rowCount() == n
+
+
+@pytest.mark.parametrize('n', SIZES)
+def test_refresh_statement(benchmark, window, synthetic_statement, n, monkeypatch):
+    errors = []
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: errors.append(args[2]))
+    data = synthetic_statement(n)
+    header = {k: v for k, v in data.items() if k != 'transactions'}
+    # The newest 1% of transactions arrive on the refresh
+    new = max(1, n // 100)
+    app = QApplication.instance()
+
+    def setup():
+        window.display_formatted_statement(header, parse_transactions(data['transactions'][new:]))
+        app.processEvents()
+        return (header, parse_transactions(data['transactions']), True), {}
+
+    def refresh(header, columns, merge):
+        window.display_formatted_statement(header, columns, merge)
+        app.processEvents()
+
+    benchmark.pedantic(refresh, setup=setup, rounds=3, iterations=1)
+    assert not errors
+    assert window.transactions_model.rowCount() == n
+    assert window.statement_summary.total_transactions == n
+
+
+@pytest.mark.parametrize('column', [0, 1, 7], ids=['date', 'type', 'exchange_rate'])
+def test_refresh_changed_rows(benchmark, window, synthetic_statement, column, monkeypatch):
+    errors = []
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: errors.append(args[2]))
+    n = 100_000
+    data = synthetic_statement(n)
+    header = {k: v for k, v in data.items() if k != 'transactions'}
+    # Every 50th transaction comes back with its type flipped
+    refreshed = list(data['transactions'])
+    for row in range(0, n, 50):
+        transaction = copy.deepcopy(refreshed[row])
+        transaction['type'] = 'CREDIT' if transaction['type'] == 'DEBIT' else 'DEBIT'
+        transaction['amount']['value'] = -transaction['amount']['value']
+        refreshed[row] = transaction
+    app = QApplication.instance()
+
+    def setup():
+        window.display_formatted_statement(header, parse_transactions(data['transactions']))
+        window.transactions_table.sortByColumn(column, Qt.AscendingOrder)
+        app.processEvents()
+        return (header, parse_transactions(refreshed), True), {}
+
+    def refresh(header, columns, merge):
+        return window.display_formatted_statement(header, columns, merge)
+
+    counts = benchmark.pedantic(refresh, setup=setup, rounds=3, iterations=1)
+    app.processEvents()
+    assert not errors
+    assert counts == (0, n // 50)
+    proxy = window.transactions_table.model()
+    keys = window.transactions_model.sort_keys(column)
+    ordered = [keys[proxy.mapToSource(proxy.index(position, 0)).row()] for position in range(proxy.rowCount())]
+    assert ordered == sorted(ordered)
+
+
+def test_superseded_statement_fetch_is_dropped(window, tmp_path, monkeypatch):
+    errors = []
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: errors.append(args[2]))
+    store = TransactionStore(str(tmp_path / 'transactions.db'))
+    monkeypatch.setattr(window, 'transaction_store', store)
+    window.cache_checkbox.setChecked(False)
+    app = QApplication.instance()
+    try:
+        with MockWiseServer(profiles=1, currencies=('GBP', 'EUR'), transactions_per_day=100,
+                            latency=0.05) as server:
+            client = WiseClient('test', base_url=server.url, rate_limiter=RateLimiter(rate=1e6, burst=1e6))
+            profile_id = server.profile_ids()[0]
+            gbp, eur = (balance['id'] for balance in server.balances(profile_id))
+            # A year of GBP is still downloading when a single EUR day is asked for
+            window.start_statement_fetch((client, profile_id, gbp, 'GBP', *YEAR, 'v3'))
+            request = (client, profile_id, eur, 'EUR', '2024-03-01T00:00:00.000Z',
+                       '2024-03-01T23:59:59.999Z', 'v3')
+            window.start_statement_fetch(request)
+            window.thread_pool.waitForDone()
+            app.processEvents()
+            # Let the indexing started by the result finish before the store closes
+            window.thread_pool.waitForDone()
+            app.processEvents()
+            client.close()
+    finally:
+        window.cache_checkbox.setChecked(True)
+        store.close()
+    assert not errors
+    assert window.statement_request == request
+    assert window.transactions_model.rowCount() == 100
+    assert set(window.transactions_model.columns.decoded('currency')) == {'EUR'}
+
+
+def test_late_cancelled_statement_fetch_is_closed(window, tmp_path, monkeypatch):
+    errors = []
+    monkeypatch.setattr(QMessageBox, 'critical', lambda *args: errors.append(args[2]))
+    raw = tmp_path / 'window-0.json'
+    raw.write_text('{}')
+    previous = window.statement_request
+    statement = StreamedStatement({}, parse_transactions([]), [str(raw)])
+
+    def work(worker):
+        # The cancel lands after the fetch's own last check
+        worker.cancel()
+        return statement, None, None, []
+
+    window.start_statement_worker(work, ('late',), False, 'late cancel')
+    window.thread_pool.waitForDone()
+    QApplication.instance().processEvents()
+    assert not errors
+    assert not raw.exists()
+    assert window.statement_request == previous
+    assert window.status_label.text() == "Fetching statement cancelled."
+
+
+def test_close_stops_workers_before_closing_stores(tmp_path, monkeypatch):
+    from recharge_wise import main
+
+    app = QApplication.instance() or QApplication([])
+    window = main.WiseAPITester()
+    window.show()
+    window.statement_cache = StatementCache(str(tmp_path / 'cache.db'))
+    window.transaction_store = TransactionStore(str(tmp_path / 'transactions.db'))
+    closed = []
+    monkeypatch.setattr(window.get_client(), 'close', lambda: closed.append('client'))
+    started = threading.Event()
+    seen = []
+
+    def work(worker):
+        started.set()
+        deadline = time.monotonic() + 5
+        while not worker.is_cancelled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Still running when the window closes, so the store must be open
+        seen.append(window.transaction_store.connection.execute('SELECT 1').fetchone())
+
+    worker = window.start_worker(work, lambda result: None, lambda e: None)
+    assert started.wait(5)
+    window.close()
+    app.processEvents()
+    assert worker.is_cancelled
+    assert seen == [(1,)]
+    assert closed == ['client']
+    assert not window.clients
+    for store in (window.statement_cache, window.transaction_store):
+        with pytest.raises(sqlite3.ProgrammingError):
+            store.connection.execute('SELECT 1')
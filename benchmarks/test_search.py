@@ -0,0 +1,83 @@
+import pytest
+
+from recharge_wise.statement_parser import parse_transactions
+from recharge_wise.transaction_store import TransactionStore
+
+
+def transfer(reference, date, value, description, recipient='Acme Ltd'):
+    return {
+        'type': 'CREDIT' if value > 0 else 'DEBIT',
+        'date': date,
+        'amount': {'value': value, 'currency': 'GBP'},
+        'totalFees': {'value': 0, 'currency': 'GBP'},
+        'details': {'type': 'TRANSFER', 'description': description,
+                    'recipient': {'name': recipient, 'bankAccount': 'GB00001234'}},
+        'exchangeDetails': None,
+        'runningBalance': {'value': 0, 'currency': 'GBP'},
+        'referenceNumber': reference,
+    }
+
+
+TRANSACTIONS = [
+    transfer('TX-1', '2023-12-30T12:00:00.000Z', 500.00, 'Payroll December'),
+    transfer('TX-2', '2023-12-31T00:00:00.000Z', -1000.00, 'Office rent', recipient='Landlord Properties'),
+    transfer('TX-3', '2023-12-31T18:30:00.000Z', -1500.50, 'Payroll bonus'),
+    transfer('TX-4', '2024-01-01T00:00:00.000Z', 999.99, 'Refund'),
+    transfer('TX-5', '2024-01-01T09:00:00.000Z', -2000.00, 'payroll January'),
+]
+
+
+@pytest.fixture(params=[True, False], ids=['fts', 'like'])
+def store(request, tmp_path):
+    store = TransactionStore(str(tmp_path / 'transactions.sqlite3'))
+    store.add_columns('sandbox', 1, 10, parse_transactions(TRANSACTIONS))
+    # Without FTS5 the store falls back to LIKE matching
+    store.full_text = store.full_text and request.param
+    yield store
+    store.close()
+
+
+def references(store, **filters):
+    return store.search(**filters).reference
+
+
+@pytest.mark.parametrize('filters, expected', [
+    (dict(start='2023-12-31'), ['TX-5', 'TX-4', 'TX-3', 'TX-2']),
+    (dict(start='2023-12-31T00:00:00.001Z'), ['TX-5', 'TX-4', 'TX-3']),
+    (dict(end='2023-12-31'), ['TX-2', 'TX-1']),
+    (dict(start='2023-12-31', end='2023-12-31T23:59:59.999'), ['TX-3', 'TX-2']),
+    (dict(start='2023-12-31T19:30:00+01:00', end='2024-01-01T09:00:00Z'), ['TX-5', 'TX-4', 'TX-3']),
+])
+def test_search_dates(store, filters, expected):
+    assert references(store, **filters) == expected
+
+
+@pytest.mark.parametrize('filters, expected', [
+    (dict(min_amount=1000), ['TX-5', 'TX-3', 'TX-2']),
+    (dict(max_amount=999.99), ['TX-4', 'TX-1']),
+    (dict(min_amount=1000, max_amount=1500.50), ['TX-3', 'TX-2']),
+    (dict(min_amount=999.995, max_amount=1999.99), ['TX-3', 'TX-2']),
+    (dict(min_amount=1000, types=['CREDIT']), []),
+])
+def test_search_amounts(store, filters, expected):
+    assert references(store, **filters) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('payroll', ['TX-5', 'TX-3', 'TX-1']),
+    ('PAY', ['TX-5', 'TX-3', 'TX-1']),
+    ('payroll bonus', ['TX-3']),
+    ('landlord', ['TX-2']),
+    ('TX-4', ['TX-4']),
+    ('invoice', []),
+])
+def test_search_text(store, text, expected):
+    assert references(store, text=text) == expected
+
+
+def test_search_combined(store):
+    assert references(store, text='payroll', start='2023-12-31', end='2023-12-31T23:59:59.999',
+                      min_amount=1000) == ['TX-3']
+    assert references(store, text='payroll', limit=2) == ['TX-5', 'TX-3']
+    assert references(store, profile_id=1, balance_id=10) == ['TX-5', 'TX-4', 'TX-3', 'TX-2', 'TX-1']
+    assert references(store, balance_id=11) == []
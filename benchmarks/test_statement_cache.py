@@ -0,0 +1,101 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('requests')
+
+from mock_wise import MockWiseServer
+from recharge_wise.rate_limiter import RateLimiter
+from recharge_wise.statement_cache import StatementCache
+from recharge_wise.wise_client import WiseClient
+
+QUARTER = ('2024-01-01T00:00:00.000Z', '2024-03-31T23:59:59.999Z')
+
+
+@pytest.fixture
+def server():
+    with MockWiseServer(profiles=1, currencies=('GBP',), transactions_per_day=20) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    with WiseClient('test', base_url=server.url, rate_limiter=RateLimiter(rate=1e6, burst=1e6)) as client:
+        yield client
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = StatementCache(str(tmp_path / 'statements.sqlite3'))
+    yield cache
+    cache.close()
+
+
+def balance(server):
+    profile_id = server.profile_ids()[0]
+    return profile_id, server.balances(profile_id)[0]['id'], 'GBP'
+
+
+def fetch(cache, client, server, now, api_version='v3'):
+    server.statement_requests.clear()
+    statement = cache.fetch_statement(client, *balance(server), *QUARTER, api_version=api_version, now=now)
+    statement.close()
+    return statement
+
+
+def assert_matches_fresh_fetch(statement, client, server):
+    fresh = client.statement(*balance(server), *QUARTER)
+    assert statement.columns.reference == [t['referenceNumber'] for t in fresh['transactions']]
+    assert statement.header['startOfStatementBalance'] == fresh['startOfStatementBalance']
+    assert statement.header['endOfStatementBalance'] == fresh['endOfStatementBalance']
+
+
+def test_closed_windows_are_served_from_cache(cache, client, server):
+    now = datetime(2024, 6, 1)
+    first = fetch(cache, client, server, now)
+    assert len(server.statement_requests) == 3
+    second = fetch(cache, client, server, now)
+    assert server.statement_requests == []
+    assert second.header == first.header
+    assert second.columns.reference == first.columns.reference
+    assert_matches_fresh_fetch(second, client, server)
+
+
+def test_open_window_only_fetches_its_tail(cache, client, server):
+    fetch(cache, client, server, datetime(2024, 3, 15, 12))
+    assert len(server.statement_requests) == 3
+    march = client.statement(*balance(server), '2024-03-01T00:00:00.000Z', QUARTER[1])
+    last_cached = max(t['date'] for t in march['transactions'])
+
+    # February is settled by now; March is still open and re-fetched from its last transaction
+    second = fetch(cache, client, server, datetime(2024, 3, 20))
+    assert server.statement_requests == [('v3', balance(server)[1], last_cached, QUARTER[1])]
+    assert_matches_fresh_fetch(second, client, server)
+
+    # Once March has settled, nothing is fetched again
+    fetch(cache, client, server, datetime(2024, 4, 10))
+    assert len(server.statement_requests) == 1
+    third = fetch(cache, client, server, datetime(2024, 4, 11))
+    assert server.statement_requests == []
+    assert_matches_fresh_fetch(third, client, server)
+
+
+def test_api_versions_are_cached_separately(cache, client, server):
+    now = datetime(2024, 6, 1)
+    fetch(cache, client, server, now, api_version='v3')
+    fetch(cache, client, server, now, api_version='v1')
+    assert [request[0] for request in server.statement_requests] == ['v1'] * 3
+    fetch(cache, client, server, now, api_version='v1')
+    assert server.statement_requests == []
+
+
+def test_cache_from_older_schema_is_replaced(tmp_path, client, server):
+    path = str(tmp_path / 'statements.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE statement_windows (environment TEXT, header TEXT)')
+        connection.execute("INSERT INTO statement_windows VALUES ('sandbox', '{}')")
+    with StatementCache(path) as cache:
+        assert_matches_fresh_fetch(fetch(cache, client, server, datetime(2024, 6, 1)), client, server)
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.connection.execute('SELECT 1')
@@ -0,0 +1,62 @@
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from mock_wise import make_statement
+from recharge_wise.statement_parser import parse_transactions
+from recharge_wise.transaction_store import TransactionStore
+
+CURRENCIES = ('GBP', 'EUR', 'USD', 'CHF')
+# About 250k rows: one year per balance at 170 transactions a day
+TRANSACTIONS_PER_DAY = 170
+
+CONVERSION_DEBITS = dict(types=['DEBIT'], detail_types=['CONVERSION'], currencies=['EUR'], min_amount=1000,
+                        start='2024-01-01', end='2024-06-30')
+
+QUERIES = {
+    'conversion_debits': dict(CONVERSION_DEBITS, text='conversion 17'),
+    # A word in a quarter of all rows: the full-text side dominates
+    'conversion_debits_broad_text': dict(CONVERSION_DEBITS, text='conversion'),
+    'text_prefix': dict(text='recipient 42', limit=100),
+    'amount_range': dict(min_amount=1999, max_amount=1999.5),
+    'one_day': dict(start='2024-03-01', end='2024-03-01T23:59:59.999'),
+}
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    store = TransactionStore(str(tmp_path_factory.mktemp('store') / 'transactions.sqlite3'))
+    for balance_id, currency in enumerate(CURRENCIES, 100):
+        data = make_statement(balance_id, currency, '2024-01-01T00:00:00.000Z', '2024-12-31T23:59:59.999Z',
+                              TRANSACTIONS_PER_DAY)
+        store.add_columns('sandbox', 1, balance_id, parse_transactions(data['transactions']))
+    yield store
+    store.close()
+
+
+def test_index_statement(benchmark, tmp_path):
+    data = make_statement(1, 'GBP', '2024-01-01T00:00:00.000Z', '2024-03-31T23:59:59.999Z', 1000)
+    columns = parse_transactions(data['transactions'])
+
+    def index():
+        with TransactionStore(str(tmp_path / f"index-{len(list(tmp_path.iterdir()))}.sqlite3")) as store:
+            store.add_columns('sandbox', 1, 1, columns)
+
+    benchmark.pedantic(index, rounds=3, iterations=1)
+    benchmark.extra_info['transactions'] = len(columns)
+
+
+def test_reindex_unchanged_statement(benchmark, store):
+    data = make_statement(100, 'GBP', '2024-01-01T00:00:00.000Z', '2024-03-31T23:59:59.999Z', TRANSACTIONS_PER_DAY)
+    columns = parse_transactions(data['transactions'])
+    count = store.count()
+    benchmark.pedantic(lambda: store.add_columns('sandbox', 1, 100, columns), rounds=3, iterations=1)
+    assert store.count() == count
+
+
+@pytest.mark.parametrize('query', sorted(QUERIES))
+def test_search(benchmark, store, query):
+    columns = benchmark(lambda: store.search(**QUERIES[query]))
+    benchmark.extra_info['rows_searched'] = store.count()
+    benchmark.extra_info['matches'] = len(columns)
+    assert len(columns) > 0
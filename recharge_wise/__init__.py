@@ -0,0 +1,6 @@
+"""Recharge Wise: a desktop tool and batch exporter for Wise balance statements.
+
+The desktop tool lives in ``recharge_wise.main`` and the command line in
+``recharge_wise.cli``. Nothing is imported here, so starting either only
+loads the modules it needs.
+"""
@@ -0,0 +1,293 @@
+"""asyncio fetch engine for fanning out across many profiles and balances.
+
+Uses one ``httpx.AsyncClient`` (HTTP/2 when the ``h2`` package is installed)
+for every request, bounded by a single semaphore, and yields each balance's
+statement as soon as it has been downloaded and decoded.
+"""
+import asyncio
+import io
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from .metrics import Timing, endpoint_name, get_metrics
+from .rate_limiter import PRIORITY_BULK, get_rate_limiter, parse_retry_after
+from .statement_stream import StreamedStatement, load_statement_files
+from .wise_client import (CHUNK_SIZE, DEFAULT_TIMEOUT, DEFAULT_WINDOW_MONTHS, MAX_RATE_LIMIT_RETRIES,
+                         PRODUCTION_URL, RETRY_STATUSES, SANDBOX_URL, environment_name, split_interval)
+
+DEFAULT_CONCURRENCY = 8
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# httpcore trace events timed as request phases of their own
+TRACE_PHASES = {'connect_tcp': 'connect', 'start_tls': 'tls'}
+
+
+def trace_setup(timing):
+    """httpx ``trace`` extension adding connection setup phases to ``timing``."""
+    started = {}
+
+    async def trace(event_name, info):
+        name, _, state = event_name.rpartition('.')
+        phase = TRACE_PHASES.get(name.rpartition('.')[2])
+        if phase is None:
+            return
+        if state == 'started':
+            started[phase] = time.perf_counter()
+        elif phase in started:
+            timing.add(phase, time.perf_counter() - started.pop(phase))
+
+    return {'trace': trace}
+
+
+def connection_setup(timing):
+    return timing.phases.get('connect', 0.0) + timing.phases.get('tls', 0.0)
+
+
+class BalanceStatement:
+    """One balance's result from ``AsyncWiseEngine.iter_statements``.
+
+    Exactly one of ``statement`` (a ``StreamedStatement``) and ``error`` is set.
+    """
+
+    def __init__(self, profile_id, balance_id, currency, statement=None, error=None):
+        self.profile_id = profile_id
+        self.balance_id = balance_id
+        self.currency = currency
+        self.statement = statement
+        self.error = error
+
+
+class AsyncWiseEngine:
+    """Async counterpart of ``WiseClient`` for bulk, multi-account fetches.
+
+    Use as an async context manager. All requests share one connection pool
+    and at most ``concurrency`` are in flight; they also go through the same
+    per-token ``RateLimiter`` as the threaded client, and 429s and 5xx
+    errors are retried the same way.
+
+    Requests are recorded in ``metrics`` like ``WiseClient``'s, except that
+    new connections add ``connect`` and ``tls`` phases and ``headers`` is
+    the server time alone.
+    """
+
+    def __init__(self, token, sandbox=True, base_url=None, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, http2=HTTP2_AVAILABLE, priority=PRIORITY_BULK, rate_limiter=None,
+                 metrics=None, max_retries=3, backoff_factor=0.5):
+        self.base_url = base_url or (SANDBOX_URL if sandbox else PRODUCTION_URL)
+        self.rate_limiter = rate_limiter or get_rate_limiter(token, environment_name(self.base_url))
+        self.priority = priority
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.metrics = metrics or get_metrics()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+        connect_timeout, read_timeout = timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization': f'Bearer {token}'},
+            http2=http2,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+    @property
+    def environment(self):
+        return environment_name(self.base_url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        # An abandoned iter_statements loop is only finalized later, so
+        # cancel whatever it left running before the client goes away
+        await cancel_all(self.tasks)
+        await self.client.aclose()
+
+    async def acquire(self, timing):
+        # The limiter blocks, so wait for it off the event loop
+        with timing.phase('wait'):
+            await asyncio.to_thread(self.rate_limiter.acquire, self.priority)
+
+    async def download(self, path, fp, params=None, timing=None):
+        """Stream the body of a GET on ``path`` into the binary file ``fp``.
+
+        Recorded in ``metrics`` unless the caller passes its own ``timing``.
+        """
+        own_timing = timing is None
+        if own_timing:
+            timing = Timing('request', endpoint=endpoint_name(path), status='error')
+        queued = time.perf_counter()
+        try:
+            async with self.semaphore:
+                timing.add('wait', time.perf_counter() - queued)
+                rate_limited = failed = 0
+                while True:
+                    await self.acquire(timing)
+                    setup = connection_setup(timing)
+                    sent = time.perf_counter()
+                    backoff = None
+                    async with self.client.stream('GET', path, params=params,
+                                                  extensions=trace_setup(timing)) as response:
+                        # Connection setup is reported as its own phases
+                        timing.add('headers', time.perf_counter() - sent - (connection_setup(timing) - setup))
+                        timing.labels['status'] = str(response.status_code)
+                        self.rate_limiter.observe(response.status_code, response.headers)
+                        # Retried like WiseClient._send: a Retry-After pauses the
+                        # shared limiter, a 5xx without one backs off here only
+                        if response.status_code == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                            rate_limited += 1
+                        elif response.status_code in RETRY_STATUSES and failed < self.max_retries:
+                            if parse_retry_after(response.headers.get('Retry-After')) is None:
+                                backoff = self.backoff_factor * 2 ** failed
+                            failed += 1
+                        elif response.status_code >= 400:
+                            await response.aread()
+                            response.raise_for_status()
+                        else:
+                            received = 0
+                            with timing.phase('download'):
+                                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                                    fp.write(chunk)
+                                    received += len(chunk)
+                            timing.count('bytes', received)
+                            return response
+                        # Reading the short error body first lets the connection go back to the pool
+                        await response.aread()
+                    timing.count('retries')
+                    if backoff is not None:
+                        with timing.phase('wait'):
+                            await asyncio.sleep(backoff)
+        finally:
+            if own_timing:
+                self.metrics.record(timing)
+
+    async def get_json(self, path, params=None):
+        timing = Timing('request', endpoint=endpoint_name(path), status='error')
+        buffer = io.BytesIO()
+        try:
+            await self.download(path, buffer, params=params, timing=timing)
+            with timing.phase('decode'):
+                return json.loads(buffer.getvalue())
+        finally:
+            self.metrics.record(timing)
+
+    async def profiles(self):
+        return await self.get_json('/v2/profiles')
+
+    async def balances(self, profile_id):
+        """Return ``(balance_id, currency)`` for every balance of a profile."""
+        accounts = await self.get_json('/v1/borderless-accounts', params={'profileId': profile_id})
+        return [(balance['id'], balance['currency']) for account in accounts for balance in account['balances']]
+
+    async def statement(self, profile_id, balance_id, currency, start_date, end_date,
+                        api_version='v3', window_months=DEFAULT_WINDOW_MONTHS):
+        """Download all windows of a statement concurrently and decode them off the loop."""
+        path = f"/{api_version}/profiles/{profile_id}/balance-statements/{balance_id}/statement.json"
+        windows = split_interval(start_date, end_date, window_months)
+        timing = Timing('statement')
+        paths = []
+
+        async def fetch(window_start, window_end):
+            with tempfile.NamedTemporaryFile('wb', prefix='wise-statement-', suffix='.json', delete=False) as fp:
+                paths.append(fp.name)
+                await self.download(path, fp, params={
+                    'currency': currency,
+                    'intervalStart': window_start,
+                    'intervalEnd': window_end
+                })
+
+        try:
+            with timing.phase('download'):
+                await run_all([fetch(*window) for window in windows])
+            timing.count('bytes', sum(os.path.getsize(file_path) for file_path in paths))
+            with timing.phase('decode'):
+                header, columns = await asyncio.to_thread(load_statement_files, paths)
+            timing.count('rows', len(columns))
+        except BaseException:
+            for file_path in paths:
+                os.remove(file_path)
+            raise
+        self.metrics.record(timing)
+        return StreamedStatement(header, columns, paths)
+
+    async def iter_statements(self, start_date, end_date, profile_ids=None, currencies=None,
+                              api_version='v3', window_months=DEFAULT_WINDOW_MONTHS):
+        """Fan out over profiles and balances, yielding ``BalanceStatement``s as they complete.
+
+        Balance discovery and statement downloads all run concurrently. A
+        failed statement is yielded with ``error`` set; a failed profile or
+        balance lookup cancels everything still running and is raised.
+        Leaving the loop early cancels the outstanding work once the
+        generator is closed (``contextlib.aclosing``) or the engine is.
+        """
+        queue = asyncio.Queue()
+        tasks = set()
+
+        def spawn(coro):
+            task = asyncio.ensure_future(coro)
+            tasks.add(task)
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            task.add_done_callback(queue.put_nowait)
+
+        async def fetch_statement(profile_id, balance_id, currency):
+            try:
+                statement = await self.statement(profile_id, balance_id, currency, start_date, end_date,
+                                                 api_version=api_version, window_months=window_months)
+            except (httpx.HTTPError, ValueError) as e:
+                return BalanceStatement(profile_id, balance_id, currency, error=e)
+            return BalanceStatement(profile_id, balance_id, currency, statement=statement)
+
+        async def discover(profile_id):
+            for balance_id, currency in await self.balances(profile_id):
+                if not currencies or currency in currencies:
+                    spawn(fetch_statement(profile_id, balance_id, currency))
+
+        if profile_ids is None:
+            profile_ids = [profile['id'] for profile in await self.profiles()]
+        for profile_id in profile_ids:
+            spawn(discover(profile_id))
+
+        try:
+            while tasks:
+                task = await queue.get()
+                tasks.discard(task)
+                result = task.result()
+                if isinstance(result, BalanceStatement):
+                    yield result
+        finally:
+            await cancel_all(tasks)
+            # Statements that finished but were never handed out still own temp files
+            for task in tasks:
+                if not task.cancelled() and task.exception() is None:
+                    result = task.result()
+                    if isinstance(result, BalanceStatement) and result.statement is not None:
+                        result.statement.close()
+
+
+async def run_all(coros):
+    """Await coroutines concurrently; on the first failure cancel the rest and re-raise."""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        await cancel_all(tasks)
+
+
+async def cancel_all(tasks):
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
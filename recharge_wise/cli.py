@@ -0,0 +1,345 @@
+"""Headless batch exporter for Wise balance statements.
+
+Reuses the same client, statement cache and parser as the desktop tool
+without importing PyQt5, so it can run from cron on a server.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from .export import EXPORT_FORMATS, check_format, export_columns, write_csv_stream
+from .metrics import Timing, get_metrics, json_logger
+from .rate_limiter import DEFAULT_BURST, DEFAULT_RATE, RateLimiter
+from .statement_cache import StatementCache
+from .statement_parser import parse_date_ms
+from .statement_stream import fetch_statement_stream
+from .transaction_store import TransactionStore
+from .wise_client import DEFAULT_WINDOW_MONTHS, WiseClient, check_interval, interval_end
+
+DEFAULT_CONCURRENCY = 4
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def list_balances(client, profile_ids, executor):
+    """Return ``(profile_id, balance_id, currency)`` for every balance of every profile."""
+    futures = {executor.submit(client.borderless_accounts, profile_id): profile_id for profile_id in profile_ids}
+    balances = []
+    for future in as_completed(futures):
+        profile_id = futures[future]
+        for account in future.result():
+            for balance in account['balances']:
+                balances.append((profile_id, balance['id'], balance['currency']))
+    return sorted(balances, key=lambda b: (str(b[0]), str(b[1])))
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least one."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def positive_float(value):
+    """argparse type for rates that must be above zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid float value: {value!r}") from None
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be above 0, not {value}")
+    return number
+
+
+def setup_metrics(args):
+    if args.log_metrics:
+        get_metrics().listeners.append(json_logger(log))
+
+
+def write_metrics(args):
+    # Rewritten after every balance so a scraper can follow long runs
+    if args.metrics_file:
+        try:
+            get_metrics().write_prometheus(args.metrics_file)
+        except OSError as e:
+            log(f"Could not write {args.metrics_file}: {e}")
+
+
+def output_path(args, profile_id, balance_id, currency):
+    return os.path.join(args.output, f"{profile_id}_{balance_id}_{currency}.{args.format}")
+
+
+def save_columns(store, environment, args, profile_id, balance_id, currency, columns, timing):
+    """Index and write one balance's transactions, timing each step."""
+    if store is not None:
+        with timing.phase('index'):
+            store.add_columns(environment, profile_id, balance_id, columns)
+    path = output_path(args, profile_id, balance_id, currency)
+    with timing.phase('write'):
+        export_columns(columns, path, args.format)
+    timing.count('rows', len(columns))
+    return path
+
+
+def export_balance(client, cache, store, args, profile_id, balance_id, currency):
+    # Windows of one statement are fetched serially; concurrency comes from
+    # running balances side by side, so the total in-flight request count
+    # never exceeds --concurrency.
+    timing = Timing('export', format=args.format, status='failed')
+    try:
+        if cache is not None:
+            statement = cache.fetch_statement(client, profile_id, balance_id, currency, args.start, args.end,
+                                              window_months=args.window_months, max_workers=1)
+        else:
+            statement = fetch_statement_stream(client, profile_id, balance_id, currency, args.start, args.end,
+                                               window_months=args.window_months, max_workers=1)
+        statement.close()
+        columns = statement.columns
+
+        path = save_columns(store, client.environment, args, profile_id, balance_id, currency, columns, timing)
+        timing.labels['status'] = 'ok'
+        return path, len(columns)
+    finally:
+        get_metrics().record(timing)
+
+
+def run_export(args):
+    token = args.token or os.environ.get('WISE_API_TOKEN')
+    if not token:
+        log("error: pass --token or set WISE_API_TOKEN")
+        return 2
+    try:
+        check_format(args.format)
+    except ImportError as e:
+        log(f"error: {e}")
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    setup_metrics(args)
+    if args.engine == 'async' and args.cache:
+        log("error: --cache is not supported with --engine async")
+        return 2
+
+    if args.engine == 'async':
+        try:
+            import httpx
+        except ImportError:
+            log("error: --engine async requires httpx (pip install httpx)")
+            return 2
+        request_errors = httpx.HTTPError
+    else:
+        request_errors = requests.RequestException
+
+    cache = StatementCache(args.cache_path) if args.cache else None
+    store = TransactionStore(args.store_path) if args.index else None
+    try:
+        if args.engine == 'async':
+            failures = asyncio.run(export_async(args, token, store))
+        else:
+            failures = export_threaded(args, token, cache, store)
+    except request_errors as e:
+        # Failed statements are reported one by one; only profile and balance
+        # discovery raises. httpx adds a documentation link on a second line.
+        reason = str(e).partition('\n')[0]
+        log(f"error: could not list profiles and balances: {reason}")
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+    return 1 if failures else 0
+
+
+def export_threaded(args, token, cache=None, store=None):
+    """Export every balance on a thread pool and return the number that failed."""
+    failures = 0
+    with WiseClient(token, sandbox=not args.production, pool_size=max(args.concurrency, 1),
+                    rate_limiter=RateLimiter(args.rate, args.burst), base_url=args.base_url) as client, \
+            ThreadPoolExecutor(max_workers=max(args.concurrency, 1)) as executor:
+        profile_ids = args.profile or [profile['id'] for profile in client.profiles()]
+        balances = list_balances(client, profile_ids, executor)
+        if args.currency:
+            wanted = {currency.upper() for currency in args.currency}
+            balances = [b for b in balances if b[2] in wanted]
+        log(f"Exporting {len(balances)} balances from {len(profile_ids)} profiles")
+
+        futures = {
+            executor.submit(export_balance, client, cache, store, args, *balance): balance
+            for balance in balances
+        }
+        for future in as_completed(futures):
+            profile_id, balance_id, currency = futures[future]
+            try:
+                path, count = future.result()
+            except Exception as e:
+                failures += 1
+                log(f"FAILED profile {profile_id} balance {balance_id} ({currency}): {e}")
+            else:
+                log(f"{path}: {count} transactions")
+            write_metrics(args)
+
+    write_metrics(args)
+    return failures
+
+
+async def export_async(args, token, store=None):
+    from .async_engine import AsyncWiseEngine
+
+    failures = 0
+    profile_ids = args.profile
+    currencies = {currency.upper() for currency in args.currency} if args.currency else None
+    async with AsyncWiseEngine(token, sandbox=not args.production, base_url=args.base_url,
+                               concurrency=max(args.concurrency, 1),
+                               rate_limiter=RateLimiter(args.rate, args.burst)) as engine:
+        async for result in engine.iter_statements(args.start, args.end, profile_ids=profile_ids,
+                                                   currencies=currencies, window_months=args.window_months):
+            timing = Timing('export', format=args.format, status='failed')
+            if result.error is not None:
+                failures += 1
+                log(f"FAILED profile {result.profile_id} balance {result.balance_id} ({result.currency}): "
+                    f"{result.error}")
+            else:
+                result.statement.close()
+                columns = result.statement.columns
+                try:
+                    path = await asyncio.to_thread(save_columns, store, engine.environment, args,
+                                                   result.profile_id, result.balance_id, result.currency,
+                                                   columns, timing)
+                except (OSError, sqlite3.Error) as e:
+                    failures += 1
+                    log(f"FAILED writing {output_path(args, result.profile_id, result.balance_id, result.currency)}: "
+                        f"{e}")
+                else:
+                    timing.labels['status'] = 'ok'
+                    log(f"{path}: {len(columns)} transactions")
+            get_metrics().record(timing)
+            write_metrics(args)
+    write_metrics(args)
+    return failures
+
+
+def run_query(args):
+    if args.output:
+        try:
+            check_format(args.format)
+        except ImportError as e:
+            log(f"error: {e}")
+            return 2
+    with TransactionStore(args.store_path) as store:
+        columns = store.search(text=' '.join(args.text), start=args.start, end=args.end, types=args.type,
+                               detail_types=args.detail_type,
+                               currencies=[currency.upper() for currency in args.currency or ()],
+                               min_amount=args.min_amount, max_amount=args.max_amount,
+                               environment=args.environment, profile_id=args.profile,
+                               balance_id=args.balance, limit=args.limit)
+    if args.output:
+        export_columns(columns, args.output, args.format)
+        log(f"{args.output}: {len(columns)} transactions")
+    else:
+        write_csv_stream(columns, sys.stdout)
+    return 0
+
+
+def check_query_dates(start, end):
+    """Validate the ``query`` date bounds, raising ValueError with a readable message.
+
+    Returns ``(start, end)`` with a bare end date extended to the end of that day.
+    """
+    dates = []
+    for name, value, bound in (('start', start, start), ('end', end, interval_end(end))):
+        if value:
+            try:
+                parse_date_ms(bound)
+            except ValueError:
+                raise ValueError(f"Invalid {name} date {value!r}; expected an ISO date such as "
+                                 f"2024-01-01 or 2024-01-01T00:00:00.000Z") from None
+        dates.append(bound)
+    return tuple(dates)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='recharge_wise', description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help='Export statements for all profiles and balances')
+    export.add_argument('--token', help='Wise API token (default: $WISE_API_TOKEN)')
+    export.add_argument('--production', action='store_true', help='Use the production API instead of sandbox')
+    export.add_argument('--base-url', help='Override the API base URL, e.g. a local mock server')
+    export.add_argument('--start', required=True, help='Interval start, e.g. 2023-08-01T00:00:00.000Z')
+    export.add_argument('--end', required=True, help='Interval end, e.g. 2024-08-31T23:59:59.999Z')
+    export.add_argument('--profile', action='append', help='Only export this profile ID (repeatable)')
+    export.add_argument('--currency', action='append', help='Only export balances in this currency (repeatable)')
+    export.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    export.add_argument('--output', default='.', help='Directory to write one file per balance into')
+    export.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of requests in flight at once')
+    export.add_argument('--rate', type=positive_float, default=DEFAULT_RATE,
+                        help='Maximum requests per second; backs off below this on 429s (default: %(default)s)')
+    export.add_argument('--burst', type=positive_int, default=DEFAULT_BURST,
+                        help='Requests allowed back to back before --rate applies (default: %(default)s)')
+    export.add_argument('--window-months', type=positive_int, default=DEFAULT_WINDOW_MONTHS,
+                        help='Statement window size in months')
+    export.add_argument('--engine', choices=('threads', 'async'), default='threads',
+                        help='Fetch with worker threads or the asyncio/httpx engine (needs httpx)')
+    export.add_argument('--cache', action='store_true', help='Serve closed months from the local statement cache')
+    export.add_argument('--cache-path', help='Statement cache database (default: in the user data dir)')
+    export.add_argument('--index', action='store_true',
+                        help='Also add the transactions to the local transaction store for `query`')
+    export.add_argument('--store-path', help='Transaction store database (default: in the user data dir)')
+    export.add_argument('--metrics-file',
+                        help='Keep per-phase timings and byte counts in this Prometheus text file')
+    export.add_argument('--log-metrics', action='store_true',
+                        help='Log every request, download and write as a JSON line on stderr')
+    export.set_defaults(func=run_export)
+
+    query = subparsers.add_parser('query', help='Search transactions in the local transaction store')
+    query.add_argument('text', nargs='*', help='Words to match in description, sender, recipient or reference')
+    query.add_argument('--start', help='Earliest date, e.g. 2024-01-01')
+    query.add_argument('--end', help='Latest date, e.g. 2024-12-31 (the whole day) or 2024-12-31T12:00:00Z')
+    query.add_argument('--type', action='append', choices=('CREDIT', 'DEBIT'), help='Transaction type (repeatable)')
+    query.add_argument('--detail-type', action='append',
+                       help='Transaction kind, e.g. CONVERSION, DEPOSIT, TRANSFER, CARD (repeatable)')
+    query.add_argument('--currency', action='append', help='Transaction currency (repeatable)')
+    query.add_argument('--min-amount', type=float, help='Smallest absolute amount')
+    query.add_argument('--max-amount', type=float, help='Largest absolute amount')
+    query.add_argument('--environment', help="Only 'sandbox', 'production' or a base URL (default: all)")
+    query.add_argument('--profile', help='Only this profile ID')
+    query.add_argument('--balance', help='Only this balance ID')
+    query.add_argument('--limit', type=int, help='Return at most this many of the newest matches')
+    query.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Format for --output')
+    query.add_argument('--output', help='Write matches to this file instead of CSV on stdout')
+    query.add_argument('--store-path', help='Transaction store database (default: in the user data dir)')
+    query.set_defaults(func=run_query)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        try:
+            check_interval(args.start, args.end)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.command == 'query':
+        try:
+            args.start, args.end = check_query_dates(args.start, args.end)
+        except ValueError as e:
+            parser.error(str(e))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Writers turning ``StatementColumns`` into CSV, JSON lines, Excel, Parquet and Arrow files.
+
+Rows are converted column by column in chunks of ``CHUNK_ROWS``, so only one
+chunk of formatted values is held in memory however large the statement.
+"""
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+
+from .statement_parser import AMOUNT_SCALE, MS_PER_DAY, date_from_ms
+
+EXPORT_FIELDS = (
+    'date', 'type', 'detail_type', 'amount', 'currency', 'fees', 'fee_currency',
+    'exchange_rate', 'counter_amount', 'counter_currency', 'running_balance',
+    'running_currency', 'description', 'details', 'reference', 'recipient',
+)
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx', 'parquet', 'arrow')
+
+# Rows formatted and written at a time
+CHUNK_ROWS = 65_536
+
+# How each field is stored: dates, categories (dictionary encoded in
+# Parquet/Arrow), scaled money, the optional rate and free text. Rows
+# without an exchange have a counter amount of 0 and an empty currency.
+FIELD_KINDS = {
+    'date': 'date', 'type': 'types', 'detail_type': 'detail_types', 'amount': 'money',
+    'currency': 'currencies', 'fees': 'money', 'fee_currency': 'currencies', 'exchange_rate': 'rate',
+    'counter_amount': 'money', 'counter_currency': 'currencies', 'running_balance': 'money',
+    'running_currency': 'currencies', 'description': 'text', 'details': 'text', 'reference': 'text',
+    'recipient': 'text',
+}
+
+
+def format_dates(dates):
+    """``wise_client.format_date`` for many epoch-millisecond dates, formatting each day once."""
+    days = {}
+    formatted = []
+    append = formatted.append
+    for date in dates:
+        day, ms = divmod(date, MS_PER_DAY)
+        prefix = days.get(day)
+        if prefix is None:
+            prefix = days[day] = date_from_ms(day * MS_PER_DAY).strftime('%Y-%m-%dT')
+        seconds, ms = divmod(ms, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        append(f"{prefix}{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}Z")
+    return formatted
+
+
+def iter_chunks(columns, chunk_rows=CHUNK_ROWS):
+    """Yield ``(start, end)`` row ranges covering ``columns``."""
+    for start in range(0, len(columns), chunk_rows):
+        yield start, min(start + chunk_rows, len(columns))
+
+
+def chunk_values(columns, start, end):
+    """Plain Python values of rows ``start:end``, as one list per field in EXPORT_FIELDS order."""
+    isnan = math.isnan
+    values = []
+    for field in EXPORT_FIELDS:
+        kind = FIELD_KINDS[field]
+        column = getattr(columns, field)[start:end]
+        if kind == 'date':
+            values.append(format_dates(column))
+        elif kind == 'money':
+            values.append([value / AMOUNT_SCALE for value in column])
+        elif kind == 'rate':
+            values.append([None if isnan(rate) else rate for rate in column])
+        elif kind == 'text':
+            values.append(column)
+        else:
+            values.append(list(map(getattr(columns, kind).values.__getitem__, column)))
+    return values
+
+
+def write_csv_stream(columns, fp):
+    writer = csv.writer(fp)
+    writer.writerow(EXPORT_FIELDS)
+    for start, end in iter_chunks(columns):
+        writer.writerows(zip(*chunk_values(columns, start, end)))
+
+
+def write_csv(columns, path):
+    with open(path, 'w', newline='', encoding='utf-8') as fp:
+        write_csv_stream(columns, fp)
+
+
+def write_jsonl(columns, path):
+    # Each line is filled into a template from values encoded column by column,
+    # giving the same text as json.dumps of a dict per row
+    template = '{' + ', '.join(f"{json.dumps(field)}: %s" for field in EXPORT_FIELDS) + '}\n'
+    encode = json.JSONEncoder().encode
+    with open(path, 'w', encoding='utf-8') as fp:
+        for start, end in iter_chunks(columns):
+            encoded = []
+            for field, values in zip(EXPORT_FIELDS, chunk_values(columns, start, end)):
+                kind = FIELD_KINDS[field]
+                if kind == 'date':
+                    encoded.append([f'"{value}"' for value in values])
+                elif kind == 'money':
+                    encoded.append(list(map(float.__repr__, values)))
+                elif kind == 'rate':
+                    encoded.append(['null' if value is None else float.__repr__(value) for value in values])
+                elif kind == 'text':
+                    encoded.append(list(map(encode, values)))
+                else:
+                    names = {name: encode(name) for name in getattr(columns, kind).values}
+                    encoded.append(list(map(names.__getitem__, values)))
+            fp.write(''.join(template % row for row in zip(*encoded)))
+
+
+# Excel's row limit, including the header row
+XLSX_MAX_ROWS = 1_048_576
+
+# Days from Excel's epoch to the Unix epoch
+XLSX_EPOCH_DAYS = 25_569
+
+XLSX_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_PACKAGE_RELATIONSHIPS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml'
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f'<Override PartName="/xl/workbook.xml" ContentType="{XLSX_CONTENT_TYPE}.sheet.main+xml"/>'
+        f'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="{XLSX_CONTENT_TYPE}.worksheet+xml"/>'
+        f'<Override PartName="/xl/styles.xml" ContentType="{XLSX_CONTENT_TYPE}.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{XLSX_PACKAGE_RELATIONSHIPS}">'
+        f'<Relationship Id="rId1" Type="{XLSX_RELATIONSHIPS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<workbook xmlns="{XLSX_MAIN}" xmlns:r="{XLSX_RELATIONSHIPS}">'
+        '<sheets><sheet name="Transactions" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{XLSX_PACKAGE_RELATIONSHIPS}">'
+        f'<Relationship Id="rId1" Type="{XLSX_RELATIONSHIPS}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{XLSX_RELATIONSHIPS}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1 shows dates as date and time
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<styleSheet xmlns="{XLSX_MAIN}">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+# Control characters XML 1.0 does not allow, even escaped
+XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xlsx_text(value):
+    value = XML_INVALID.sub('', value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{value}</t></is></c>'
+
+
+def write_xlsx(columns, path):
+    """Write a single-sheet workbook, streaming the sheet into the zip file.
+
+    Dates are real Excel date-times (UTC); everything else is written as in
+    the CSV export.
+    """
+    if len(columns) >= XLSX_MAX_ROWS:
+        raise ValueError(f"Excel sheets hold at most {XLSX_MAX_ROWS - 1:,} transactions, not {len(columns):,}")
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, text in XLSX_PARTS.items():
+            archive.writestr(name, text)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as raw, \
+                io.TextIOWrapper(raw, encoding='utf-8') as fp:
+            fp.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     f'<worksheet xmlns="{XLSX_MAIN}"><sheetData>')
+            fp.write('<row>' + ''.join(map(xlsx_text, EXPORT_FIELDS)) + '</row>')
+            for start, end in iter_chunks(columns):
+                cells = []
+                for field in EXPORT_FIELDS:
+                    kind = FIELD_KINDS[field]
+                    column = getattr(columns, field)[start:end]
+                    if kind == 'date':
+                        cells.append([f'<c s="1"><v>{date / MS_PER_DAY + XLSX_EPOCH_DAYS!r}</v></c>'
+                                      for date in column])
+                    elif kind == 'money':
+                        cells.append([f'<c><v>{value / AMOUNT_SCALE!r}</v></c>' for value in column])
+                    elif kind == 'rate':
+                        cells.append(['<c/>' if rate != rate else f'<c><v>{rate!r}</v></c>' for rate in column])
+                    elif kind == 'text':
+                        cells.append(list(map(xlsx_text, column)))
+                    else:
+                        names = [xlsx_text(name) for name in getattr(columns, kind).values]
+                        cells.append(list(map(names.__getitem__, column)))
+                fp.write(''.join(f"<row>{''.join(row)}</row>" for row in zip(*cells)))
+            fp.write('</sheetData></worksheet>')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow export require pyarrow (pip install pyarrow)") from None
+    return pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def arrow_schema(pa):
+    """Schema of exported tables; dates are UTC timestamps and categories are dictionary encoded."""
+    types = {
+        'date': pa.timestamp('ms', tz='UTC'), 'money': pa.float64(), 'rate': pa.float64(), 'text': pa.string(),
+    }
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([(field, types.get(FIELD_KINDS[field], category)) for field in EXPORT_FIELDS])
+
+
+def arrow_batches(columns, chunk_rows=CHUNK_ROWS):
+    """Yield ``pyarrow.RecordBatch``es of ``chunk_rows`` rows built straight from the typed columns."""
+    pa, pc, pq = _import_pyarrow()
+    schema = arrow_schema(pa)
+    # Every batch shares one dictionary per category, as the Arrow file format requires
+    dictionaries = {kind: pa.array(getattr(columns, kind).values, pa.string())
+                    for kind in ('types', 'detail_types', 'currencies')}
+
+    def numbers(field, start, end):
+        # Zero-copy view of a typed column
+        column = getattr(columns, field)
+        view = memoryview(column)[start:end]
+        return pa.Array.from_buffers(array_types[column.typecode], end - start, [None, pa.py_buffer(view)])
+
+    array_types = {'B': pa.uint8(), 'H': pa.uint16(), 'q': pa.int64(), 'd': pa.float64()}
+
+    for start, end in iter_chunks(columns, chunk_rows):
+        arrays = []
+        for field in EXPORT_FIELDS:
+            kind = FIELD_KINDS[field]
+            if kind == 'date':
+                arrays.append(numbers(field, start, end).view(schema.field(field).type))
+            elif kind == 'money':
+                scaled = numbers(field, start, end).cast(pa.float64())
+                arrays.append(pc.divide(scaled, pa.scalar(float(AMOUNT_SCALE))))
+            elif kind == 'rate':
+                rates = numbers(field, start, end)
+                arrays.append(pc.if_else(pc.is_nan(rates), pa.scalar(None, pa.float64()), rates))
+            elif kind == 'text':
+                arrays.append(pa.array(getattr(columns, field)[start:end], pa.string()))
+            else:
+                codes = numbers(field, start, end).cast(pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(codes, dictionaries[kind]))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(columns, path):
+    pa, pc, pq = _import_pyarrow()
+    with pq.ParquetWriter(path, arrow_schema(pa)) as writer:
+        for batch in arrow_batches(columns):
+            writer.write_table(pa.Table.from_batches([batch]))
+
+
+def write_arrow(columns, path):
+    """Write an Arrow IPC (Feather v2) file, readable with ``pyarrow.feather`` or memory-mapped."""
+    pa, pc, pq = _import_pyarrow()
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, arrow_schema(pa)) as writer:
+        for batch in arrow_batches(columns):
+            writer.write_batch(batch)
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'xlsx': write_xlsx,
+    'parquet': write_parquet,
+    'arrow': write_arrow,
+}
+
+
+def check_format(fmt):
+    """Fail early if ``fmt`` is unknown or its optional dependency is missing."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt in ('parquet', 'arrow'):
+        _import_pyarrow()
+
+
+def export_columns(columns, path, fmt):
+    check_format(fmt)
+    WRITERS[fmt](columns, path)
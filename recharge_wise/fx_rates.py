@@ -0,0 +1,132 @@
+"""Daily FX rates for valuing statements in a reporting currency.
+
+Rates come from Wise's ``/v1/rates`` grouped by day. Past rates never
+change, so every past day is kept in a local SQLite table once resolved,
+and lookups go through a bounded in-memory LRU in front of it. Today's
+rate still moves and is fetched afresh every time.
+"""
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import timedelta
+
+from .sqlite_store import SQLiteStore, user_data_dir
+from .statement_parser import EPOCH, MS_PER_DAY, date_from_ms, parse_date_ms, utc_now
+
+# Rates kept in memory; the SQLite table keeps everything ever fetched
+DEFAULT_MAX_ENTRIES = 50_000
+
+# Days before the earliest wanted day that are fetched too, so a day without
+# a published rate (today, say) can fall back to the closest earlier one
+FALLBACK_DAYS = 7
+
+# Longest range asked for in one /v1/rates request
+MAX_REQUEST_DAYS = 365
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fx_rates (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    rate REAL NOT NULL,
+    PRIMARY KEY (source, target, day)
+) WITHOUT ROWID;
+"""
+
+
+def default_rates_path():
+    return os.path.join(user_data_dir(), 'fx_rates.sqlite3')
+
+
+def day_start(date_ms):
+    """UTC midnight, in epoch milliseconds, of the day holding ``date_ms``."""
+    return date_ms - date_ms % MS_PER_DAY
+
+
+def format_day(day_ms):
+    return date_from_ms(day_ms).strftime('%Y-%m-%d')
+
+
+class FXRates(SQLiteStore):
+    """Date-keyed exchange rates, cached on disk and in an LRU.
+
+    Keys are ``(source, target, day)`` with ``day`` the UTC day start in
+    epoch milliseconds; the LRU is guarded by the same lock as the table.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(path or default_rates_path())
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.connection.executescript(SCHEMA)
+
+    def _remember(self, key, rate):
+        self.memory[key] = rate
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def cached(self, source, target, day):
+        """Return the cached rate for one day, or None."""
+        key = (source, target, day)
+        with self.lock:
+            rate = self.memory.get(key)
+            if rate is not None:
+                self.memory.move_to_end(key)
+                return rate
+            row = self.connection.execute(
+                'SELECT rate FROM fx_rates WHERE source = ? AND target = ? AND day = ?', key).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def store(self, source, target, rates):
+        """Cache ``{day: rate}`` for one currency pair."""
+        with self.lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO fx_rates VALUES (?, ?, ?, ?)',
+                                        ((source, target, day, rate) for day, rate in rates.items()))
+            for day, rate in rates.items():
+                self._remember((source, target, day), rate)
+
+    def fetch(self, client, source, target, first_day, last_day):
+        """Fetch ``{day: rate}`` for a range of days."""
+        rates = {}
+        start = first_day
+        while start <= last_day:
+            end = min(last_day, start + (MAX_REQUEST_DAYS - 1) * MS_PER_DAY)
+            for entry in client.rates(source, target, format_day(start), format_day(end)):
+                rates[day_start(parse_date_ms(entry['time'][:10]))] = entry['rate']
+            start = end + MS_PER_DAY
+        return rates
+
+    def rates(self, client, keys, target, now=None):
+        """Return ``{(currency, day): rate}`` converting each key's currency to ``target``.
+
+        Days missing from the cache are fetched with as few requests as
+        possible: one range per currency. A day the API has no rate for
+        uses the closest earlier day, or failing that the closest later one.
+        Days before today (UTC, ``now`` by default) are cached as resolved,
+        fallbacks included, so they are never requested again.
+        Raises ValueError if a currency has no rates at all.
+        """
+        today = day_start(((now or utc_now()) - EPOCH) // timedelta(milliseconds=1))
+        result = {}
+        missing = {}
+        for currency, day in keys:
+            rate = 1.0 if currency == target else self.cached(currency, target, day)
+            if rate is None:
+                missing.setdefault(currency, []).append(day)
+            else:
+                result[(currency, day)] = rate
+        for currency, days in missing.items():
+            fetched = self.fetch(client, currency, target, min(days) - FALLBACK_DAYS * MS_PER_DAY, max(days))
+            if not fetched:
+                raise ValueError(f"No {currency} to {target} rates available around {format_day(min(days))}")
+            known = sorted(fetched)
+            resolved = dict(fetched)
+            for day in days:
+                index = bisect_right(known, day)
+                resolved[day] = result[(currency, day)] = fetched[known[index - 1] if index else known[0]]
+            self.store(currency, target, {day: rate for day, rate in resolved.items() if day < today})
+        return result
@@ -0,0 +1,923 @@
+import os
+import sys
+import json
+import time
+import warnings
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
+                           QLabel, QLineEdit, QPushButton, QTextEdit, QMessageBox, 
+                           QComboBox, QCheckBox, QSpinBox, QTableView, QTabWidget, QScrollArea,
+                           QPlainTextEdit, QFileDialog)
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QFontDatabase
+
+from .metrics import Timing, get_metrics
+from .rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from .workers import Worker, FetchCancelled
+
+# The HTTP stack (requests/urllib3), the statement cache and the table model
+# are imported on first use so they stay off the startup path.
+
+# Characters of a raw statement response shown per 'Load More' page
+RAW_PAGE_SIZE = 256 * 1024
+
+DEFAULT_REFRESH_MINUTES = 5
+
+# Rows returned by one search of the local transaction store
+SEARCH_LIMIT = 10_000
+
+# Save dialog filters for each export format
+EXPORT_FILTERS = {
+    'csv': 'CSV (*.csv)',
+    'xlsx': 'Excel workbook (*.xlsx)',
+    'parquet': 'Parquet (*.parquet)',
+    'arrow': 'Arrow IPC (*.arrow)',
+    'jsonl': 'JSON lines (*.jsonl)',
+}
+
+# Suppress urllib3 warning
+warnings.filterwarnings('ignore', message='urllib3 v2 only supports OpenSSL 1.1.1+')
+
+class WiseAPITester(QWidget):
+    def __init__(self):
+        super().__init__()
+        # Every HTTP call runs on this pool so the event loop never blocks
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(4)
+        self.active_workers = set()
+        self.clients = {}
+        self.statement_cache = None
+        self.transaction_store = None
+        self.fx_rates = None
+        self.statement = None
+        # (client, profile, balance, currency, start, end, version) of the statement shown;
+        # balance is None for a consolidated view valued in ``currency``
+        self.statement_request = None
+        self.statement_summary = None
+        self.statement_worker = None
+        self.transactions_model = None
+        # (paths, index of current file, position in it) while paging raw statement files
+        self.raw_pages = None
+        self.initUI()
+
+    # Add macOS secure coding support
+    if sys.platform == 'darwin':
+        def applicationSupportsSecureRestorableState_(self, *args, **kwargs):
+            return True
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # API Token
+        token_layout = QHBoxLayout()
+        token_layout.addWidget(QLabel('API Token:'))
+        self.token_input = QLineEdit()
+        self.token_input.setEchoMode(QLineEdit.Password)
+        token_layout.addWidget(self.token_input)
+        layout.addLayout(token_layout)
+
+        # Fetch Profile Button and Dropdown
+        profile_section = QHBoxLayout()
+        self.fetch_profile_button = QPushButton('Fetch Profiles')
+        self.fetch_profile_button.clicked.connect(self.fetch_profiles)
+        profile_section.addWidget(self.fetch_profile_button)
+        
+        profile_section.addWidget(QLabel('Profile ID:'))
+        self.profile_dropdown = QComboBox()
+        self.profile_dropdown.currentIndexChanged.connect(self.on_profile_changed)
+        profile_section.addWidget(self.profile_dropdown)
+        
+        self.profile_input = QLineEdit()
+        self.profile_input.setPlaceholderText('Or enter Profile ID manually')
+        profile_section.addWidget(self.profile_input)
+        layout.addLayout(profile_section)
+
+        # Sandbox Checkbox and API Version Dropdown
+        env_version_layout = QHBoxLayout()
+        self.sandbox_checkbox = QCheckBox('Use Sandbox')
+        self.sandbox_checkbox.setChecked(True)
+        env_version_layout.addWidget(self.sandbox_checkbox)
+        env_version_layout.addWidget(QLabel('API Version:'))
+        self.version_dropdown = QComboBox()
+        self.version_dropdown.addItems(['v1', 'v2', 'v3'])
+        self.version_dropdown.setCurrentText('v3')
+        env_version_layout.addWidget(self.version_dropdown)
+        self.cache_checkbox = QCheckBox('Use Statement Cache')
+        self.cache_checkbox.setChecked(True)
+        env_version_layout.addWidget(self.cache_checkbox)
+        layout.addLayout(env_version_layout)
+
+        # Fetch Balances Button
+        self.fetch_balances_button = QPushButton('Fetch Balances')
+        self.fetch_balances_button.clicked.connect(self.fetch_balances)
+        layout.addWidget(self.fetch_balances_button)
+
+        # Balance ID Dropdown
+        balance_layout = QHBoxLayout()
+        balance_layout.addWidget(QLabel('Balance ID:'))
+        self.balance_dropdown = QComboBox()
+        balance_layout.addWidget(self.balance_dropdown)
+        layout.addLayout(balance_layout)
+
+        # Currency
+        currency_layout = QHBoxLayout()
+        currency_layout.addWidget(QLabel('Currency:'))
+        self.currency_input = QLineEdit()
+        self.currency_input.setText('GBP')
+        currency_layout.addWidget(self.currency_input)
+        self.consolidate_checkbox = QCheckBox('Consolidate all balances in this currency')
+        currency_layout.addWidget(self.consolidate_checkbox)
+        layout.addLayout(currency_layout)
+
+        # Date Range
+        date_layout = QHBoxLayout()
+        date_layout.addWidget(QLabel('Start Date:'))
+        self.start_date_input = QLineEdit()
+        self.start_date_input.setText('2023-08-01T00:00:00.000Z')
+        date_layout.addWidget(self.start_date_input)
+        date_layout.addWidget(QLabel('End Date:'))
+        self.end_date_input = QLineEdit()
+        self.end_date_input.setText('2024-08-31T23:59:59.999Z')
+        date_layout.addWidget(self.end_date_input)
+        layout.addLayout(date_layout)
+
+        # Fetch Statement Button and Auto-refresh
+        fetch_layout = QHBoxLayout()
+        self.fetch_button = QPushButton('Fetch Statement')
+        self.fetch_button.clicked.connect(self.fetch_statement)
+        fetch_layout.addWidget(self.fetch_button, 1)
+        self.auto_refresh_checkbox = QCheckBox('Auto-refresh every')
+        self.auto_refresh_checkbox.toggled.connect(self.update_refresh_timer)
+        fetch_layout.addWidget(self.auto_refresh_checkbox)
+        self.refresh_interval_input = QSpinBox()
+        self.refresh_interval_input.setRange(1, 24 * 60)
+        self.refresh_interval_input.setValue(DEFAULT_REFRESH_MINUTES)
+        self.refresh_interval_input.setSuffix(' min')
+        self.refresh_interval_input.valueChanged.connect(self.update_refresh_timer)
+        fetch_layout.addWidget(self.refresh_interval_input)
+        layout.addLayout(fetch_layout)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_statement)
+
+        # Status Label and Cancel Button
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        status_layout.addWidget(self.status_label, 1)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_fetches)
+        status_layout.addWidget(self.cancel_button)
+        layout.addLayout(status_layout)
+
+        # Tabs for displaying results
+        self.tabs = QTabWidget()
+        raw_tab = QWidget()
+        raw_layout = QVBoxLayout(raw_tab)
+        raw_layout.setContentsMargins(0, 0, 0, 0)
+        self.raw_result_display = QTextEdit()
+        self.raw_result_display.setReadOnly(True)
+        raw_layout.addWidget(self.raw_result_display)
+        self.load_more_button = QPushButton('Load More')
+        self.load_more_button.clicked.connect(self.load_more_raw)
+        self.load_more_button.hide()
+        raw_layout.addWidget(self.load_more_button)
+        self.tabs.addTab(raw_tab, "Raw JSON")
+
+        # Formatted display is built the first time it is needed
+        self.formatted_tab = QWidget()
+        self.formatted_layout = None
+        self.tabs.addTab(self.formatted_tab, "Formatted Statement")
+        self.diagnostics_tab = QWidget()
+        self.diagnostics_display = None
+        self.tabs.addTab(self.diagnostics_tab, "Diagnostics")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        layout.addWidget(self.tabs)
+
+        self.setLayout(layout)
+        self.setWindowTitle('Wise API Tester')
+        self.setGeometry(300, 300, 1400, 800)
+
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.formatted_tab:
+            self.ensure_statement_view()
+        elif self.tabs.widget(index) is self.diagnostics_tab:
+            self.ensure_diagnostics_tab()
+            self.refresh_diagnostics()
+
+    def ensure_diagnostics_tab(self):
+        if self.diagnostics_display is not None:
+            return
+        tab_layout = QVBoxLayout(self.diagnostics_tab)
+        tab_layout.setContentsMargins(0, 0, 0, 0)
+        self.diagnostics_display = QPlainTextEdit()
+        self.diagnostics_display.setReadOnly(True)
+        self.diagnostics_display.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.diagnostics_display.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        tab_layout.addWidget(self.diagnostics_display)
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton('Refresh')
+        refresh_button.clicked.connect(self.refresh_diagnostics)
+        button_layout.addWidget(refresh_button)
+        clear_button = QPushButton('Clear')
+        clear_button.clicked.connect(self.clear_diagnostics)
+        button_layout.addWidget(clear_button)
+        button_layout.addStretch(1)
+        tab_layout.addLayout(button_layout)
+
+    def refresh_diagnostics(self):
+        # Timings of requests, decoding and rendering, recorded by every fetch
+        self.diagnostics_display.setPlainText(get_metrics().report())
+
+    def clear_diagnostics(self):
+        get_metrics().clear()
+        self.refresh_diagnostics()
+
+    def ensure_formatted_tab(self):
+        if self.formatted_layout is not None:
+            return
+        tab_layout = QVBoxLayout(self.formatted_tab)
+        tab_layout.setContentsMargins(0, 0, 0, 0)
+
+        # Create scrollable area for formatted display
+        self.formatted_result_display = QScrollArea()
+        self.formatted_result_display.setWidgetResizable(True)
+        self.formatted_content = QWidget()
+        self.formatted_layout = QVBoxLayout(self.formatted_content)
+        self.formatted_result_display.setWidget(self.formatted_content)
+        tab_layout.addWidget(self.formatted_result_display)
+
+    def closeEvent(self, event):
+        # Workers write to the stores and cache, so they must stop before those close
+        self.refresh_timer.stop()
+        for worker in list(self.active_workers):
+            worker.cancel()
+        self.thread_pool.waitForDone()
+        if self.statement is not None:
+            self.statement.close()
+        if self.statement_cache is not None:
+            self.statement_cache.close()
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+        if self.transaction_store is not None:
+            self.transaction_store.close()
+        if self.fx_rates is not None:
+            self.fx_rates.close()
+        super().closeEvent(event)
+
+    def get_client(self):
+        # One pooled client per token/environment so fetches reuse connections
+        key = (self.token_input.text(), self.sandbox_checkbox.isChecked())
+        if key not in self.clients:
+            from .wise_client import WiseClient
+            self.clients[key] = WiseClient(*key, priority=PRIORITY_INTERACTIVE)
+        return self.clients[key]
+
+    def get_transaction_store(self):
+        if self.transaction_store is None:
+            from .transaction_store import TransactionStore
+            self.transaction_store = TransactionStore()
+        return self.transaction_store
+
+    def get_statement_cache(self):
+        if self.statement_cache is None:
+            from .statement_cache import StatementCache
+            self.statement_cache = StatementCache()
+        return self.statement_cache
+
+    def get_fx_rates(self):
+        if self.fx_rates is None:
+            from .fx_rates import FXRates
+            self.fx_rates = FXRates()
+        return self.fx_rates
+
+    def start_worker(self, fn, on_result, on_error, *args, **kwargs):
+        worker = Worker(fn, *args, **kwargs)
+        worker.signals.progress.connect(self.status_label.setText)
+        worker.signals.result.connect(on_result)
+        worker.signals.error.connect(on_error)
+        worker.signals.finished.connect(lambda: self.on_worker_finished(worker))
+        self.active_workers.add(worker)
+        self.cancel_button.setEnabled(True)
+        self.thread_pool.start(worker)
+        return worker
+
+    def on_worker_finished(self, worker):
+        self.active_workers.discard(worker)
+        if worker is self.statement_worker:
+            self.statement_worker = None
+        self.cancel_button.setEnabled(bool(self.active_workers))
+
+    def cancel_fetches(self):
+        for worker in list(self.active_workers):
+            worker.cancel()
+        self.status_label.setText("Cancelling...")
+
+    def fetch_profiles(self):
+        token = self.token_input.text()
+        if not token:
+            QMessageBox.warning(self, 'Input Error', 'Please enter API Token.')
+            return
+
+        client = self.get_client()
+        url = client.url('v2/profiles')
+
+        def work(worker):
+            return client.profiles(on_progress=worker.download_progress('profiles'))
+
+        self.start_worker(work, self.on_profiles_fetched,
+                          lambda e: self.on_fetch_error(e, 'profiles', f"URL: {url}"))
+
+    def on_profiles_fetched(self, profiles):
+        timing = Timing('render', view='profiles')
+        with timing.phase('widgets'):
+            self.profile_dropdown.clear()
+            for profile in profiles:
+                profile_type = profile.get('type', 'Unknown')
+                profile_name = profile.get('businessName', profile.get('firstName', '')) + ' ' + profile.get('lastName', '')
+                display_text = f"{profile['id']} ({profile_type} - {profile_name.strip()})"
+                self.profile_dropdown.addItem(display_text, profile['id'])
+        
+        self.status_label.setText("Profiles fetched successfully!")
+        with timing.phase('raw'):
+            self.show_raw_text(json.dumps(profiles, indent=2))
+        get_metrics().record(timing)
+
+    def on_profile_changed(self, index):
+        if index >= 0:
+            profile_id = self.profile_dropdown.currentData()
+            self.profile_input.setText(str(profile_id))
+
+    def fetch_balances(self):
+        token = self.token_input.text()
+        profile_id = self.profile_input.text()
+
+        if not all([token, profile_id]):
+            QMessageBox.warning(self, 'Input Error', 'Please enter API Token and Profile ID.')
+            return
+
+        client = self.get_client()
+        url = client.url(f"v1/borderless-accounts?profileId={profile_id}")
+
+        def work(worker):
+            return client.borderless_accounts(profile_id, on_progress=worker.download_progress('balances'))
+
+        self.start_worker(work, self.on_balances_fetched,
+                          lambda e: self.on_fetch_error(e, 'balances', f"URL: {url}", show_headers=True))
+
+    def on_balances_fetched(self, data):
+        timing = Timing('render', view='balances')
+        with timing.phase('widgets'):
+            self.balance_dropdown.clear()
+            for account in data:
+                for balance in account['balances']:
+                    self.balance_dropdown.addItem(f"{balance['id']} ({balance['currency']})", balance['id'])
+        
+        self.status_label.setText("Balances fetched successfully!")
+        with timing.phase('raw'):
+            self.show_raw_text(json.dumps(data, indent=2))
+        get_metrics().record(timing)
+        QMessageBox.information(self, 'Success', 'Balances fetched successfully!')
+
+    def fetch_statement(self):
+        token = self.token_input.text()
+        profile_id = self.profile_input.text()
+        consolidate = self.consolidate_checkbox.isChecked()
+        balance_id = None if consolidate else self.balance_dropdown.currentData()
+        currency = self.currency_input.text()
+        start_date = self.start_date_input.text()
+        end_date = self.end_date_input.text()
+        api_version = self.version_dropdown.currentText()
+
+        if not all([token, profile_id, balance_id or consolidate, currency, start_date, end_date]):
+            QMessageBox.warning(self, 'Input Error', 'Please fill in all fields and fetch balances.')
+            return
+        from .wise_client import check_interval
+        try:
+            check_interval(start_date, end_date)
+        except ValueError as e:
+            QMessageBox.warning(self, 'Input Error', str(e))
+            return
+
+        self.start_statement_fetch(
+            (self.get_client(), profile_id, balance_id, currency, start_date, end_date, api_version))
+
+    def update_refresh_timer(self, *args):
+        if self.auto_refresh_checkbox.isChecked():
+            self.refresh_timer.start(self.refresh_interval_input.value() * 60 * 1000)
+        else:
+            self.refresh_timer.stop()
+
+    def refresh_statement(self):
+        # Re-fetch the statement on display; ticks are skipped while a fetch is running
+        if self.statement_request is not None and self.statement_worker is None:
+            self.start_statement_fetch(self.statement_request, refresh=True)
+
+    def start_statement_fetch(self, request, refresh=False):
+        client, profile_id, balance_id, currency, start_date, end_date, api_version = request
+        cache = self.get_statement_cache() if self.cache_checkbox.isChecked() else None
+        if balance_id is None:
+            self.start_consolidated_fetch(request, cache, refresh)
+            return
+        if refresh:
+            # Timer ticks queue behind anything the user asks for
+            client = client.with_priority(PRIORITY_BULK)
+        url = client.url(client.statement_path(profile_id, balance_id, api_version))
+        params = client.statement_params(currency, start_date, end_date)
+
+        from .statement_stream import fetch_statement_stream
+
+        def work(worker):
+            on_progress = worker.download_progress('statement')
+            # Filled in with the display phases once the statement is on screen
+            timing = Timing('statement', source='api' if cache is None else 'cache')
+            if cache is not None:
+                statement = cache.fetch_statement(client, profile_id, balance_id, currency, start_date, end_date,
+                                                  api_version=api_version, on_progress=on_progress, timing=timing)
+            else:
+                statement = fetch_statement_stream(client, profile_id, balance_id, currency, start_date, end_date,
+                                                   api_version=api_version, on_progress=on_progress, timing=timing)
+            return statement, timing, None, [(balance_id, statement.columns)]
+
+        self.start_statement_worker(work, request, refresh, f"URL: {url}\n\nParams: {params}")
+
+    def start_consolidated_fetch(self, request, cache, refresh):
+        client, profile_id, balance_id, currency, start_date, end_date, api_version = request
+        # The per-balance fan-out and rate lookups can run to many requests, so
+        # they go at bulk priority and let the user's other clicks through first
+        client = client.with_priority(PRIORITY_BULK)
+        fx_rates = self.get_fx_rates()
+        from .fx_rates import day_start
+        from .statement_parser import ConsolidatedSummary, parse_date_ms
+        from .statement_stream import consolidate_statements, convert_balances, fetch_profile_statements
+
+        def work(worker):
+            timing = Timing('consolidated', source='api' if cache is None else 'cache')
+            with timing.phase('download'):
+                statements = fetch_profile_statements(client, profile_id, start_date, end_date,
+                                                      api_version=api_version, cache=cache,
+                                                      on_progress=worker.download_progress('statements'))
+            parts = [(balance_id, statement.columns) for balance_id, _, statement in statements]
+            statement = consolidate_statements(statements)
+            try:
+                with timing.phase('summary'):
+                    summary = ConsolidatedSummary(currency).update(statement.columns)
+                # Opening balances are valued on the first day and closing ones on the
+                # last, or today if the interval ends in the future
+                first_day = day_start(parse_date_ms(start_date))
+                last_day = day_start(min(parse_date_ms(end_date), int(time.time() * 1000)))
+                balances = statement.header['balances']
+                keys = summary.rate_keys()
+                keys.update((balance['currency'], day) for balance in balances for day in (first_day, last_day))
+                with timing.phase('rates'):
+                    rates = fx_rates.rates(client, keys, currency)
+                    summary.convert(rates)
+                convert_balances(statement.header, rates, currency, first_day, last_day)
+            except BaseException:
+                statement.close()
+                raise
+            timing.count('bytes', sum(os.path.getsize(path) for path in statement.raw_paths))
+            timing.count('rows', len(statement.columns))
+            return statement, timing, summary, parts
+
+        self.start_statement_worker(work, request, refresh, f"Profile: {profile_id}\n\nAll balances in {currency}")
+
+    def start_statement_worker(self, work, request, refresh, request_info):
+        # Only the latest statement fetch may reach the display, so the one it
+        # replaces is cancelled and anything it still delivers is dropped
+        if self.statement_worker is not None:
+            self.statement_worker.cancel()
+        on_error = self.statement_error_handler(refresh, request_info)
+        worker = self.start_worker(work, lambda result: self.on_statement_fetched(worker, *result, request),
+                                   lambda e: on_error(worker, e))
+        self.statement_worker = worker
+
+    def statement_error_handler(self, refresh, request_info):
+        def on_error(worker, e):
+            if worker is not self.statement_worker:
+                return
+            if refresh and not isinstance(e, FetchCancelled):
+                # No dialogs from the timer; the next tick simply tries again
+                self.status_label.setText(f"Auto-refresh failed: {e}")
+            else:
+                self.on_fetch_error(e, 'statement', request_info, show_headers=True)
+        return on_error
+
+    def on_statement_fetched(self, worker, statement, timing, summary, parts, request):
+        # A superseded or cancelled fetch still owns its spill files
+        if worker is not self.statement_worker or worker.is_cancelled:
+            statement.close()
+            if worker is self.statement_worker:
+                self.status_label.setText("Fetching statement cancelled.")
+            return
+        if self.statement is not None:
+            self.statement.close()
+        self.statement = statement
+        with timing.phase('raw'):
+            self.show_raw_files(statement.raw_paths)
+        # A re-fetch of the statement already on display is applied as a diff. Balances
+        # share the reference of a conversion between them, so a consolidated view
+        # is always replaced instead.
+        merge = (request == self.statement_request and self.statement_summary is not None
+                 and summary is None)
+        self.statement_request = request
+        with timing.phase('render'):
+            counts = self.display_formatted_statement(statement.header, statement.columns, merge, summary)
+        get_metrics().record(timing)
+        self.index_statement(request, parts)
+        if merge and counts is not None:
+            message = f"Statement refreshed: {counts[0]} new, {counts[1]} updated transactions"
+        else:
+            message = "Statement fetched successfully!"
+        self.status_label.setText(f"{message} ({timing.summary()})")
+
+    def show_raw_text(self, text):
+        self.raw_pages = None
+        self.load_more_button.hide()
+        self.raw_result_display.setPlainText(text)
+
+    def show_raw_files(self, paths):
+        # Statements can be very large, so the raw responses are paged in from
+        # their spill files instead of being loaded into the widget at once
+        self.raw_result_display.clear()
+        self.raw_pages = (paths, 0, 0)
+        self.load_more_raw()
+
+    def load_more_raw(self):
+        if self.raw_pages is None:
+            return
+        paths, index, position = self.raw_pages
+        text = ''
+        if index < len(paths):
+            with open(paths[index], encoding='utf-8', errors='replace') as fp:
+                fp.seek(position)
+                text = fp.read(RAW_PAGE_SIZE)
+                position = fp.tell()
+                if not fp.read(1):
+                    index, position = index + 1, 0
+                    if index < len(paths):
+                        text += '\n\n'
+        cursor = self.raw_result_display.textCursor()
+        cursor.movePosition(cursor.End)
+        cursor.insertText(text)
+        self.raw_pages = (paths, index, position)
+        self.load_more_button.setVisible(index < len(paths))
+
+    def on_fetch_error(self, e, what, request_info, show_headers=False):
+        import requests
+
+        if isinstance(e, FetchCancelled):
+            self.status_label.setText(f"Fetching {what} cancelled.")
+            return
+        if not isinstance(e, (requests.exceptions.RequestException, ValueError)):
+            QMessageBox.critical(self, 'Error', f'Error fetching {what}: {str(e)}')
+            self.status_label.setText(f"Failed to fetch {what}!")
+            return
+
+        response = getattr(e, 'response', None)
+        error_message = f"API Error: {str(e)}\n\n{request_info}"
+        if show_headers:
+            error_message += f"\n\nHeaders: {dict(response.headers) if response is not None else 'No headers'}"
+        error_message += f"\n\nResponse: {response.text if response is not None else 'No response'}"
+        QMessageBox.critical(self, 'API Error', error_message)
+        self.status_label.setText(f"Failed to fetch {what}!")
+        self.show_raw_text(error_message)
+
+    def ensure_statement_view(self):
+        # The statement widgets are built once and updated in place on every fetch
+        if self.transactions_model is not None:
+            return
+        from .statement_model import TransactionTableModel, make_sort_proxy
+
+        self.ensure_formatted_tab()
+        self.formatted_layout.addLayout(self.build_filter_bar())
+
+        self.statement_panel = QWidget()
+        statement_layout = QVBoxLayout(self.statement_panel)
+        statement_layout.setContentsMargins(0, 0, 0, 0)
+        self.account_holder_label = QLabel()
+        statement_layout.addWidget(self.account_holder_label)
+        self.start_balance_label = QLabel()
+        statement_layout.addWidget(self.start_balance_label)
+        self.end_balance_label = QLabel()
+        statement_layout.addWidget(self.end_balance_label)
+
+        # Transactions Table
+        self.transactions_model = TransactionTableModel(self)
+        self.transactions_table = QTableView()
+        self.transactions_table.setModel(make_sort_proxy(self.transactions_model, self.transactions_table))
+        self.transactions_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.transactions_table.setSelectionMode(QTableView.ContiguousSelection)
+        self.transactions_table.setSortingEnabled(True)
+        statement_layout.addWidget(self.transactions_table)
+
+        # Summary section
+        summary_layout = QVBoxLayout()
+        self.summary_label = QLabel()
+        summary_layout.addWidget(self.summary_label)
+        self.transaction_types_label = QLabel()
+        summary_layout.addWidget(self.transaction_types_label)
+        self.fees_label = QLabel()
+        summary_layout.addWidget(self.fees_label)
+        self.totals_label = QLabel()
+        summary_layout.addWidget(self.totals_label)
+        statement_layout.addLayout(summary_layout)
+        self.formatted_layout.addWidget(self.statement_panel)
+
+        # Search results replace the statement until 'Show Statement' is clicked
+        self.search_panel = QWidget()
+        search_layout = QVBoxLayout(self.search_panel)
+        search_layout.setContentsMargins(0, 0, 0, 0)
+        self.search_results_label = QLabel()
+        search_layout.addWidget(self.search_results_label)
+        self.search_model = TransactionTableModel(self)
+        self.search_table = QTableView()
+        self.search_table.setModel(make_sort_proxy(self.search_model, self.search_table))
+        self.search_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.search_table.setSelectionMode(QTableView.ContiguousSelection)
+        self.search_table.setSortingEnabled(True)
+        search_layout.addWidget(self.search_table)
+        self.search_panel.hide()
+        self.formatted_layout.addWidget(self.search_panel)
+
+    def build_filter_bar(self):
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel('Search:'))
+        self.search_text_input = QLineEdit()
+        self.search_text_input.setPlaceholderText('Description, sender, recipient or reference')
+        self.search_text_input.returnPressed.connect(self.search_transactions)
+        filter_layout.addWidget(self.search_text_input, 2)
+        self.search_type_dropdown = QComboBox()
+        self.search_type_dropdown.addItems(['Any type', 'CREDIT', 'DEBIT'])
+        filter_layout.addWidget(self.search_type_dropdown)
+        self.search_detail_dropdown = QComboBox()
+        self.search_detail_dropdown.addItems(['Any kind', 'CONVERSION', 'DEPOSIT', 'TRANSFER', 'CARD'])
+        filter_layout.addWidget(self.search_detail_dropdown)
+        self.search_currency_input = QLineEdit()
+        self.search_currency_input.setPlaceholderText('Currency')
+        filter_layout.addWidget(self.search_currency_input)
+        self.search_min_amount_input = QLineEdit()
+        self.search_min_amount_input.setPlaceholderText('Min amount')
+        filter_layout.addWidget(self.search_min_amount_input)
+        self.search_max_amount_input = QLineEdit()
+        self.search_max_amount_input.setPlaceholderText('Max amount')
+        filter_layout.addWidget(self.search_max_amount_input)
+        self.search_start_input = QLineEdit()
+        self.search_start_input.setPlaceholderText('From (YYYY-MM-DD)')
+        filter_layout.addWidget(self.search_start_input)
+        self.search_end_input = QLineEdit()
+        self.search_end_input.setPlaceholderText('To (YYYY-MM-DD)')
+        filter_layout.addWidget(self.search_end_input)
+        self.search_balance_checkbox = QCheckBox('Current balance only')
+        filter_layout.addWidget(self.search_balance_checkbox)
+        self.search_button = QPushButton('Search')
+        self.search_button.clicked.connect(self.search_transactions)
+        filter_layout.addWidget(self.search_button)
+        self.show_statement_button = QPushButton('Show Statement')
+        self.show_statement_button.clicked.connect(self.show_statement_panel)
+        filter_layout.addWidget(self.show_statement_button)
+        self.export_button = QPushButton('Export...')
+        self.export_button.clicked.connect(self.export_transactions)
+        filter_layout.addWidget(self.export_button)
+        return filter_layout
+
+    def search_filters(self):
+        """Return ``TransactionStore.search`` arguments from the filter bar; raises ValueError."""
+        from .statement_parser import parse_date_ms
+        from .wise_client import PRODUCTION_URL, SANDBOX_URL, environment_name, interval_end
+
+        filters = {
+            'text': self.search_text_input.text(),
+            'environment': environment_name(SANDBOX_URL if self.sandbox_checkbox.isChecked() else PRODUCTION_URL),
+            'limit': SEARCH_LIMIT,
+        }
+        if self.search_type_dropdown.currentIndex() > 0:
+            filters['types'] = [self.search_type_dropdown.currentText()]
+        if self.search_detail_dropdown.currentIndex() > 0:
+            filters['detail_types'] = [self.search_detail_dropdown.currentText()]
+        if self.search_currency_input.text().strip():
+            filters['currencies'] = [self.search_currency_input.text().strip().upper()]
+        for name, widget in (('min_amount', self.search_min_amount_input),
+                             ('max_amount', self.search_max_amount_input)):
+            if widget.text().strip():
+                filters[name] = float(widget.text().replace(',', ''))
+        for name, widget in (('start', self.search_start_input), ('end', self.search_end_input)):
+            value = widget.text().strip()
+            if value:
+                # A bare date as the upper bound includes the whole day
+                value = interval_end(value) if name == 'end' else value
+                parse_date_ms(value)
+                filters[name] = value
+        if self.search_balance_checkbox.isChecked():
+            filters['profile_id'] = self.profile_input.text()
+            filters['balance_id'] = self.balance_dropdown.currentData()
+        return filters
+
+    def search_transactions(self):
+        try:
+            filters = self.search_filters()
+        except ValueError as e:
+            QMessageBox.warning(self, 'Input Error', f'Invalid search filter: {e}')
+            return
+        store = self.get_transaction_store()
+
+        def work(worker):
+            timing = Timing('search')
+            with timing.phase('query'):
+                columns = store.search(**filters)
+            timing.count('rows', len(columns))
+            get_metrics().record(timing)
+            return columns
+
+        self.start_worker(work, self.on_search_done,
+                          lambda e: self.on_fetch_error(e, 'search results', f"Filters: {filters}"))
+
+    def on_search_done(self, columns):
+        from .statement_model import size_columns_from_sample
+
+        self.search_model.set_columns(columns)
+        size_columns_from_sample(self.search_table)
+        limited = ' (showing the newest only)' if len(columns) >= SEARCH_LIMIT else ''
+        self.search_results_label.setText(f"{len(columns):,} matching stored transactions{limited}")
+        self.statement_panel.hide()
+        self.search_panel.show()
+        self.status_label.setText("Search finished.")
+
+    def export_transactions(self):
+        # Writes whichever table is showing straight from its columns, not from the view
+        searching = self.search_panel.isVisible()
+        columns = (self.search_model if searching else self.transactions_model).columns
+        if not len(columns):
+            QMessageBox.warning(self, 'Export', 'There are no transactions to export.')
+            return
+        if searching:
+            name = 'search-results'
+        else:
+            client, profile_id, balance_id, currency = self.statement_request[:4]
+            name = f"{profile_id}_{balance_id or 'all'}_{currency}"
+        path, selected = QFileDialog.getSaveFileName(
+            self, 'Export Transactions', f"{name}.csv", ';;'.join(EXPORT_FILTERS.values()))
+        if not path:
+            return
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        fmt = extension if extension in EXPORT_FILTERS else next(
+            (fmt for fmt, label in EXPORT_FILTERS.items() if label == selected), 'csv')
+        if extension != fmt:
+            path += f'.{fmt}'
+
+        from .export import check_format, export_columns
+        try:
+            check_format(fmt)
+        except ImportError as e:
+            QMessageBox.warning(self, 'Export', str(e))
+            return
+        # A refresh may update the table while the file is written
+        columns = columns.take(range(len(columns)))
+
+        def work(worker):
+            timing = Timing('export', format=fmt, status='failed')
+            try:
+                with timing.phase('write'):
+                    export_columns(columns, path, fmt)
+                timing.count('rows', len(columns))
+                timing.labels['status'] = 'ok'
+            finally:
+                get_metrics().record(timing)
+            return timing
+
+        def on_error(e):
+            QMessageBox.critical(self, 'Export Error', f'Error exporting to {path}: {e}')
+            self.status_label.setText("Export failed!")
+
+        self.status_label.setText(f"Exporting {len(columns):,} transactions...")
+        self.start_worker(
+            work, lambda timing: self.status_label.setText(
+                f"Exported {len(columns):,} transactions to {path} ({timing.summary()})"), on_error)
+
+    def show_statement_panel(self):
+        self.search_panel.hide()
+        self.statement_panel.show()
+
+    def index_statement(self, request, parts):
+        # Runs after the statement is on screen so indexing never delays it
+        client, profile_id = request[:2]
+        store = self.get_transaction_store()
+
+        def work(worker):
+            for balance_id, columns in parts:
+                timing = Timing('index')
+                with timing.phase('store'):
+                    store.add_columns(client.environment, profile_id, balance_id, columns)
+                timing.count('rows', len(columns))
+                get_metrics().record(timing)
+
+        self.start_worker(work, lambda result: None,
+                          lambda e: self.status_label.setText(f"Could not index transactions: {e}"))
+
+    def display_formatted_statement(self, data, columns, merge=False, summary=None):
+        """Show a statement, or with ``merge`` apply it as a diff of the one shown.
+
+        ``summary`` is the converted ``ConsolidatedSummary`` of a consolidated
+        statement. Returns ``(added, changed)`` transaction counts, or None on error.
+        """
+        from .statement_model import size_columns_from_sample
+        from .statement_parser import summarize
+
+        self.ensure_statement_view()
+        try:
+            start_balance = data['startOfStatementBalance']
+            end_balance = data['endOfStatementBalance']
+            currency = end_balance['currency']
+            if merge:
+                added, changed = self.transactions_model.merge_columns(columns, self.statement_summary)
+            else:
+                self.statement_summary = summary if summary is not None else summarize(columns, currency)
+                self.transactions_model.set_columns(columns)
+                size_columns_from_sample(self.transactions_table)
+                added, changed = len(columns), 0
+            summary = self.statement_summary
+
+            self.account_holder_label.setText(f"Account Holder: {data['accountHolder']['businessName']}")
+            self.start_balance_label.setText(f"Start Balance: {start_balance['value']} {start_balance['currency']}")
+            self.end_balance_label.setText(f"End Balance: {end_balance['value']} {end_balance['currency']}")
+            self.summary_label.setText(f"""
+                Summary:
+                Total Transactions: {summary.total_transactions}
+                Credit Transactions: {summary.count('CREDIT')}
+                Debit Transactions: {summary.count('DEBIT')}
+                
+                Start Balance: {start_balance['value']:,.2f} {start_balance['currency']}
+                End Balance: {end_balance['value']:,.2f} {end_balance['currency']}
+                
+                Period: {data['query']['intervalStart']} to {data['query']['intervalEnd']}
+            """)
+            self.transaction_types_label.setText(f"""
+                Transaction Types:
+                Conversions: {summary.detail_count('CONVERSION')}
+                Deposits: {summary.detail_count('DEPOSIT')}
+                Transfers: {summary.detail_count('TRANSFER')}
+            """)
+            self.fees_label.setText(f"Total Fees: {summary.total_fees:,.2f} {currency}")
+            self.totals_label.setText(f"""
+                Totals ({currency}):
+                Total Credits: {summary.total_credits:,.2f}
+                Total Debits: {summary.total_debits:,.2f}
+            """ + self.currency_breakdown(summary))
+
+            # Switch to the formatted tab, but leave the user where they are on refreshes
+            if not merge:
+                self.show_statement_panel()
+                self.tabs.setCurrentIndex(1)
+            return added, changed
+
+        except Exception as e:
+            QMessageBox.critical(self, 'Error', f'Error displaying statement: {str(e)}')
+            self.status_label.setText("Error displaying statement!")
+            return None
+
+    def currency_breakdown(self, summary):
+        """Lines for the currencies a summary holds besides its own, e.g. fees charged elsewhere."""
+        from .statement_parser import ConsolidatedSummary
+
+        consolidated = isinstance(summary, ConsolidatedSummary)
+        lines = []
+        for currency in sorted(summary.by_currency):
+            if currency == summary.currency and not consolidated:
+                continue
+            credits, debits, fees = (summary.native_totals(currency) if consolidated
+                                     else summary.currency_totals(currency))
+            line = f"{currency}: credits {credits:,.2f}, debits {debits:,.2f}, fees {fees:,.2f}"
+            if consolidated and currency != summary.currency:
+                credits, debits, fees = summary.currency_totals(currency)
+                line += (f" = credits {credits:,.2f}, debits {debits:,.2f}, "
+                         f"fees {fees:,.2f} {summary.currency}")
+            lines.append(line)
+        if not lines:
+            return ''
+        if consolidated:
+            lines.append(f"{summary.exchange_valued:,} transactions valued at their own exchange, "
+                         "the rest at daily rates")
+        heading = 'By currency:' if consolidated else 'Other currencies:'
+        return '    ' + '\n                '.join([heading] + lines) + '\n'
+
+
+def main():
+    # Enable high DPI scaling
+    if hasattr(Qt, 'AA_EnableHighDpiScaling'):
+        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+    if hasattr(Qt, 'AA_UseHighDpiPixmaps'):
+        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
+
+    app = QApplication(sys.argv)
+    
+    # Set application style
+    app.setStyle('Fusion')
+    
+    # Create and show the application
+    ex = WiseAPITester()
+    ex.show()
+    
+    sys.exit(app.exec_())
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""Per-phase timings and byte counts for requests, decoding and rendering.
+
+Each instrumented operation fills in a ``Timing`` and hands it to a
+``MetricsRegistry``, which keeps the most recent ones for the diagnostics
+tab and cumulative totals that can be written as a Prometheus text file
+(for the node_exporter textfile collector) or logged as JSON lines.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Operations kept for the diagnostics view
+RECENT_OPERATIONS = 200
+
+METRIC_PREFIX = 'recharge_wise'
+
+COUNT_HELP = {
+    'bytes': 'Response or file bytes processed.',
+    'rows': 'Transactions processed.',
+    'retries': 'Requests retried after a 429 or 5xx response.',
+}
+
+
+def endpoint_name(path):
+    """API path with IDs replaced, so it is safe to use as a metric label."""
+    return re.sub(r'/\d+(?=/|$)', '/{id}', '/' + path.lstrip('/'))
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+class Timing:
+    """Phase durations and counts of one operation, e.g. a request or a render.
+
+    Phases are accumulated, so a phase entered twice (a retried request's
+    ``wait``) reports its total. ``labels`` become Prometheus labels and
+    should have few distinct values.
+    """
+
+    def __init__(self, operation, **labels):
+        self.operation = operation
+        self.labels = {name: str(value) for name, value in labels.items()}
+        self.started = time.time()
+        self.phases = {}
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def summary(self):
+        """One-line breakdown, e.g. ``download 1.20 s, decode 310 ms, 3.4 MB, 19,850 rows``."""
+        parts = [f"{name} {format_seconds(seconds)}" for name, seconds in self.phases.items()]
+        if 'bytes' in self.counts:
+            parts.append(format_bytes(self.counts['bytes']))
+        if 'rows' in self.counts:
+            parts.append(f"{self.counts['rows']:,} rows")
+        return ', '.join(parts)
+
+    def as_dict(self):
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'operation': self.operation,
+            **self.labels,
+            'seconds': round(self.total, 6),
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            **self.counts,
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe collector of finished ``Timing``s.
+
+    ``listeners`` are called with every recorded timing on the recording
+    thread, e.g. to log it.
+    """
+
+    def __init__(self, keep=RECENT_OPERATIONS):
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=keep)
+        # (operation, sorted label items) -> cumulative totals
+        self.series = {}
+        self.listeners = []
+
+    def record(self, timing):
+        key = (timing.operation, tuple(sorted(timing.labels.items())))
+        with self.lock:
+            self.recent.append(timing)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'count': 0, 'seconds': 0.0, 'phases': {}, 'counts': {}, 'last': 0.0}
+            series['count'] += 1
+            series['seconds'] += timing.total
+            for name, seconds in timing.phases.items():
+                series['phases'][name] = series['phases'].get(name, 0.0) + seconds
+            for name, amount in timing.counts.items():
+                series['counts'][name] = series['counts'].get(name, 0) + amount
+            series['last'] = timing.started + timing.total
+        for listener in self.listeners:
+            listener(timing)
+
+    def recent_timings(self):
+        with self.lock:
+            return list(self.recent)
+
+    def clear(self):
+        with self.lock:
+            self.recent.clear()
+            self.series.clear()
+
+    def to_prometheus(self):
+        """Render the cumulative totals in the Prometheus text exposition format."""
+        with self.lock:
+            series = [(operation, dict(labels), dict(totals, phases=dict(totals['phases']),
+                                                     counts=dict(totals['counts'])))
+                      for (operation, labels), totals in sorted(self.series.items())]
+
+        def sample(name, operation, labels, value, **extra):
+            return f"{METRIC_PREFIX}_{name}{format_labels({'operation': operation, **labels, **extra})} {value}"
+
+        metrics = {}
+
+        def add(name, kind, help_text, line):
+            metrics.setdefault(name, (kind, help_text, []))[2].append(line)
+
+        for operation, labels, totals in series:
+            add('operations_total', 'counter', 'Operations finished.',
+                sample('operations_total', operation, labels, totals['count']))
+            add('operation_seconds_total', 'counter', 'Time spent in operations.',
+                sample('operation_seconds_total', operation, labels, repr(totals['seconds'])))
+            for phase, seconds in sorted(totals['phases'].items()):
+                add('phase_seconds_total', 'counter', 'Time spent in each phase of an operation.',
+                    sample('phase_seconds_total', operation, labels, repr(seconds), phase=phase))
+            for name, amount in sorted(totals['counts'].items()):
+                add(f'{name}_total', 'counter', COUNT_HELP.get(name, f'{name} processed.'),
+                    sample(f'{name}_total', operation, labels, amount))
+            add('last_operation_timestamp_seconds', 'gauge', 'Unix time the last operation finished.',
+                sample('last_operation_timestamp_seconds', operation, labels, f"{totals['last']:.3f}"))
+
+        lines = []
+        for name, (kind, help_text, samples) in metrics.items():
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Atomically replace ``path`` with the current totals, so scrapers never see half a file."""
+        # tempfile is slow to import and only needed by batch jobs
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix='.metrics-',
+                                         suffix='.prom', delete=False) as fp:
+            fp.write(self.to_prometheus())
+        os.replace(fp.name, path)
+
+    def report(self):
+        """Plain-text averages per operation followed by the most recent operations."""
+        with self.lock:
+            series = sorted(self.series.items())
+            recent = list(self.recent)
+        lines = ['Averages']
+        for (operation, labels), totals in series:
+            count = totals['count']
+            name = ' '.join([operation] + [value for label, value in labels])
+            phases = ', '.join(f"{phase} {format_seconds(seconds / count)}"
+                               for phase, seconds in totals['phases'].items())
+            line = f"  {name}: {count} × {format_seconds(totals['seconds'] / count)} ({phases})"
+            if 'bytes' in totals['counts']:
+                line += f", {format_bytes(totals['counts']['bytes'] / count)} each"
+            lines.append(line)
+        lines += ['', 'Recent']
+        for timing in reversed(recent):
+            name = ' '.join([timing.operation] + list(timing.labels.values()))
+            when = time.strftime('%H:%M:%S', time.localtime(timing.started))
+            lines.append(f"  {when} {name}: {format_seconds(timing.total)} ({timing.summary()})")
+        return '\n'.join(lines)
+
+
+def format_labels(labels):
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def json_logger(write):
+    """Registry listener passing each timing to ``write`` as one JSON line."""
+    return lambda timing: write(json.dumps(timing.as_dict()))
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """Return the process-wide registry shared by the clients, engine and GUI."""
+    return _registry
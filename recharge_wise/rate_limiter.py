@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Requests per second and bucket size. Wise does not publish its limits, so
+# these start conservative and adapt to 429s and rate-limit headers.
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+MIN_RATE = 0.2
+
+# Multiplicative decrease on 429, additive increase on every other response
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+
+REMAINING_HEADERS = ('X-RateLimit-Remaining', 'RateLimit-Remaining')
+RESET_HEADERS = ('X-RateLimit-Reset', 'RateLimit-Reset')
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds from a Retry-After header, or None."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP-date form; email.utils is slow to import and rarely needed
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+
+def _header_number(headers, names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class RateLimiter:
+    """Adaptive token bucket shared by every request made with one token.
+
+    Callers block in ``acquire`` until a token is available; waiting callers
+    are served lowest ``priority`` first, then in arrival order. ``observe``
+    feeds each response back: a 429 halves the rate and pauses for its
+    Retry-After, a 5xx pauses for its Retry-After if it has one, other
+    responses slowly raise the rate back towards the configured maximum,
+    and rate-limit headers cap the tokens on hand.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=MIN_RATE, clock=time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+        self.waiters = []
+        self.sequence = itertools.count()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority=PRIORITY_BULK):
+        entry = (priority, next(self.sequence))
+        with self.condition:
+            heapq.heappush(self.waiters, entry)
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+                    if self.waiters[0] == entry:
+                        if now >= self.paused_until and self.tokens >= 1:
+                            heapq.heappop(self.waiters)
+                            self.tokens -= 1
+                            self.condition.notify_all()
+                            return
+                        delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+                    else:
+                        delay = None
+                    self.condition.wait(delay)
+            except BaseException:
+                if entry in self.waiters:
+                    self.waiters.remove(entry)
+                    heapq.heapify(self.waiters)
+                    self.condition.notify_all()
+                raise
+
+    def observe(self, status_code, headers):
+        with self.condition:
+            now = self.clock()
+            self._refill(now)
+            if status_code == 429:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                self.tokens = 0.0
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                pause = retry_after if retry_after is not None else 1 / self.rate
+                self.paused_until = max(self.paused_until, now + pause)
+            elif status_code >= 500:
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+                remaining = _header_number(headers, REMAINING_HEADERS)
+                if remaining is not None:
+                    self.tokens = min(self.tokens, remaining)
+                    reset = _header_number(headers, RESET_HEADERS)
+                    if remaining < 1 and reset is not None:
+                        # Reset is either seconds from now or an epoch timestamp
+                        if reset > 1e9:
+                            reset -= time.time()
+                        self.paused_until = max(self.paused_until, now + max(0.0, reset))
+            self.condition.notify_all()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(token, environment):
+    """Return the process-wide limiter for one token on one environment."""
+    with _limiters_lock:
+        key = (token, environment)
+        if key not in _limiters:
+            _limiters[key] = RateLimiter()
+        return _limiters[key]
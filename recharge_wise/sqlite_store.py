@@ -0,0 +1,51 @@
+"""Connection handling shared by the local SQLite databases.
+
+The statement cache, transaction store and FX rate store each keep one
+file in the user data directory and one connection to it, opened in WAL
+mode so a long search never blocks a fetch writing new rows.
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+
+def user_data_dir():
+    override = os.environ.get('RECHARGE_WISE_DATA_DIR')
+    if override:
+        return override
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return os.path.join(base, 'recharge_wise')
+
+
+class SQLiteStore:
+    """One SQLite connection used from any thread, serialised by ``lock``.
+
+    Subclasses create their tables after calling ``__init__`` and hold
+    ``lock`` around every use of ``connection``. ``path`` may be
+    ``':memory:'``; otherwise its directory is created. Closing, directly
+    or by leaving a ``with`` block, waits for the call in progress.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
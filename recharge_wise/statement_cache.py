@@ -0,0 +1,219 @@
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from .metrics import Timing
+from .sqlite_store import SQLiteStore, user_data_dir
+from .statement_parser import utc_now
+from .statement_stream import StreamedStatement, load_statement_files, read_statement
+from .wise_client import DEFAULT_STATEMENT_WORKERS, DEFAULT_WINDOW_MONTHS, parse_date, split_interval
+
+# Windows that ended longer ago than this are treated as closed and never
+# re-fetched; younger ones may still receive late-settling transactions.
+SETTLE_DELAY = timedelta(days=2)
+
+# Bumped whenever the tables change; older caches are dropped and refilled
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statement_windows (
+    environment TEXT NOT NULL,
+    profile_id TEXT NOT NULL,
+    balance_id TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    api_version TEXT NOT NULL,
+    interval_start TEXT NOT NULL,
+    interval_end TEXT NOT NULL,
+    closed INTEGER NOT NULL,
+    last_date TEXT,
+    newest_first INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (environment, profile_id, balance_id, currency, api_version, interval_start, interval_end)
+);
+"""
+
+WINDOW_KEY = ('environment = ? AND profile_id = ? AND balance_id = ? AND currency = ? AND api_version = ? '
+              'AND interval_start = ? AND interval_end = ?')
+
+
+def default_cache_path():
+    return os.path.join(user_data_dir(), 'statements.sqlite3')
+
+
+class StatementCache(SQLiteStore):
+    """SQLite cache of raw statement windows.
+
+    Windows are keyed by environment, profile, balance, currency, API
+    version and exact interval, and kept as the JSON the API returned so
+    they are decoded with the same streaming reader as fresh downloads.
+    """
+
+    def __init__(self, path=None):
+        super().__init__(path or default_cache_path())
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript('DROP TABLE IF EXISTS statement_windows; '
+                                          'DROP TABLE IF EXISTS statement_transactions;')
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.connection.executescript(SCHEMA)
+
+    def get_window(self, key, interval_start, interval_end):
+        """Return ``(closed, last_date, newest_first)`` for a cached window, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                f'SELECT closed, last_date, newest_first FROM statement_windows WHERE {WINDOW_KEY}',
+                (*key, interval_start, interval_end)).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1], bool(row[2])
+
+    def get_body(self, key, interval_start, interval_end):
+        with self.lock:
+            return self.connection.execute(
+                f'SELECT body FROM statement_windows WHERE {WINDOW_KEY}',
+                (*key, interval_start, interval_end)).fetchone()[0]
+
+    def store_window(self, key, interval_start, interval_end, path, closed):
+        """Store a window's statement file, replacing any earlier copy."""
+        last_date, newest_first = None, False
+        if not closed:
+            with open(path, encoding='utf-8') as fp:
+                _, last_date, newest_first = _scan_window(fp)
+        with open(path, 'rb') as fp:
+            body = fp.read()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO statement_windows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (*key, interval_start, interval_end, int(closed), last_date, int(newest_first), body,
+                 utc_now().isoformat()))
+
+    def fetch_statement(self, client, profile_id, balance_id, currency, start_date, end_date,
+                        api_version='v3', window_months=DEFAULT_WINDOW_MONTHS,
+                        max_workers=DEFAULT_STATEMENT_WORKERS, on_progress=None, now=None, timing=None):
+        """Fetch a statement as parallel monthly windows, served from the cache where possible.
+
+        Closed windows are read from disk. A cached open window only fetches
+        the tail from its last cached transaction date and merges in the new
+        rows; uncached windows are fetched in full. All network requests go
+        out in parallel. Like ``fetch_statement_stream``, every window goes
+        through a temp file and the streaming decoder, a ``StreamedStatement``
+        is returned and the ``download``, ``cache`` and ``decode`` phases are
+        added to ``timing`` or recorded in ``client.metrics``.
+        """
+        now = now or utc_now()
+        own_timing = timing is None
+        if own_timing:
+            timing = Timing('statement')
+        key = (client.environment, str(profile_id), str(balance_id), currency, api_version)
+        windows = split_interval(start_date, end_date, window_months)
+        cached = [self.get_window(key, *window) for window in windows]
+
+        pending = []
+        for index, ((window_start, window_end), info) in enumerate(zip(windows, cached)):
+            if info is None:
+                pending.append((index, (window_start, window_end)))
+            elif not info[0]:
+                pending.append((index, (info[1] or window_start, window_end)))
+
+        with timing.phase('download'):
+            downloaded = []
+            if pending:
+                downloaded = client.download_windows(profile_id, balance_id, currency,
+                                                     [window for index, window in pending],
+                                                     api_version=api_version, max_workers=max_workers,
+                                                     on_progress=on_progress)
+        fetched = dict(zip([index for index, window in pending], downloaded))
+        paths = []
+        try:
+            with timing.phase('cache'):
+                for index, (window_start, window_end) in enumerate(windows):
+                    if index not in fetched:
+                        paths.append(_spill(self.get_body(key, window_start, window_end)))
+                        continue
+                    path = fetched[index]
+                    if cached[index] is not None:
+                        tail_path = path
+                        body = self.get_body(key, window_start, window_end)
+                        with io.TextIOWrapper(io.BytesIO(body), encoding='utf-8') as cached_fp, \
+                                open(tail_path, encoding='utf-8') as tail_fp:
+                            path = _merge_tail(cached_fp, cached[index][2], tail_fp)
+                        os.remove(tail_path)
+                    paths.append(path)
+                    self.store_window(key, window_start, window_end, path,
+                                      parse_date(window_end) < now - SETTLE_DELAY)
+            timing.count('bytes', sum(os.path.getsize(path) for path in paths))
+            with timing.phase('decode'):
+                header, columns = load_statement_files(paths)
+        except BaseException:
+            StreamedStatement(None, None, paths + downloaded).close()
+            raise
+        timing.count('rows', len(columns))
+        if own_timing:
+            client.metrics.record(timing)
+        return StreamedStatement(header, columns, paths)
+
+
+def _spill(body):
+    with tempfile.NamedTemporaryFile('wb', prefix='wise-statement-', suffix='.json', delete=False) as fp:
+        fp.write(body)
+    return fp.name
+
+
+def _scan_window(fp):
+    """Return a statement's header, latest transaction date and whether it lists newest first."""
+    first = last = latest = None
+
+    def on_transaction(transaction):
+        nonlocal first, last, latest
+        date = transaction['date']
+        if first is None:
+            first = date
+        last = date
+        if latest is None or date > latest:
+            latest = date
+
+    header = read_statement(fp, on_transaction)
+    return header, latest, first is not None and first > last
+
+
+def _merge_tail(cached_fp, newest_first, tail_fp):
+    """Merge a freshly fetched tail into a cached window, streaming the cached rows.
+
+    Cached transactions the tail repeats are dropped; the tail goes first
+    for newest-first statements and last otherwise. The end balance comes
+    from the tail. Returns the path of the merged statement file.
+    """
+    tail = []
+    tail_header = read_statement(tail_fp, tail.append)
+    references = {t.get('referenceNumber') for t in tail} - {None}
+    newest_first = newest_first or (len(tail) > 1 and tail[0]['date'] > tail[-1]['date'])
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', prefix='wise-statement-', suffix='.json',
+                                     delete=False) as out:
+        written = 0
+
+        def write(transaction):
+            nonlocal written
+            out.write(', ' + json.dumps(transaction) if written else json.dumps(transaction))
+            written += 1
+
+        def write_cached(transaction):
+            if transaction.get('referenceNumber') not in references:
+                write(transaction)
+
+        out.write('{"transactions": [')
+        if newest_first:
+            for transaction in tail:
+                write(transaction)
+        header = read_statement(cached_fp, write_cached)
+        if not newest_first:
+            for transaction in tail:
+                write(transaction)
+        header['endOfStatementBalance'] = tail_header['endOfStatementBalance']
+        header['query'] = dict(header.get('query', {}))
+        if 'intervalEnd' in tail_header.get('query', {}):
+            header['query']['intervalEnd'] = tail_header['query']['intervalEnd']
+        out.write(']' + ''.join(f', {json.dumps(k)}: {json.dumps(v)}' for k, v in header.items()) + '}')
+    return out.name
@@ -0,0 +1,360 @@
+import math
+
+from PyQt5.QtCore import QAbstractProxyModel, QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+from PyQt5.QtWidgets import QHeaderView
+
+from .statement_parser import COLUMN_HEADERS, StatementColumns, format_date_ms, from_scaled
+
+# Number of rows measured when sizing columns
+SIZE_SAMPLE_ROWS = 200
+MAX_COLUMN_WIDTH = 400
+
+TYPE_COLORS = {
+    'CREDIT': (QBrush(QColor(Qt.darkGreen)), QBrush(QColor(Qt.white))),
+    'DEBIT': (QBrush(QColor(Qt.darkRed)), QBrush(QColor(Qt.white))),
+}
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """Read-only table model over a ``StatementColumns`` store.
+
+    Cells are formatted in ``data()`` so only rows the view paints are ever
+    touched. ``merge_columns`` applies a newer fetch of the same statement as
+    row inserts and in-place changes instead of a reset.
+    """
+
+    # Emitted once per merge with the rows changed in place, after their
+    # ``dataChanged`` signals, so views can check their order in one pass
+    rowsMerged = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = StatementColumns()
+        self.rows_by_reference = {}
+
+    def set_columns(self, columns):
+        self.beginResetModel()
+        self.columns = columns
+        self.rows_by_reference = {reference: row for row, reference in enumerate(columns.reference)}
+        self.endResetModel()
+
+    def merge_columns(self, columns, summary=None):
+        """Diff ``columns`` against the current rows by reference number.
+
+        New references are appended and rows whose values differ are updated
+        in place; rows missing from ``columns`` are kept. ``summary``, if
+        given, is kept in step. Returns ``(added, changed)`` row counts.
+        """
+        current = self.columns
+        rows_by_reference = self.rows_by_reference
+        matches = list(map(rows_by_reference.get, columns.reference))
+        added = [source_row for source_row, row in enumerate(matches) if row is None]
+        changed = current.changed_rows(columns, matches)
+
+        for row, source_row in changed:
+            if summary is not None:
+                summary.remove_row(current, row)
+            current.copy_row(row, columns, source_row)
+            if summary is not None:
+                summary.add_row(current, row)
+        if changed:
+            rows = [row for row, _ in changed]
+            last_column = self.columnCount() - 1
+            for first, last in row_ranges(rows):
+                self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+            self.rowsMerged.emit(rows)
+
+        if added:
+            first = len(current)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            current.extend_from(columns, added)
+            for row in range(first, len(current)):
+                rows_by_reference[current.reference[row]] = row
+            self.endInsertRows()
+            if summary is not None:
+                summary.update(current)
+        return len(added), len(changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMN_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self.display_value(row, column)
+        if role in (Qt.BackgroundRole, Qt.ForegroundRole):
+            colors = TYPE_COLORS.get(self.columns.type_name(row))
+            if colors:
+                return colors[0] if role == Qt.BackgroundRole else colors[1]
+        return None
+
+    def display_value(self, row, column):
+        c = self.columns
+        if column == 0:
+            return format_date_ms(c.date[row])
+        if column == 1:
+            return c.type_name(row)
+        if column == 2:
+            return f"{from_scaled(c.amount[row]):,.2f}"
+        if column == 3:
+            return c.currency_name(row)
+        if column == 4:
+            return c.description[row]
+        if column == 5:
+            return str(from_scaled(c.fees[row])) if c.fees[row] != 0 else '-'
+        if column == 6:
+            return c.details[row]
+        if column == 7:
+            rate = c.exchange_rate[row]
+            return f"{rate:,.6f}" if not math.isnan(rate) else '-'
+        if column == 8:
+            return f"{from_scaled(c.running_balance[row]):,.2f} {c.currencies[c.running_currency[row]]}"
+        if column == 9:
+            return c.reference[row]
+        return c.recipient[row]
+
+    def sort_keys(self, column):
+        """Return one sort key per row, using raw values for numeric columns."""
+        c = self.columns
+        if column == 0:
+            return c.date
+        if column == 1:
+            return c.decoded('type')
+        if column == 2:
+            return c.amount
+        if column == 3:
+            return c.decoded('currency')
+        if column == 4:
+            return c.description
+        if column == 5:
+            return c.fees
+        if column == 6:
+            return c.details
+        if column == 7:
+            return [rate if not math.isnan(rate) else 0.0 for rate in c.exchange_rate]
+        if column == 8:
+            return c.running_balance
+        if column == 9:
+            return c.reference
+        return c.recipient
+
+
+class ColumnSortProxyModel(QAbstractProxyModel):
+    """Sorting proxy that orders rows by a whole-column key list.
+
+    ``QSortFilterProxyModel`` calls back into Python for every comparison,
+    which dominates render time on large statements. Here a sort is a single
+    ``sorted()`` over the source model's ``sort_keys`` and rows are mapped
+    through the resulting permutation. Rows appended to the source are
+    binary-searched into place rather than triggering a re-sort, and rows
+    changed by a merge are checked against their neighbours once per merge.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.order = []
+        self.positions = []
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelReset.connect(self.reset_order)
+        model.rowsInserted.connect(self.on_rows_inserted)
+        model.dataChanged.connect(self.on_data_changed)
+        model.rowsMerged.connect(self.on_rows_merged)
+        self.reset_order()
+
+    def reset_order(self):
+        self.beginResetModel()
+        self.order = self.sorted_rows()
+        self.update_positions()
+        self.endResetModel()
+
+    def sorted_rows(self):
+        rows = range(self.sourceModel().rowCount())
+        if self.sort_column < 0:
+            return list(rows)
+        keys = self.sourceModel().sort_keys(self.sort_column)
+        return sorted(rows, key=keys.__getitem__, reverse=self.sort_order == Qt.DescendingOrder)
+
+    def update_positions(self):
+        self.positions = [0] * len(self.order)
+        for position, row in enumerate(self.order):
+            self.positions[row] = position
+
+    def insert_position(self, keys, key):
+        # Bisect to the end of any run of equal keys, matching a stable sort
+        descending = self.sort_order == Qt.DescendingOrder
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            other = keys[self.order[middle]]
+            if (key < other) if not descending else (other < key):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def on_rows_inserted(self, parent, first, last):
+        if self.sort_column < 0:
+            self.beginInsertRows(QModelIndex(), len(self.order), len(self.order) + last - first)
+            self.order.extend(range(first, last + 1))
+            self.endInsertRows()
+        else:
+            # Rows landing at the same place (typically all of them, at one
+            # end) go in as one block; blocks are inserted back to front so
+            # earlier positions stay valid
+            keys = self.sourceModel().sort_keys(self.sort_column)
+            rows = sorted(range(first, last + 1), key=keys.__getitem__,
+                          reverse=self.sort_order == Qt.DescendingOrder)
+            blocks = []
+            for row in rows:
+                position = self.insert_position(keys, keys[row])
+                if blocks and blocks[-1][0] == position:
+                    blocks[-1][1].append(row)
+                else:
+                    blocks.append((position, [row]))
+            for position, block in reversed(blocks):
+                self.beginInsertRows(QModelIndex(), position, position + len(block) - 1)
+                self.order[position:position] = block
+                self.endInsertRows()
+        self.update_positions()
+
+    def on_data_changed(self, top_left, bottom_right, roles=()):
+        # Rows keep their place here; the source reports merged rows through
+        # ``rowsMerged`` so the order is checked once rather than per range
+        positions = sorted(self.positions[row] for row in range(top_left.row(), bottom_right.row() + 1))
+        for first, last in row_ranges(positions):
+            self.dataChanged.emit(self.index(first, top_left.column()),
+                                  self.index(last, bottom_right.column()), roles)
+
+    def on_rows_merged(self, rows):
+        if self.sort_column >= 0 and not self.in_order(rows):
+            self.sort(self.sort_column, self.sort_order)
+
+    def in_order(self, rows):
+        """Whether each of ``rows`` still sorts between its neighbours.
+
+        Equal keys must stay in source row order, as a stable sort leaves them.
+        """
+        keys = self.sourceModel().sort_keys(self.sort_column)
+        descending = self.sort_order == Qt.DescendingOrder
+
+        def ordered(first, second):
+            if keys[first] == keys[second]:
+                return first < second
+            return (keys[second] < keys[first]) if descending else (keys[first] < keys[second])
+
+        for row in rows:
+            position = self.positions[row]
+            if position > 0 and not ordered(self.order[position - 1], row):
+                return False
+            if position + 1 < len(self.order) and not ordered(row, self.order[position + 1]):
+                return False
+        return True
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        source = self.sourceModel()
+        if column < 0 or source is None:
+            return
+        self.sort_column, self.sort_order = column, order
+        self.layoutAboutToBeChanged.emit()
+        old_order = self.order
+        self.order = self.sorted_rows()
+        self.update_positions()
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(persistent, [
+            self.index(self.positions[old_order[index.row()]], index.column()) for index in persistent
+        ])
+        self.layoutChanged.emit()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        # The base class maps sections through row 0, which an empty model lacks
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        if role == Qt.DisplayRole:
+            return section + 1
+        return None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.order)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.order[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.index(self.positions[source_index.row()], source_index.column())
+
+
+def row_ranges(rows):
+    """Yield ``(first, last)`` for each run of consecutive values in sorted ``rows``."""
+    start = None
+    for row in rows:
+        if start is None:
+            start = previous = row
+        elif row != previous + 1:
+            yield start, previous
+            start = previous = row
+        else:
+            previous = row
+    if start is not None:
+        yield start, previous
+
+
+def make_sort_proxy(model, parent=None):
+    proxy = ColumnSortProxyModel(parent)
+    proxy.setSourceModel(model)
+    return proxy
+
+
+def size_columns_from_sample(view, sample_rows=SIZE_SAMPLE_ROWS, max_width=MAX_COLUMN_WIDTH):
+    """Size columns from the first rows only and fix row heights.
+
+    Unlike ``ResizeToContents`` this never measures the whole model, so it
+    stays cheap for very large statements.
+    """
+    model = view.model()
+    metrics = view.fontMetrics()
+    padding = 2 * metrics.averageCharWidth()
+    rows = min(model.rowCount(), sample_rows)
+    max_lines = 1
+    for column in range(model.columnCount()):
+        header = model.headerData(column, Qt.Horizontal, Qt.DisplayRole)
+        width = metrics.horizontalAdvance(header)
+        for row in range(rows):
+            text = model.data(model.index(row, column), Qt.DisplayRole) or ''
+            lines = text.split('\n')
+            max_lines = max(max_lines, len(lines))
+            width = max(width, max(metrics.horizontalAdvance(line) for line in lines))
+        view.setColumnWidth(column, min(width + padding, max_width))
+
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(metrics.lineSpacing() * max_lines + metrics.height() // 2)
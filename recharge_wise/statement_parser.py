@@ -0,0 +1,644 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+COLUMN_HEADERS = [
+    "Date", "Type", "Amount", "Currency", "Description",
+    "Fees", "Transaction Details", "Exchange Rate",
+    "Running Balance", "Reference", "Recipient"
+]
+
+# Amounts are stored as integers in units of 1/AMOUNT_SCALE, enough for
+# three-decimal currencies without float drift when summing
+AMOUNT_SCALE = 10_000
+
+EPOCH = datetime(1970, 1, 1)
+MS_PER_DAY = 86_400_000
+
+NO_RATE = float('nan')
+
+# Rows below which differing column spans are compared value by value
+DIFF_SPAN = 64
+
+
+def parse_date_ms(date_str):
+    """Parse a Wise ``...Z`` timestamp into UTC epoch milliseconds."""
+    value = datetime.fromisoformat(date_str[:-1] if date_str.endswith('Z') else date_str)
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def date_from_ms(date_ms):
+    return EPOCH + timedelta(milliseconds=date_ms)
+
+
+def utc_now():
+    """The current time as a naive UTC datetime, like ``EPOCH`` and ``date_from_ms``."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def format_date_ms(date_ms):
+    return date_from_ms(date_ms).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def to_scaled(value):
+    return round(value * AMOUNT_SCALE)
+
+
+def from_scaled(value):
+    return value / AMOUNT_SCALE
+
+
+def details_text(details):
+    if details['type'] == 'CONVERSION':
+        text = f"From: {details['sourceAmount']['value']:,.2f} {details['sourceAmount']['currency']}\n"
+        text += f"To: {details['targetAmount']['value']:,.2f} {details['targetAmount']['currency']}"
+    elif details['type'] == 'DEPOSIT':
+        text = f"Sender: {details.get('senderName', 'N/A')}\n"
+        text += f"Sender Account: {details.get('senderAccount', 'N/A')}\n"
+        text += f"Payment Reference: {details.get('paymentReference', 'N/A')}"
+    else:
+        text = details['type']
+    return text
+
+
+def recipient_text(details):
+    recipient = details.get('recipient', {})
+    if recipient:
+        return f"{recipient.get('name', 'N/A')}\n{recipient.get('bankAccount', 'N/A')}"
+    elif details.get('type') == 'DEPOSIT':
+        return f"Sender: {details.get('senderName', 'N/A')}"
+    return '-'
+
+
+def exchange_rate(transaction):
+    if transaction['exchangeDetails']:
+        return transaction['exchangeDetails']['rate']
+    return transaction['details'].get('rate')
+
+
+def counter_amount(transaction):
+    """The other side of a currency exchange as ``(value, currency)``, or None.
+
+    That is the opposite leg of a conversion, or the original amount of a
+    payment made in another currency (``exchangeDetails.forAmount``). The
+    value carries the sign of the transaction's own amount.
+    """
+    details = transaction['details']
+    currency = transaction['amount']['currency']
+    other = None
+    if details.get('type') == 'CONVERSION' and 'sourceAmount' in details and 'targetAmount' in details:
+        source, target = details['sourceAmount'], details['targetAmount']
+        other = target if source['currency'] == currency else source
+    elif transaction['exchangeDetails'] and transaction['exchangeDetails'].get('forAmount'):
+        other = transaction['exchangeDetails']['forAmount']
+    if other is None or other['currency'] == currency:
+        return None
+    value = abs(other['value'])
+    return (-value if transaction['amount']['value'] < 0 else value), other['currency']
+
+
+class Categories:
+    """Maps repeated strings (types, currencies) to small integer codes."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get(self, value, default=None):
+        return self.codes.get(value, default)
+
+
+class StatementColumns:
+    """Column-oriented store of a statement's transactions.
+
+    Numeric fields live in typed ``array`` columns: dates as UTC epoch
+    milliseconds, money as integers scaled by ``AMOUNT_SCALE``, and
+    transaction/detail types and currencies as codes into shared
+    ``Categories``. Free-text fields stay as lists of strings.
+
+    ``counter_amount``/``counter_currency`` hold the other side of an
+    exchange (see ``counter_amount``); rows without one have 0 and ''.
+    """
+
+    FIELDS = (
+        'date', 'type', 'detail_type', 'amount', 'currency', 'fees',
+        'fee_currency', 'exchange_rate', 'counter_amount', 'counter_currency',
+        'running_balance', 'running_currency', 'description', 'details', 'reference',
+        'recipient',
+    )
+    # Coded fields and the attribute holding their ``Categories``
+    CATEGORICAL = {
+        'type': 'types',
+        'detail_type': 'detail_types',
+        'currency': 'currencies',
+        'fee_currency': 'currencies',
+        'counter_currency': 'currencies',
+        'running_currency': 'currencies',
+    }
+
+    def __init__(self):
+        self.types = Categories()
+        self.detail_types = Categories()
+        self.currencies = Categories()
+
+        self.date = array('q')
+        self.type = array('B')
+        self.detail_type = array('B')
+        self.amount = array('q')
+        self.currency = array('H')
+        self.fees = array('q')
+        self.fee_currency = array('H')
+        self.exchange_rate = array('d')
+        self.counter_amount = array('q')
+        self.counter_currency = array('H')
+        self.running_balance = array('q')
+        self.running_currency = array('H')
+        self.description = []
+        self.details = []
+        self.reference = []
+        self.recipient = []
+
+    def __len__(self):
+        return len(self.date)
+
+    def append(self, transaction):
+        details = transaction['details']
+        currency_code = self.currencies.code
+        rate = exchange_rate(transaction)
+        counter = counter_amount(transaction) or (0, '')
+
+        self.date.append(parse_date_ms(transaction['date']))
+        self.type.append(self.types.code(transaction['type']))
+        self.detail_type.append(self.detail_types.code(details['type']))
+        self.amount.append(to_scaled(transaction['amount']['value']))
+        self.currency.append(currency_code(transaction['amount']['currency']))
+        self.fees.append(to_scaled(transaction['totalFees']['value']))
+        self.fee_currency.append(currency_code(transaction['totalFees']['currency']))
+        self.exchange_rate.append(rate if rate is not None else NO_RATE)
+        self.counter_amount.append(to_scaled(counter[0]))
+        self.counter_currency.append(currency_code(counter[1]))
+        self.running_balance.append(to_scaled(transaction['runningBalance']['value']))
+        self.running_currency.append(currency_code(transaction['runningBalance']['currency']))
+        self.description.append(details['description'])
+        self.details.append(details_text(details))
+        self.reference.append(transaction['referenceNumber'])
+        self.recipient.append(recipient_text(details))
+
+    def extend(self, transactions):
+        for transaction in transactions:
+            self.append(transaction)
+
+    def take(self, rows):
+        """Return a new store holding ``rows`` in the given order.
+
+        Categories are shared with this store, so codes stay valid.
+        """
+        taken = StatementColumns()
+        taken.types = self.types
+        taken.detail_types = self.detail_types
+        taken.currencies = self.currencies
+        for field in self.FIELDS:
+            source = getattr(self, field)
+            values = [source[row] for row in rows]
+            if isinstance(source, array):
+                values = array(source.typecode, values)
+            setattr(taken, field, values)
+        return taken
+
+    def _code_maps(self, source):
+        """Return, per categorical field, a list translating ``source`` codes to ours."""
+        maps = {}
+        for attr in set(self.CATEGORICAL.values()):
+            mine, theirs = getattr(self, attr), getattr(source, attr)
+            maps[attr] = None if mine is theirs else [mine.code(value) for value in theirs.values]
+        return maps
+
+    def extend_from(self, source, rows):
+        """Append ``rows`` of another store, re-coding its categorical values."""
+        maps = self._code_maps(source)
+        for field in self.FIELDS:
+            values = getattr(source, field)
+            code_map = maps.get(self.CATEGORICAL.get(field))
+            if code_map is None:
+                getattr(self, field).extend(values[row] for row in rows)
+            else:
+                getattr(self, field).extend(code_map[values[row]] for row in rows)
+
+    def copy_row(self, row, source, source_row):
+        """Overwrite ``row`` in place with ``source_row`` of another store."""
+        maps = self._code_maps(source)
+        for field in self.FIELDS:
+            value = getattr(source, field)[source_row]
+            code_map = maps.get(self.CATEGORICAL.get(field))
+            getattr(self, field)[row] = value if code_map is None else code_map[value]
+
+    def changed_rows(self, source, matches):
+        """Return ``(row, source_row)`` for matched rows whose values differ.
+
+        ``matches[source_row]`` is the row of ours holding the same
+        transaction, or None. Matched rows are compared as contiguous runs a
+        field at a time, so an unchanged statement costs a few slice
+        comparisons rather than a Python loop over every value.
+        """
+        runs = _match_runs(matches)
+        maps = self._code_maps_existing(source)
+        changed = set()
+        for field in self.FIELDS:
+            mine, theirs = getattr(self, field), getattr(source, field)
+            code_map = maps.get(self.CATEGORICAL.get(field))
+            for row, source_row, length in runs:
+                ours = mine[row:row + length]
+                other = theirs[source_row:source_row + length]
+                if code_map is not None:
+                    other = list(map(code_map.__getitem__, other))
+                    ours = ours.tolist()
+                # Halve unequal spans until they are small enough to walk
+                spans = [(0, length)]
+                while spans:
+                    low, high = spans.pop()
+                    if _same_values(ours[low:high], other[low:high]):
+                        continue
+                    if high - low > DIFF_SPAN:
+                        middle = (low + high) // 2
+                        spans.extend(((low, middle), (middle, high)))
+                        continue
+                    for offset in range(low, high):
+                        a, b = ours[offset], other[offset]
+                        if a != b and not (a != a and b != b):
+                            changed.add((row + offset, source_row + offset))
+        return sorted(changed)
+
+    def _code_maps_existing(self, source):
+        # Like _code_maps, but unseen values map to None instead of being
+        # added, and no map is needed when both stores share their codes
+        maps = {}
+        for attr in set(self.CATEGORICAL.values()):
+            mine, theirs = getattr(self, attr), getattr(source, attr)
+            code_map = None if mine is theirs else [mine.get(value) for value in theirs.values]
+            maps[attr] = None if code_map == list(range(len(theirs))) else code_map
+        return maps
+
+    def append_values(self, values):
+        """Append one row given in ``FIELDS`` order, with categorical values decoded."""
+        for field, value in zip(self.FIELDS, values):
+            attr = self.CATEGORICAL.get(field)
+            if attr is not None:
+                value = getattr(self, attr).code(value)
+            elif value is None:
+                value = NO_RATE
+            getattr(self, field).append(value)
+
+    def iter_values(self):
+        """Yield every row as a tuple in ``FIELDS`` order, decoded, with no rate as None."""
+        fields = []
+        for field in self.FIELDS:
+            values = getattr(self, field)
+            attr = self.CATEGORICAL.get(field)
+            if attr is not None:
+                values = map(getattr(self, attr).values.__getitem__, values)
+            elif field == 'exchange_rate':
+                values = (None if rate != rate else rate for rate in values)
+            fields.append(values)
+        return zip(*fields)
+
+    def type_name(self, row):
+        return self.types[self.type[row]]
+
+    def currency_name(self, row):
+        return self.currencies[self.currency[row]]
+
+    def decoded(self, column):
+        """Return a categorical column as a list of strings."""
+        values = getattr(self, self.CATEGORICAL[column]).values
+        return [values[code] for code in getattr(self, column)]
+
+
+def _same_values(ours, other):
+    if isinstance(ours, array):
+        # Byte comparison also treats the shared NaN "no rate" as equal
+        return ours.tobytes() == other.tobytes() or ours == other
+    return ours == other
+
+
+def _match_runs(matches):
+    """Group ``matches`` into ``[row, source_row, length]`` runs that advance together."""
+    runs = []
+    start = 0
+    gaps = [source_row for source_row, row in enumerate(matches) if row is None]
+    for gap in gaps + [len(matches)]:
+        segment = matches[start:gap]
+        # Usually each stretch between new rows lines up with ours in order
+        if segment and segment == list(range(segment[0], segment[0] + len(segment))):
+            runs.append([segment[0], start, len(segment)])
+        else:
+            for source_row, row in enumerate(segment, start):
+                if runs:
+                    run = runs[-1]
+                    if run[0] + run[2] == row and run[1] + run[2] == source_row:
+                        run[2] += 1
+                        continue
+                runs.append([row, source_row, 1])
+        start = gap + 1
+    return runs
+
+
+def parse_transactions(transactions):
+    columns = StatementColumns()
+    columns.extend(transactions)
+    return columns
+
+
+class StatementSummary:
+    """Running aggregates over a ``StatementColumns`` store.
+
+    Everything is computed in one pass over the typed columns; ``update``
+    only visits rows added since the previous call, so totals can be kept
+    current as rows are appended. Money totals are scaled integers.
+    """
+
+    def __init__(self, currency):
+        self.currency = currency
+        self.rows_seen = 0
+        self.type_counts = {}
+        self.detail_type_counts = {}
+        # currency -> [count, credits, debits, fees]
+        self.by_currency = {}
+        # (UTC day start in epoch ms, currency) -> [count, credits, debits]
+        self.by_day = {}
+
+    def update(self, columns):
+        start = self.rows_seen
+        if start >= len(columns):
+            return self
+        types = columns.types
+        detail_types = columns.detail_types
+        currencies = columns.currencies
+        type_counts = [0] * len(types)
+        detail_type_counts = [0] * len(detail_types)
+        by_currency_code = {}
+        by_day_code = {}
+        credit = types.get('CREDIT')
+        debit = types.get('DEBIT')
+
+        for date, type_code, detail_code, amount, currency, fee, fee_currency in zip(
+                columns.date[start:], columns.type[start:], columns.detail_type[start:],
+                columns.amount[start:], columns.currency[start:], columns.fees[start:],
+                columns.fee_currency[start:]):
+            type_counts[type_code] += 1
+            detail_type_counts[detail_code] += 1
+
+            totals = by_currency_code.get(currency)
+            if totals is None:
+                totals = by_currency_code[currency] = [0, 0, 0, 0]
+            day_key = (date - date % MS_PER_DAY, currency)
+            day = by_day_code.get(day_key)
+            if day is None:
+                day = by_day_code[day_key] = [0, 0, 0]
+
+            totals[0] += 1
+            day[0] += 1
+            if type_code == credit:
+                totals[1] += amount
+                day[1] += amount
+            elif type_code == debit:
+                totals[2] -= amount
+                day[2] -= amount
+            if fee_currency == currency:
+                totals[3] += fee
+            elif fee:
+                fee_totals = by_currency_code.get(fee_currency)
+                if fee_totals is None:
+                    fee_totals = by_currency_code[fee_currency] = [0, 0, 0, 0]
+                fee_totals[3] += fee
+
+        _merge_counts(self.type_counts, types, type_counts)
+        _merge_counts(self.detail_type_counts, detail_types, detail_type_counts)
+        for code, values in by_currency_code.items():
+            _merge_totals(self.by_currency, currencies[code], values)
+        for (day, code), values in by_day_code.items():
+            _merge_totals(self.by_day, (day, currencies[code]), values)
+        self.rows_seen = len(columns)
+        return self
+
+    def add_row(self, columns, row):
+        """Count one already-seen row again, e.g. after it changed in place."""
+        self._apply_row(columns, row, 1)
+
+    def remove_row(self, columns, row):
+        self._apply_row(columns, row, -1)
+
+    def _apply_row(self, columns, row, sign):
+        type_name = columns.types[columns.type[row]]
+        detail_type = columns.detail_types[columns.detail_type[row]]
+        currency = columns.currencies[columns.currency[row]]
+        fee_currency = columns.currencies[columns.fee_currency[row]]
+        amount = columns.amount[row] * sign
+        fee = columns.fees[row] * sign
+        date = columns.date[row]
+
+        _add_count(self.type_counts, type_name, sign)
+        _add_count(self.detail_type_counts, detail_type, sign)
+        day_key = (date - date % MS_PER_DAY, currency)
+        totals = self.by_currency.setdefault(currency, [0, 0, 0, 0])
+        day = self.by_day.setdefault(day_key, [0, 0, 0])
+        totals[0] += sign
+        day[0] += sign
+        if type_name == 'CREDIT':
+            totals[1] += amount
+            day[1] += amount
+        elif type_name == 'DEBIT':
+            totals[2] -= amount
+            day[2] -= amount
+        if fee:
+            self.by_currency.setdefault(fee_currency, [0, 0, 0, 0])[3] += fee
+        # Drop groups left empty, as a fresh ``update`` would never create them
+        for target, key in ((self.by_currency, currency), (self.by_currency, fee_currency), (self.by_day, day_key)):
+            values = target.get(key)
+            if values is not None and not any(values):
+                del target[key]
+
+    @property
+    def total_transactions(self):
+        return self.rows_seen
+
+    def count(self, transaction_type):
+        return self.type_counts.get(transaction_type, 0)
+
+    def detail_count(self, detail_type):
+        return self.detail_type_counts.get(detail_type, 0)
+
+    def currency_totals(self, currency=None):
+        """Return ``(credits, debits, fees)`` as floats for ``currency``."""
+        count, credits, debits, fees = self.by_currency.get(currency or self.currency, (0, 0, 0, 0))
+        return from_scaled(credits), from_scaled(debits), from_scaled(fees)
+
+    @property
+    def total_credits(self):
+        return self.currency_totals()[0]
+
+    @property
+    def total_debits(self):
+        return self.currency_totals()[1]
+
+    @property
+    def total_fees(self):
+        return self.currency_totals()[2]
+
+
+def _add_count(target, key, count):
+    count += target.get(key, 0)
+    if count:
+        target[key] = count
+    else:
+        target.pop(key, None)
+
+
+def _merge_counts(target, categories, counts):
+    for code, count in enumerate(counts):
+        if count:
+            name = categories[code]
+            target[name] = target.get(name, 0) + count
+
+
+def _merge_totals(target, key, values):
+    existing = target.get(key)
+    if existing is None:
+        target[key] = list(values)
+    else:
+        for i, value in enumerate(values):
+            existing[i] += value
+
+
+def summarize(columns, currency):
+    return StatementSummary(currency).update(columns)
+
+
+class ConsolidatedSummary(StatementSummary):
+    """``StatementSummary`` of several balances, valued in one reporting ``currency``.
+
+    The pass over the rows keeps exact native totals per currency and UTC
+    day; only those groups are converted afterwards, so the rates needed
+    (``rate_keys``) and the multiplications scale with days × currencies
+    rather than rows. A row whose other exchange leg is in the reporting
+    currency is valued at that leg instead, i.e. at its own rate.
+    """
+
+    def __init__(self, currency):
+        super().__init__(currency)
+        # (UTC day start, currency) -> [credits, debits, fees] still to convert
+        self.to_convert = {}
+        # currency -> [credits, debits, fees] already in the reporting currency
+        self.exact = {}
+        # currency -> [credits, debits, fees] in the reporting currency, set by convert
+        self.converted = {}
+        self.exchange_valued = 0
+
+    def update(self, columns):
+        start = self.rows_seen
+        if start >= len(columns):
+            return self
+        types = columns.types
+        detail_types = columns.detail_types
+        currencies = columns.currencies
+        type_counts = [0] * len(types)
+        detail_type_counts = [0] * len(detail_types)
+        by_currency_code = {}
+        to_convert_code = {}
+        exact_code = {}
+        credit = types.get('CREDIT')
+        debit = types.get('DEBIT')
+        reporting = currencies.get(self.currency)
+        exchange_valued = 0
+
+        for date, type_code, detail_code, amount, currency, fee, fee_currency, counter, counter_currency in zip(
+                columns.date[start:], columns.type[start:], columns.detail_type[start:],
+                columns.amount[start:], columns.currency[start:], columns.fees[start:],
+                columns.fee_currency[start:], columns.counter_amount[start:],
+                columns.counter_currency[start:]):
+            type_counts[type_code] += 1
+            detail_type_counts[detail_code] += 1
+            day = date - date % MS_PER_DAY
+
+            totals = by_currency_code.get(currency)
+            if totals is None:
+                totals = by_currency_code[currency] = [0, 0, 0, 0]
+            totals[0] += 1
+            if currency == reporting:
+                value, target = amount, exact_code.setdefault(currency, [0, 0, 0])
+            elif counter_currency == reporting:
+                exchange_valued += 1
+                value, target = counter, exact_code.setdefault(currency, [0, 0, 0])
+            else:
+                value, target = amount, to_convert_code.setdefault((day, currency), [0, 0, 0])
+            if type_code == credit:
+                totals[1] += amount
+                target[0] += value
+            elif type_code == debit:
+                totals[2] -= amount
+                target[1] -= value
+
+            if fee:
+                fee_totals = by_currency_code.get(fee_currency)
+                if fee_totals is None:
+                    fee_totals = by_currency_code[fee_currency] = [0, 0, 0, 0]
+                fee_totals[3] += fee
+                if fee_currency == reporting:
+                    exact_code.setdefault(fee_currency, [0, 0, 0])[2] += fee
+                else:
+                    to_convert_code.setdefault((day, fee_currency), [0, 0, 0])[2] += fee
+
+        _merge_counts(self.type_counts, types, type_counts)
+        _merge_counts(self.detail_type_counts, detail_types, detail_type_counts)
+        for code, values in by_currency_code.items():
+            _merge_totals(self.by_currency, currencies[code], values)
+        for (day, code), values in to_convert_code.items():
+            _merge_totals(self.to_convert, (day, currencies[code]), values)
+        for code, values in exact_code.items():
+            _merge_totals(self.exact, currencies[code], values)
+        self.exchange_valued += exchange_valued
+        self.rows_seen = len(columns)
+        self.converted = {}
+        return self
+
+    def rate_keys(self):
+        """``(currency, UTC day start)`` pairs that ``convert`` needs a rate for."""
+        return {(currency, day) for day, currency in self.to_convert}
+
+    def convert(self, rates):
+        """Value every total in the reporting currency.
+
+        ``rates`` maps each of ``rate_keys()`` to the rate from that
+        currency on that day to the reporting currency.
+        """
+        converted = {currency: [from_scaled(value) for value in values] for currency, values in self.exact.items()}
+        for (day, currency), values in self.to_convert.items():
+            rate = rates[(currency, day)]
+            totals = converted.setdefault(currency, [0.0, 0.0, 0.0])
+            for i, value in enumerate(values):
+                totals[i] += from_scaled(value) * rate
+        self.converted = converted
+        return self
+
+    def native_totals(self, currency):
+        """Return ``(credits, debits, fees)`` of ``currency`` in that currency."""
+        return StatementSummary.currency_totals(self, currency)
+
+    def currency_totals(self, currency=None):
+        """Return ``(credits, debits, fees)`` in the reporting currency, for one currency or all."""
+        if currency is not None:
+            return tuple(self.converted.get(currency, (0.0, 0.0, 0.0)))
+        return tuple(sum(values[i] for values in self.converted.values()) for i in range(3))
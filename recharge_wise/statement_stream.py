@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import Timing
+from .statement_parser import StatementColumns
+from .wise_client import DEFAULT_STATEMENT_WORKERS, DEFAULT_WINDOW_MONTHS, split_interval
+
+# Characters decoded per read while walking a spilled response
+READ_SIZE = 256 * 1024
+
+WHITESPACE = ' \t\n\r'
+
+
+class JSONStreamReader:
+    """Minimal incremental reader over a text file holding one JSON document.
+
+    Only the buffered tail of the file is kept in memory; values are decoded
+    with ``json.JSONDecoder.raw_decode`` as soon as they are complete.
+    """
+
+    def __init__(self, fp, read_size=READ_SIZE):
+        self.fp = fp
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == '' or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield ``(key, reader)`` for each member of the next object.
+
+        The consumer must read the member's value (with ``value`` or
+        ``array_items``) before advancing the iterator.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key, self
+            if self.expect(',}') == '}':
+                return
+
+    def array_items(self):
+        """Yield each element of the next array as it is decoded."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def read_statement(fp, on_transaction):
+    """Walk a statement document, passing each transaction to ``on_transaction``.
+
+    Returns the statement's other top-level fields. The transactions list is
+    never materialised.
+    """
+    reader = JSONStreamReader(fp)
+    header = {}
+    for key, member in reader.items():
+        if key == 'transactions' and member.peek() == '[':
+            for transaction in member.array_items():
+                on_transaction(transaction)
+        else:
+            header[key] = member.value()
+    return header
+
+
+class StreamedStatement:
+    """A statement decoded straight into columns, plus its spilled raw files.
+
+    ``raw_paths`` are temporary files owned by this object; call ``close``
+    to delete them.
+    """
+
+    def __init__(self, header, columns, raw_paths):
+        self.header = header
+        self.columns = columns
+        self.raw_paths = raw_paths
+
+    def close(self):
+        for path in self.raw_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.raw_paths = []
+
+
+def load_statement_files(paths):
+    """Decode per-window statement files, in interval order, into one statement.
+
+    Transactions are de-duplicated by ``referenceNumber`` and kept in date
+    order, newest first if that is how the API returned them; the start
+    balance comes from the first window and the end balance from the last.
+    """
+    columns = StatementColumns()
+    seen = set()
+    headers = []
+
+    def on_transaction(transaction):
+        reference = transaction.get('referenceNumber')
+        if reference is not None:
+            if reference in seen:
+                return
+            seen.add(reference)
+        columns.append(transaction)
+
+    newest_first = False
+    for path in paths:
+        start = len(columns)
+        with open(path, encoding='utf-8') as fp:
+            headers.append(read_statement(fp, on_transaction))
+        if len(columns) - start > 1 and columns.date[start] > columns.date[len(columns) - 1]:
+            newest_first = True
+
+    header = dict(headers[0])
+    header['endOfStatementBalance'] = headers[-1]['endOfStatementBalance']
+    header['query'] = dict(headers[0].get('query', {}))
+    if 'intervalEnd' in headers[-1].get('query', {}):
+        header['query']['intervalEnd'] = headers[-1]['query']['intervalEnd']
+
+    if len(paths) > 1:
+        dates = columns.date
+        columns = columns.take(sorted(range(len(columns)), key=dates.__getitem__, reverse=newest_first))
+    return header, columns
+
+
+def fetch_statement_stream(client, profile_id, balance_id, currency, start_date, end_date,
+                           api_version='v3', window_months=DEFAULT_WINDOW_MONTHS,
+                           max_workers=DEFAULT_STATEMENT_WORKERS, on_progress=None, timing=None):
+    """Download statement windows to temp files and decode them incrementally.
+
+    Records a ``statement`` timing with ``download`` and ``decode`` phases in
+    ``client.metrics``, or adds them to the caller's ``timing`` instead.
+    """
+    own_timing = timing is None
+    if own_timing:
+        timing = Timing('statement')
+    windows = split_interval(start_date, end_date, window_months)
+    with timing.phase('download'):
+        paths = client.download_windows(profile_id, balance_id, currency, windows,
+                                        api_version=api_version, max_workers=max_workers,
+                                        on_progress=on_progress)
+    try:
+        timing.count('bytes', sum(os.path.getsize(path) for path in paths))
+        with timing.phase('decode'):
+            header, columns = load_statement_files(paths)
+    except BaseException:
+        StreamedStatement(None, None, paths).close()
+        raise
+    timing.count('rows', len(columns))
+    if own_timing:
+        client.metrics.record(timing)
+    return StreamedStatement(header, columns, paths)
+
+
+def fetch_profile_statements(client, profile_id, start_date, end_date, api_version='v3',
+                             window_months=DEFAULT_WINDOW_MONTHS, max_workers=DEFAULT_STATEMENT_WORKERS,
+                             cache=None, on_progress=None):
+    """Fetch every balance's statement of one profile in parallel.
+
+    Returns ``[(balance_id, currency, StreamedStatement)]`` in balance
+    order. Balances run side by side with their windows fetched one at a
+    time, so at most ``max_workers`` requests are in flight. With a
+    ``StatementCache``, closed windows are served from it. ``on_progress``
+    receives the bytes received across all balances. If any balance fails,
+    the statements already fetched are closed and the error is raised.
+    """
+    balances = [(balance['id'], balance['currency'])
+                for account in client.borderless_accounts(profile_id) for balance in account['balances']]
+    lock = threading.Lock()
+    received = [0] * len(balances)
+
+    def fetch(index, balance_id, currency):
+        def progress(balance_received):
+            with lock:
+                received[index] = balance_received
+                total = sum(received)
+            if on_progress:
+                on_progress(total)
+
+        if cache is not None:
+            return cache.fetch_statement(client, profile_id, balance_id, currency, start_date, end_date,
+                                         api_version=api_version, window_months=window_months, max_workers=1,
+                                         on_progress=progress)
+        return fetch_statement_stream(client, profile_id, balance_id, currency, start_date, end_date,
+                                      api_version=api_version, window_months=window_months, max_workers=1,
+                                      on_progress=progress)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(balances))))
+    futures = [executor.submit(fetch, index, *balance) for index, balance in enumerate(balances)]
+    try:
+        statements = [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        for future in futures:
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+        raise
+    executor.shutdown()
+    return [(balance_id, currency, statement) for (balance_id, currency), statement in zip(balances, statements)]
+
+
+def consolidate_statements(statements):
+    """Combine ``fetch_profile_statements`` results into one statement, newest first.
+
+    The header keeps the first statement's account holder and interval and
+    lists each balance's start and end balance under ``balances``. The
+    combined statement takes over the raw files of all of them.
+    """
+    columns = StatementColumns()
+    balances = []
+    paths = []
+    for balance_id, currency, statement in statements:
+        columns.extend_from(statement.columns, range(len(statement.columns)))
+        balances.append({
+            'id': balance_id,
+            'currency': currency,
+            'startOfStatementBalance': statement.header['startOfStatementBalance'],
+            'endOfStatementBalance': statement.header['endOfStatementBalance'],
+        })
+        paths.extend(statement.raw_paths)
+        statement.raw_paths = []
+    dates = columns.date
+    columns = columns.take(sorted(range(len(columns)), key=dates.__getitem__, reverse=True))
+    first = statements[0][2].header if statements else {}
+    header = {
+        'accountHolder': first.get('accountHolder'),
+        'query': first.get('query', {}),
+        'balances': balances,
+    }
+    return StreamedStatement(header, columns, paths)
+
+
+def convert_balances(header, rates, currency, first_day, last_day):
+    """Value a consolidated ``header``'s balances in ``currency``.
+
+    Sets ``startOfStatementBalance`` to the sum of the opening balances at
+    their ``first_day`` rates and ``endOfStatementBalance`` to the closing
+    ones at ``last_day``'s. ``rates`` maps ``(balance currency, day)`` to
+    the rate into ``currency``.
+    """
+    for name, day in (('startOfStatementBalance', first_day), ('endOfStatementBalance', last_day)):
+        value = sum(balance[name]['value'] * rates[(balance['currency'], day)] for balance in header['balances'])
+        header[name] = {'value': round(value, 2), 'currency': currency}
@@ -0,0 +1,196 @@
+"""Indexed local store of every fetched transaction.
+
+Rows are kept one per (environment, profile, balance, reference) with the
+same fields as ``StatementColumns``: dates as UTC epoch milliseconds and
+money as integers scaled by ``AMOUNT_SCALE``. B-tree indexes cover date,
+amount, type and currency, and an FTS5 index covers the free-text fields,
+so searches never need the API.
+"""
+import os
+import sqlite3
+
+from .sqlite_store import SQLiteStore, user_data_dir
+from .statement_parser import StatementColumns, parse_date_ms, to_scaled
+
+KEY_FIELDS = ('environment', 'profile_id', 'balance_id')
+FIELDS = StatementColumns.FIELDS
+TEXT_FIELDS = ('description', 'details', 'recipient', 'reference')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    environment TEXT NOT NULL,
+    profile_id TEXT NOT NULL,
+    balance_id TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    detail_type TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    fees INTEGER NOT NULL,
+    fee_currency TEXT NOT NULL,
+    exchange_rate REAL,
+    counter_amount INTEGER NOT NULL DEFAULT 0,
+    counter_currency TEXT NOT NULL DEFAULT '',
+    running_balance INTEGER NOT NULL,
+    running_currency TEXT NOT NULL,
+    description TEXT NOT NULL,
+    details TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    UNIQUE (environment, profile_id, balance_id, reference)
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount);
+CREATE INDEX IF NOT EXISTS transactions_type ON transactions (type, detail_type, currency, date);
+CREATE INDEX IF NOT EXISTS transactions_currency ON transactions (currency, date);
+"""
+
+# Columns added since the table was first created: (name, definition)
+ADDED_COLUMNS = (
+    ('counter_amount', 'INTEGER NOT NULL DEFAULT 0'),
+    ('counter_currency', "TEXT NOT NULL DEFAULT ''"),
+)
+
+# External-content FTS5 table with prefix indexes, since every search word is
+# matched as a prefix. New rows are indexed in bulk after each insert, which
+# is several times faster than a per-row trigger; the trigger only keeps rows
+# updated in place in step.
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+    {', '.join(TEXT_FIELDS)}, content='transactions', content_rowid='id',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF {', '.join(TEXT_FIELDS)} ON transactions BEGIN
+    INSERT INTO transactions_fts (transactions_fts, rowid, {', '.join(TEXT_FIELDS)})
+    VALUES ('delete', old.id, {', '.join('old.' + field for field in TEXT_FIELDS)});
+    INSERT INTO transactions_fts (rowid, {', '.join(TEXT_FIELDS)})
+    VALUES (new.id, {', '.join('new.' + field for field in TEXT_FIELDS)});
+END;
+"""
+
+FTS_INDEX_NEW = f"""
+INSERT INTO transactions_fts (rowid, {', '.join(TEXT_FIELDS)})
+SELECT id, {', '.join(TEXT_FIELDS)} FROM transactions WHERE id > ?
+"""
+
+# Rows are only rewritten (and re-indexed) when a value actually changed, so
+# storing the same statement again after a refresh is cheap
+UPSERT = f"""
+INSERT INTO transactions ({', '.join(KEY_FIELDS + FIELDS)})
+VALUES ({', '.join('?' * len(KEY_FIELDS + FIELDS))})
+ON CONFLICT (environment, profile_id, balance_id, reference) DO UPDATE SET
+    {', '.join(f'{field} = excluded.{field}' for field in FIELDS)}
+WHERE ({', '.join(FIELDS)}) IS NOT ({', '.join('excluded.' + field for field in FIELDS)})
+"""
+
+
+def default_store_path():
+    return os.path.join(user_data_dir(), 'transactions.sqlite3')
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in text.split())
+
+
+class TransactionStore(SQLiteStore):
+    """SQLite store of transactions, searchable by text, date, amount, type and currency.
+
+    Falls back to ``LIKE`` matching when SQLite was built without FTS5.
+    """
+
+    def __init__(self, path=None):
+        super().__init__(path or default_store_path())
+        # Safe with WAL: a crash can only lose the last commits, not corrupt the file
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        # Sample a few hundred rows per index when ANALYZE gathers statistics
+        self.connection.execute('PRAGMA analysis_limit=400')
+        self.connection.executescript(SCHEMA)
+        existing = {row[1] for row in self.connection.execute('PRAGMA table_info(transactions)')}
+        for name, definition in ADDED_COLUMNS:
+            if name not in existing:
+                # Old rows pick up the real values when their balance is next stored
+                self.connection.execute(f'ALTER TABLE transactions ADD COLUMN {name} {definition}')
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            self.full_text = False
+
+    def add_columns(self, environment, profile_id, balance_id, columns):
+        """Insert or update every transaction of one balance's ``StatementColumns``."""
+        key = (environment, str(profile_id), str(balance_id))
+        with self.lock, self.connection:
+            # Rows inserted now get ids above the current maximum
+            last_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchone()[0]
+            self.connection.executemany(UPSERT, ((*key, *values) for values in columns.iter_values()))
+            if self.full_text:
+                self.connection.execute(FTS_INDEX_NEW, (last_id,))
+            # Without statistics the planner often picks a weak index; sampled,
+            # this takes about a millisecond
+            self.connection.execute('ANALYZE transactions')
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+
+    def search(self, text=None, start=None, end=None, types=(), detail_types=(), currencies=(),
+               min_amount=None, max_amount=None, environment=None, profile_id=None, balance_id=None,
+               limit=None):
+        """Return matching transactions, newest first, as ``StatementColumns``.
+
+        ``text`` matches word prefixes in the description, details, recipient
+        and reference. ``start``/``end`` are Wise or ISO dates. Amount bounds
+        apply to the magnitude, so ``min_amount=1000`` finds both credits and
+        debits of at least 1,000.
+        """
+        clauses = []
+        params = []
+        if text and text.strip():
+            if self.full_text:
+                clauses.append('id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)')
+                params.append(fts_query(text))
+            else:
+                for term in text.split():
+                    clauses.append('(' + ' OR '.join(f'{field} LIKE ?' for field in TEXT_FIELDS) + ')')
+                    params.extend([f'%{term}%'] * len(TEXT_FIELDS))
+        if start:
+            clauses.append('date >= ?')
+            params.append(parse_date_ms(start))
+        if end:
+            clauses.append('date <= ?')
+            params.append(parse_date_ms(end))
+        for field, values in (('type', types), ('detail_type', detail_types), ('currency', currencies)):
+            if values:
+                clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if min_amount is not None or max_amount is not None:
+            # Two ranges rather than ABS() so the amount index can serve both
+            low = to_scaled(abs(min_amount)) if min_amount is not None else 0
+            if max_amount is None:
+                clauses.append('(amount >= ? OR amount <= ?)')
+                params.extend((low, -low))
+            else:
+                high = to_scaled(abs(max_amount))
+                clauses.append('(amount BETWEEN ? AND ? OR amount BETWEEN ? AND ?)')
+                params.extend((low, high, -high, -low))
+        for field, value in (('environment', environment), ('profile_id', profile_id),
+                             ('balance_id', balance_id)):
+            if value is not None:
+                clauses.append(f'{field} = ?')
+                params.append(str(value))
+
+        sql = f"SELECT {', '.join(FIELDS)} FROM transactions"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY date DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        columns = StatementColumns()
+        with self.lock:
+            for values in self.connection.execute(sql, params):
+                columns.append_values(values)
+        return columns
@@ -0,0 +1,353 @@
+import copy
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import Timing, endpoint_name, get_metrics
+from .rate_limiter import PRIORITY_BULK, get_rate_limiter, parse_retry_after
+from .statement_parser import date_from_ms, parse_date_ms
+
+SANDBOX_URL = "https://api.sandbox.transferwise.tech"
+PRODUCTION_URL = "https://api.transferwise.com"
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 60)
+
+# Size of the blocks read from a streamed response between progress callbacks
+CHUNK_SIZE = 64 * 1024
+
+# 429s and these are retried by WiseClient itself so the rate limiter sees them
+RETRY_STATUSES = (500, 502, 503, 504)
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Statement ranges longer than this many months are fetched in parallel windows
+DEFAULT_WINDOW_MONTHS = 1
+DEFAULT_STATEMENT_WORKERS = 4
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# Appended to a bare ``YYYY-MM-DD`` end date so the interval includes that whole day
+END_OF_DAY = 'T23:59:59.999Z'
+
+
+def environment_name(base_url):
+    """'sandbox' or 'production', or the base URL itself when overridden."""
+    if base_url == SANDBOX_URL:
+        return 'sandbox'
+    if base_url == PRODUCTION_URL:
+        return 'production'
+    return base_url
+
+
+def parse_date(value):
+    """Parse an ISO timestamp (``...Z``, with an offset or a plain date) as a naive UTC datetime."""
+    return date_from_ms(parse_date_ms(value))
+
+
+def format_date(value):
+    return value.strftime(DATE_FORMAT)[:-4] + 'Z'
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1, day=1,
+                         hour=0, minute=0, second=0, microsecond=0)
+
+
+def interval_end(value):
+    """Return ``value`` with a bare ``YYYY-MM-DD`` date extended to the last millisecond of that day."""
+    if isinstance(value, str) and len(value) == 10:
+        return value + END_OF_DAY
+    return value
+
+
+def check_interval(start_date, end_date):
+    """Parse a statement interval, raising ValueError with a readable message if it is invalid.
+
+    A bare end date includes that whole day (see ``interval_end``).
+    """
+    dates = []
+    for name, value, bound in (('start', start_date, start_date), ('end', end_date, interval_end(end_date))):
+        try:
+            dates.append(parse_date(bound))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name} date {value!r}; expected an ISO date such as "
+                             f"2024-01-01T00:00:00.000Z") from None
+    if dates[1] < dates[0]:
+        raise ValueError(f"The end date {end_date} is before the start date {start_date}")
+    return tuple(dates)
+
+
+def split_interval(start_date, end_date, window_months=DEFAULT_WINDOW_MONTHS):
+    """Split an ISO interval into calendar-month aligned ``(start, end)`` windows.
+
+    Each window ends one millisecond before the next one starts, matching the
+    ``...T23:59:59.999Z`` convention Wise uses for interval ends. Raises
+    ValueError if the interval is invalid or empty, or ``window_months`` is
+    below one.
+    """
+    if window_months < 1:
+        raise ValueError(f"Statement windows must be at least one month long, not {window_months}")
+    start, end = check_interval(start_date, end_date)
+    windows = []
+    while start <= end:
+        next_start = _add_months(start, window_months)
+        window_end = min(next_start - timedelta(milliseconds=1), end)
+        windows.append((format_date(start), format_date(window_end)))
+        start = next_start
+    return windows
+
+
+class WiseClient:
+    """Thin Wise API client sharing one pooled, retrying ``requests.Session``.
+
+    Keep one instance per token/environment and reuse it so repeated fetches
+    go over warm keep-alive connections. The session's connection pool is
+    safe to share between worker threads.
+
+    Every request first takes a token from the ``RateLimiter`` shared by all
+    clients for the same token and environment; ``priority`` decides who
+    goes first when requests queue up.
+
+    Each request is recorded in ``metrics`` as a ``request`` timing with
+    ``wait`` (rate limiter), ``headers`` (connection setup and server time,
+    which requests does not separate), ``download`` and, for JSON bodies,
+    ``decode`` phases.
+    """
+
+    def __init__(self, token, sandbox=True, timeout=DEFAULT_TIMEOUT,
+                 pool_size=10, max_retries=3, backoff_factor=0.5,
+                 priority=PRIORITY_BULK, rate_limiter=None, base_url=None, metrics=None):
+        self.token = token
+        self.sandbox = sandbox
+        self.base_url = base_url or (SANDBOX_URL if sandbox else PRODUCTION_URL)
+        self.timeout = timeout
+        self.priority = priority
+        self.rate_limiter = rate_limiter or get_rate_limiter(token, self.environment)
+        self.metrics = metrics or get_metrics()
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        # urllib3 only retries connection errors; error statuses go through
+        # _send so that their Retry-After reaches the rate limiter
+        retry = Retry(
+            total=max_retries,
+            allowed_methods=frozenset(['GET']),
+            backoff_factor=backoff_factor,
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    @property
+    def environment(self):
+        return environment_name(self.base_url)
+
+    def with_priority(self, priority):
+        """Return a client sending at ``priority`` over this one's session and rate limiter.
+
+        The copy shares the connection pool, so only the original should be closed.
+        """
+        client = copy.copy(self)
+        client.priority = priority
+        return client
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def download(self, path, fp, params=None, on_progress=None, timing=None):
+        """Stream the body of a GET on ``path`` into the binary file ``fp``.
+
+        ``on_progress(received_bytes)`` is called after each chunk and may
+        raise (e.g. ``workers.FetchCancelled``) to abort the download. Error responses
+        are read in full and raised with ``raise_for_status`` so callers still
+        get ``e.response.text``. Returns the closed response.
+
+        The request is recorded in ``metrics`` unless the caller passes its
+        own ``timing`` to add further phases and record itself.
+        """
+        own_timing = timing is None
+        if own_timing:
+            timing = self.request_timing(path)
+        try:
+            response = self._send(path, params, timing)
+            try:
+                if response.status_code >= 400:
+                    response.content
+                    response.raise_for_status()
+
+                received = 0
+                with timing.phase('download'):
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        fp.write(chunk)
+                        received += len(chunk)
+                        if on_progress:
+                            on_progress(received)
+                timing.count('bytes', received)
+                return response
+            finally:
+                response.close()
+        finally:
+            if own_timing:
+                self.metrics.record(timing)
+
+    def request_timing(self, path):
+        return Timing('request', endpoint=endpoint_name(path), status='error')
+
+    def _send(self, path, params, timing):
+        """Issue a streamed GET through the rate limiter, retrying 429s and 5xx errors.
+
+        A Retry-After on either pauses the limiter for every request sharing
+        it; a 5xx without one backs off exponentially in this thread only.
+        """
+        rate_limited = failed = 0
+        while True:
+            with timing.phase('wait'):
+                self.rate_limiter.acquire(self.priority)
+            with timing.phase('headers'):
+                response = self.session.get(self.url(path), params=params, timeout=self.timeout, stream=True)
+            timing.labels['status'] = str(response.status_code)
+            self.rate_limiter.observe(response.status_code, response.headers)
+            if response.status_code == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                rate_limited += 1
+            elif response.status_code in RETRY_STATUSES and failed < self.max_retries:
+                if parse_retry_after(response.headers.get('Retry-After')) is None:
+                    with timing.phase('wait'):
+                        time.sleep(self.backoff_factor * 2 ** failed)
+                failed += 1
+            else:
+                return response
+            timing.count('retries')
+            # Reading the short error body first lets the connection go back to the pool
+            response.content
+            response.close()
+
+    def get(self, path, params=None, on_progress=None, timing=None):
+        """GET ``path`` and return ``(response, body)``."""
+        buffer = io.BytesIO()
+        response = self.download(path, buffer, params=params, on_progress=on_progress, timing=timing)
+        return response, buffer.getvalue()
+
+    def get_json(self, path, params=None, on_progress=None):
+        timing = self.request_timing(path)
+        try:
+            response, body = self.get(path, params=params, on_progress=on_progress, timing=timing)
+            with timing.phase('decode'):
+                return json.loads(body)
+        finally:
+            self.metrics.record(timing)
+
+    def profiles(self, on_progress=None):
+        return self.get_json('v2/profiles', on_progress=on_progress)
+
+    def borderless_accounts(self, profile_id, on_progress=None):
+        return self.get_json('v1/borderless-accounts', params={'profileId': profile_id}, on_progress=on_progress)
+
+    def rates(self, source, target, start_date, end_date, on_progress=None):
+        """Daily ``source`` to ``target`` rates between two ``YYYY-MM-DD`` dates."""
+        return self.get_json('v1/rates', params={'source': source, 'target': target, 'from': start_date,
+                                                 'to': end_date, 'group': 'day'}, on_progress=on_progress)
+
+    def statement_path(self, profile_id, balance_id, api_version='v3'):
+        return f"{api_version}/profiles/{profile_id}/balance-statements/{balance_id}/statement.json"
+
+    def statement_params(self, currency, start_date, end_date):
+        return {
+            'currency': currency,
+            'intervalStart': start_date,
+            'intervalEnd': end_date
+        }
+
+    def statement(self, profile_id, balance_id, currency, start_date, end_date,
+                  api_version='v3', on_progress=None):
+        return self.get_json(self.statement_path(profile_id, balance_id, api_version),
+                             params=self.statement_params(currency, start_date, end_date),
+                             on_progress=on_progress)
+
+    def download_statement(self, profile_id, balance_id, currency, start_date, end_date, fp,
+                           api_version='v3', on_progress=None):
+        return self.download(self.statement_path(profile_id, balance_id, api_version), fp,
+                             params=self.statement_params(currency, start_date, end_date),
+                             on_progress=on_progress)
+
+    def map_windows(self, fn, windows, max_workers=DEFAULT_STATEMENT_WORKERS, on_progress=None):
+        """Call ``fn(start, end, on_progress)`` for each window on a bounded thread pool.
+
+        Returns the results in window order. ``on_progress`` receives the
+        total bytes received across all windows. If any window fails, pending
+        windows are cancelled and the error is re-raised.
+        """
+        if len(windows) == 1:
+            window_start, window_end = windows[0]
+            return [fn(window_start, window_end, on_progress)]
+
+        lock = threading.Lock()
+        received = [0] * len(windows)
+
+        def window_progress(index):
+            def callback(window_received):
+                with lock:
+                    received[index] = window_received
+                    total = sum(received)
+                if on_progress:
+                    on_progress(total)
+            return callback
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows))))
+        try:
+            futures = [
+                executor.submit(fn, window_start, window_end, window_progress(index))
+                for index, (window_start, window_end) in enumerate(windows)
+            ]
+            return [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def download_windows(self, profile_id, balance_id, currency, windows, api_version='v3',
+                         max_workers=DEFAULT_STATEMENT_WORKERS, on_progress=None):
+        """Download one statement per window into temporary files, in parallel.
+
+        Returns the file paths in window order; the caller owns and must
+        delete them. Nothing is left behind if any window fails.
+        """
+        paths = []
+        lock = threading.Lock()
+
+        def fetch(window_start, window_end, window_progress):
+            with tempfile.NamedTemporaryFile('wb', prefix='wise-statement-', suffix='.json',
+                                             delete=False) as fp:
+                with lock:
+                    paths.append(fp.name)
+                self.download_statement(profile_id, balance_id, currency, window_start, window_end, fp,
+                                        api_version=api_version, on_progress=window_progress)
+            return fp.name
+
+        try:
+            return self.map_windows(fetch, windows, max_workers=max_workers, on_progress=on_progress)
+        except BaseException:
+            for path in paths:
+                os.remove(path)
+            raise
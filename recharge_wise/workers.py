@@ -0,0 +1,70 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class FetchCancelled(Exception):
+    pass
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(str)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs ``fn(worker, *args, **kwargs)`` on a QThreadPool thread.
+
+    Results and errors are delivered back to the GUI thread through
+    ``signals``; ``fn`` can report progress with ``worker.report`` and should
+    poll ``worker.check_cancelled`` between blocking steps. Once ``fn`` has
+    returned its result is always delivered, even if a cancel arrived
+    meanwhile, so whoever receives it can release what it holds; check
+    ``is_cancelled`` there.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.is_cancelled:
+            raise FetchCancelled()
+
+    def report(self, message):
+        if not self.is_cancelled:
+            self.signals.progress.emit(message)
+
+    def download_progress(self, label):
+        """Return an ``on_progress`` callback for ``WiseClient`` requests."""
+        self.report(f"Fetching {label}...")
+
+        def on_progress(received):
+            self.check_cancelled()
+            self.report(f"Fetching {label}... {received / 1024:,.0f} KB received")
+
+        return on_progress
+
+    def run(self):
+        try:
+            self.check_cancelled()
+            result = self.fn(self, *self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()